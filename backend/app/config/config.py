@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,6 +24,8 @@ AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_VERSION", "2024-02-15-preview")
+# Inputs per embeddings request (the API accepts at most 2048)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
 
 
 # Azure AI Search
@@ -54,3 +57,70 @@ QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "knowledge_chunks")  # For KB documents only
 CASE_STUDY_COLLECTION = os.getenv("CASE_STUDY_COLLECTION", "case_studies")  # For case studies only
+PROJECT_RFP_COLLECTION = os.getenv("PROJECT_RFP_COLLECTION", "project_rfp_chunks")  # Project RFP chunks, filtered by project_id
+
+# ---------- CHUNKING ----------
+# Chunk sizes are measured in tokens of the embedding model's tokenizer
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", "cl100k_base")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "300"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+# ---------- ETL WORKER ----------
+# Run the ETL queue worker inside the API process (disable when running `python -m app.worker` separately)
+ETL_EMBEDDED_WORKER = os.getenv("ETL_EMBEDDED_WORKER", "true").lower() == "true"
+ETL_WORKER_CONCURRENCY = int(os.getenv("ETL_WORKER_CONCURRENCY", "1"))
+ETL_WORKER_POLL_SECONDS = float(os.getenv("ETL_WORKER_POLL_SECONDS", "5"))
+ETL_SCAN_INTERVAL_MINUTES = int(os.getenv("ETL_SCAN_INTERVAL_MINUTES", "30"))
+ETL_JOB_MAX_ATTEMPTS = int(os.getenv("ETL_JOB_MAX_ATTEMPTS", "5"))
+ETL_RETRY_BASE_SECONDS = int(os.getenv("ETL_RETRY_BASE_SECONDS", "30"))
+# A processing job whose lease is not renewed within this window is treated as crashed
+ETL_JOB_LEASE_SECONDS = int(os.getenv("ETL_JOB_LEASE_SECONDS", "900"))
+
+# ---------- PROJECT PRECOMPUTE ----------
+# Projects whose RFP context is prepared concurrently after uploads
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", "2"))
+# RFP sections added to the questionnaire prompt: top chunks per aspect, capped in tokens
+RFP_SECTIONS_PER_ASPECT = int(os.getenv("RFP_SECTIONS_PER_ASPECT", "3"))
+RFP_SECTION_TOKEN_BUDGET = int(os.getenv("RFP_SECTION_TOKEN_BUDGET", "3000"))
+
+# ---------- RFP SUMMARIZATION ----------
+# RFP tokens sent to the scope prompt; longer RFPs are summarized (map-reduce) to fit
+SCOPE_RFP_TOKENS = int(os.getenv("SCOPE_RFP_TOKENS", "5000"))
+SUMMARY_SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", "3000"))  # Input tokens per summarization call
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))  # Concurrent summarization calls
+
+# ---------- RATE CARDS ----------
+# Company rate maps are cached in memory; other workers' rate card writes are
+# noticed by checking cache_versions at most this often (0 checks on every lookup)
+RATE_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("RATE_CACHE_VERSION_CHECK_SECONDS", "5"))
+
+# ---------- BLOB STORAGE BACKEND ----------
+# "azure" (Azure Blob container) or "local" (directory on this host, for development/tests/benchmarks)
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "azure").lower()
+BLOB_LOCAL_ROOT = os.getenv("BLOB_LOCAL_ROOT", os.path.join(os.path.dirname(BASE_DIR), "local_blobs"))
+# Seconds a folder listing of the blob explorer is served from memory (0 disables)
+BLOB_LISTING_CACHE_SECONDS = float(os.getenv("BLOB_LISTING_CACHE_SECONDS", "30"))
+
+# ---------- BLOB DOWNLOAD CACHE ----------
+# Local disk LRU of downloaded blobs, revalidated with the blob ETag on every read
+BLOB_CACHE_ENABLED = os.getenv("BLOB_CACHE_ENABLED", "true").lower() == "true"
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "scopingbot-blob-cache"))
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+BLOB_CACHE_MAX_ITEM_BYTES = int(os.getenv("BLOB_CACHE_MAX_ITEM_BYTES", str(64 * 1024 * 1024)))
+
+# ---------- UPLOADS ----------
+# Files of one multi-file upload streamed to storage at the same time
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+# Lifetime of the write-only SAS URLs handed out by upload sessions
+UPLOAD_SESSION_TTL_MINUTES = int(os.getenv("UPLOAD_SESSION_TTL_MINUTES", "60"))
+UPLOAD_SESSION_MAX_FILES = int(os.getenv("UPLOAD_SESSION_MAX_FILES", "500"))
+
+# ---------- BLOB DELETION ----------
+# Folder deletions covering more KB documents than this run as a background job
+BULK_DELETE_INLINE_LIMIT = int(os.getenv("BULK_DELETE_INLINE_LIMIT", "100"))
+# Blobs of deleted projects/files are queued in blob_deletion_outbox and removed by a background collector
+BLOB_GC_POLL_SECONDS = float(os.getenv("BLOB_GC_POLL_SECONDS", "10"))
+BLOB_GC_BATCH_SIZE = int(os.getenv("BLOB_GC_BATCH_SIZE", "500"))
+BLOB_GC_CONCURRENCY = int(os.getenv("BLOB_GC_CONCURRENCY", "4"))
+BLOB_GC_MAX_ATTEMPTS = int(os.getenv("BLOB_GC_MAX_ATTEMPTS", "8"))
+BLOB_GC_RETRY_BASE_SECONDS = int(os.getenv("BLOB_GC_RETRY_BASE_SECONDS", "30"))
@@ -1,11 +1,13 @@
-from typing import List, Optional, Union
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
-import uuid, logging
+from sqlalchemy.orm import noload, selectinload
+from sqlalchemy import and_, exists, or_, select
+import base64, uuid, logging
 from fastapi import UploadFile, HTTPException, status
 from app import models, schemas
 from app.utils import azure_blob as blob_utils
+from app.services import project_precompute
 
 logger = logging.getLogger(__name__)
 
@@ -41,24 +43,85 @@ async def _verify_project_owner(db: AsyncSession, project_id: uuid.UUID, owner_i
 
 
 # PROJECTS CRUD
-async def list_projects(db: AsyncSession, owner_id: uuid.UUID) -> List[models.Project]:
-    """List all projects belonging to a specific user."""
-    result = await db.execute(
-        select(models.Project)
+def _finalized_scope_exists():
+    """Correlated EXISTS: the project has a finalized scope file."""
+    return (
+        exists()
+        .where(
+            models.ProjectFile.project_id == models.Project.id,
+            models.ProjectFile.file_name == "finalized_scope.json",
+        )
+        .label("has_finalized_scope")
+    )
+
+
+def _encode_cursor(project: models.Project) -> str:
+    raw = f"{project.created_at.isoformat()}|{project.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        created_at, project_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(project_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def list_projects(
+    db: AsyncSession,
+    owner_id: uuid.UUID,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_files: bool = True,
+) -> Tuple[List[models.Project], Optional[str]]:
+    """
+    List a user's projects, newest first.
+
+    has_finalized_scope comes from an EXISTS in the main query and the
+    company (and files, unless include_files is False) from one
+    selectin query each, so the query count does not grow with the
+    number of projects.
+
+    Pages are keyset-paginated on (created_at, id): pass the returned
+    cursor back to get the next `limit` projects (None on the last page,
+    or when limit is None and every project is returned).
+    """
+    query = (
+        select(models.Project, _finalized_scope_exists())
         .options(
-            selectinload(models.Project.files),
+            selectinload(models.Project.files) if include_files else noload(models.Project.files),
             selectinload(models.Project.company),
         )
         .filter(models.Project.owner_id == owner_id)
-        .order_by(models.Project.created_at.desc())
+        .order_by(models.Project.created_at.desc(), models.Project.id.desc())
     )
-    projects = result.scalars().all()
-
-    for p in projects:
-        p.files = [_attach_file_urls(f) for f in p.files]
+    if cursor:
+        created_at, project_id = _decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                models.Project.created_at < created_at,
+                and_(models.Project.created_at == created_at, models.Project.id < project_id),
+            )
+        )
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][0])
+
+    projects = []
+    for p, finalized in rows:
+        p.has_finalized_scope = bool(finalized)
+        if include_files:
+            p.files = [_attach_file_urls(f) for f in p.files]
+        projects.append(p)
 
     logger.info(f" Listed {len(projects)} projects for owner {owner_id}")
-    return projects
+    return projects, next_cursor
 
 
 async def get_project(
@@ -94,9 +157,9 @@ async def create_project(
     # Validate company ownership (except Sigmoid default)
     if project.company_id:
         from app.utils import ratecards
-        sigmoid = await ratecards.get_or_create_sigmoid_company(db)
+        sigmoid_id = await ratecards.get_sigmoid_company_id(db)
 
-        if project.company_id != sigmoid.id:
+        if project.company_id != sigmoid_id:
             result = await db.execute(
                 select(models.Company).filter(
                     models.Company.id == project.company_id,
@@ -123,7 +186,7 @@ async def create_project(
         logger.info(f" Attached {len(files)} files to project {db_project.id}")
 
     # Refresh related data instead of extra SELECT
-    await db.refresh(db_project, attribute_names=["company", "files"])
+    await db.refresh(db_project, attribute_names=["company", "files", "precompute_status"])
     db_project.files = [_attach_file_urls(f) for f in db_project.files]
 
     return db_project
@@ -139,24 +202,26 @@ async def update_project(
     for field, value in update_data.dict(exclude_unset=True).items():
         setattr(db_project, field, value)
     await db.commit()
+    await project_precompute.request_precompute(db, db_project.id)
     await db.refresh(db_project)
     logger.info(f" Updated project {db_project.id}")
     return db_project
 
 async def delete_project(db: AsyncSession, db_project: models.Project) -> bool:
-    """Delete a single project (blob cleanup handled by SQLAlchemy event listeners)."""
+    """Delete a single project (its blob folder is queued for the blob collector by an event listener)."""
     logger.info(f" Deleting project {db_project.id} ({len(db_project.files)} files)...")
 
     await db.delete(db_project)
     await db.commit()
+    await project_precompute.delete_project_index([db_project.id])
 
-    logger.info(f" Project {db_project.id} deleted successfully (DB + Blob folder auto-cleaned).")
+    logger.info(f" Project {db_project.id} deleted successfully (blob folder queued for deletion).")
     return True
 
 
 
 async def delete_all_projects(db: AsyncSession, owner_id: uuid.UUID) -> int:
-    """Delete all projects belonging to a user (DB + Blob cleanup via event listeners)."""
+    """Delete all projects belonging to a user (blob folders queued for the blob collector)."""
     result = await db.execute(
         select(models.Project)
         .options(selectinload(models.Project.files))
@@ -176,8 +241,9 @@ async def delete_all_projects(db: AsyncSession, owner_id: uuid.UUID) -> int:
         await db.delete(project)
 
     await db.commit()
+    await project_precompute.delete_project_index([p.id for p in projects])
 
-    logger.info(f" Deleted {count} projects for owner {owner_id} (DB + Blob folders auto-cleaned).")
+    logger.info(f" Deleted {count} projects for owner {owner_id} (blob folders queued for deletion).")
     return count
 
 
@@ -192,35 +258,7 @@ async def add_project_file(
     owner_id: uuid.UUID,
 ) -> models.ProjectFile:
     """Add a single file to a project."""
-    await _verify_project_owner(db, project_id, owner_id)
-
-    if isinstance(upload_file, dict) and "file_path" in upload_file:
-        db_file = models.ProjectFile(
-            project_id=project_id,
-            file_name=upload_file["file_name"],
-            file_path=upload_file["file_path"],
-        )
-        db.add(db_file)
-        await db.commit()
-        await db.refresh(db_file)
-        return _attach_file_urls(db_file)
-
-    # Handle new UploadFile objects
-    safe_name = upload_file.filename.replace(" ", "_")
-    unique_name = f"{PROJECTS_BASE}/{project_id}/{uuid.uuid4()}_{safe_name}"
-
-    file_bytes = await upload_file.read()
-    await blob_utils.upload_bytes(file_bytes, unique_name)
-
-    db_file = models.ProjectFile(
-        project_id=project_id,
-        file_name=upload_file.filename,
-        file_path=unique_name,
-    )
-    db.add(db_file)
-    await db.commit()
-    await db.refresh(db_file)
-    return _attach_file_urls(db_file)
+    return (await add_project_files(db, project_id, [upload_file], owner_id))[0]
 
 
 async def add_project_files(
@@ -229,12 +267,51 @@ async def add_project_files(
     files: List[Union[dict, UploadFile]],
     owner_id: uuid.UUID,
 ) -> List[models.ProjectFile]:
-    """Add multiple files to a project."""
-    results = []
+    """
+    Add multiple files to a project.
+
+    UploadFiles are streamed to storage concurrently (never fully in
+    memory); all ProjectFile rows are then inserted in one transaction.
+    Dicts with file_name/file_path register blobs that already exist.
+    """
+    await _verify_project_owner(db, project_id, owner_id)
+
+    db_files = []
+    uploads = []
     for f in files:
-        results.append(await add_project_file(db, project_id, f, owner_id))
-    logger.info(f" Added {len(results)} files to project {project_id}")
-    return results
+        if isinstance(f, dict) and "file_path" in f:
+            db_files.append(models.ProjectFile(
+                project_id=project_id,
+                file_name=f["file_name"],
+                file_path=f["file_path"],
+            ))
+            continue
+
+        # Handle new UploadFile objects
+        safe_name = f.filename.replace(" ", "_")
+        unique_name = f"{PROJECTS_BASE}/{project_id}/{uuid.uuid4()}_{safe_name}"
+        uploads.append((f, unique_name))
+        db_files.append(models.ProjectFile(
+            project_id=project_id,
+            file_name=f.filename,
+            file_path=unique_name,
+        ))
+
+    if uploads:
+        await blob_utils.upload_fileobjs(uploads)
+
+    db.add_all(db_files)
+    await db.commit()
+    # One SELECT loads the server defaults (uploaded_at) of every new row
+    await db.execute(
+        select(models.ProjectFile)
+        .filter(models.ProjectFile.id.in_([f.id for f in db_files]))
+        .execution_options(populate_existing=True)
+    )
+    await project_precompute.request_precompute(db, project_id)
+
+    logger.info(f" Added {len(db_files)} files to project {project_id}")
+    return [_attach_file_urls(f) for f in db_files]
 
 
 async def list_project_files(
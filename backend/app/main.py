@@ -4,11 +4,12 @@ from fastapi.staticfiles import StaticFiles
 import os
 import asyncio
 import logging
-from app.config.database import async_engine, Base, get_async_session
+from app.config.database import async_engine, Base
 from app.auth import router as auth_router
 from app.routers import projects, exports, blob, ratecards, project_prompts, etl, case_studies, presenton
 from app.utils import azure_blob
-from app.services.etl_pipeline import get_etl_pipeline
+from app.services import etl_queue, blob_gc, blob_deletion, project_precompute, scope_store
+from app.config.config import ETL_EMBEDDED_WORKER
 
 # Configure logging
 logging.basicConfig(
@@ -29,64 +30,72 @@ app = FastAPI(
     description="AI-Powered Project Scoping Bot Backend",
     version="1.0.0",
 )
-# ---------- Background ETL Scheduler ----------
-_background_task = None
-
-async def periodic_etl_scan():
-    """Background task that runs ETL scans every 30 minutes."""
-    logger.info("🤖 ETL background scheduler started")
-
-    while True:
-        try:
-            # Wait 30 minutes between scans
-            await asyncio.sleep(30 * 60)
-
-            logger.info("🔄 Running scheduled ETL scan...")
-            async for db in get_async_session():
-                try:
-                    etl = get_etl_pipeline()
-                    stats = await etl.scan_and_process_new_documents(db)
-                    logger.info(f"✅ Scheduled ETL scan completed: {stats}")
-                except Exception as e:
-                    logger.error(f"❌ Scheduled ETL scan failed: {e}")
-                finally:
-                    await db.close()
-                break  # Only use first session
-
-        except Exception as e:
-            logger.error(f"❌ ETL scheduler error: {e}")
-            await asyncio.sleep(60)  # Wait 1 minute before retry
+# ---------- Background ETL Worker ----------
+_etl_stop: asyncio.Event | None = None
+_etl_tasks: list = []
+_gc_stop: asyncio.Event | None = None
+_gc_task: asyncio.Task | None = None
 
 # ---------- Startup ----------
+# The single startup routine. Importing the app creates no clients: Azure
+# OpenAI, Qdrant and blob storage connect on first use, and document/export
+# libraries load with the first request that needs them.
 @app.on_event("startup")
 async def on_startup():
-    global _background_task
+    global _etl_stop, _etl_tasks, _gc_stop, _gc_task
 
-    # Create DB tables
-    print("Creating database tables...")
+    # Create DB tables (a failure aborts startup: nothing below works without them)
+    logger.info("🔄 Initializing database tables...")
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    print("Database tables created.")
+    logger.info("✅ Database tables ready")
 
     # Ensure Blob container exists
     await azure_blob.init_container()
-    print("Azure Blob container ready.")
+    print("Blob storage ready.")
 
-    # Start background ETL scheduler
-    _background_task = asyncio.create_task(periodic_etl_scan())
-    print("ETL background scheduler started (runs every 30 minutes).")
+    # Delete blobs queued by project/file deletions (blob_deletion_outbox)
+    _gc_stop = asyncio.Event()
+    _gc_task = blob_gc.start_collector_task(_gc_stop)
+
+    # Resume RFP precomputes an earlier run left pending/running
+    try:
+        await project_precompute.schedule_unfinished_precomputes()
+    except Exception as e:
+        logger.error(f"❌ Failed to resume RFP precomputes: {e}")
+
+    # Resume large folder deletions an earlier run left unfinished
+    try:
+        await blob_deletion.schedule_unfinished_deletions()
+    except Exception as e:
+        logger.error(f"❌ Failed to resume folder deletions: {e}")
+
+    # Finish blob archive copies of scope versions an earlier run did not write
+    try:
+        await scope_store.schedule_pending_archives()
+    except Exception as e:
+        logger.error(f"❌ Failed to schedule scope archives: {e}")
+
+    # Start embedded ETL worker (disable when running `python -m app.worker` separately)
+    if ETL_EMBEDDED_WORKER:
+        _etl_stop = asyncio.Event()
+        _etl_tasks = etl_queue.start_worker_tasks(_etl_stop)
+        print("Embedded ETL worker started.")
 
 # ---------- Shutdown ----------
 @app.on_event("shutdown")
 async def on_shutdown():
-    global _background_task
-    if _background_task:
-        _background_task.cancel()
-        try:
-            await _background_task
-        except asyncio.CancelledError:
-            pass
-        print("ETL background scheduler stopped.")
+    if _gc_stop is not None:
+        # Let the current round commit its outcome; unfinished rows stay queued
+        _gc_stop.set()
+        await asyncio.gather(_gc_task, return_exceptions=True)
+
+    if _etl_stop is not None:
+        _etl_stop.set()
+        for task in _etl_tasks:
+            task.cancel()
+        await asyncio.gather(*_etl_tasks, return_exceptions=True)
+        print("Embedded ETL worker stopped.")
 
 # ---------- CORS ----------
 app.add_middleware(
@@ -95,6 +104,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset cursor of GET /api/projects; scope version of GET .../finalized_scope
+    expose_headers=["X-Next-Cursor", "ETag", "X-Scope-Version"],
 )
 
 # ---------- Static Files ----------
@@ -113,21 +124,6 @@ app.include_router(etl.router)
 app.include_router(case_studies.router)
 app.include_router(presenton.router)
 
-# ---------- Startup Event ----------
-@app.on_event("startup")
-async def startup_event():
-    """
-    Initialize application on startup.
-    Creates database tables if they don't exist.
-    """
-    try:
-        logger.info("🔄 Initializing database tables...")
-        async with async_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("✅ Database tables ready")
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {e}")
-
 # ---------- Health Check ----------
 @app.get("/health")
 async def health_check():
@@ -1,7 +1,7 @@
 import uuid
 import datetime
 from sqlalchemy import (
-    String, Text, DateTime, ForeignKey, Float, event
+    String, Text, DateTime, ForeignKey, Float, BigInteger, Index, JSON, event
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -72,6 +72,10 @@ class Company(Base):
 # RATE CARD MODEL
 class RateCard(Base):
     __tablename__ = "rate_cards"
+    __table_args__ = (
+        # Company cards for one user plus the company defaults (user_id IS NULL)
+        Index("ix_rate_cards_company_id_user_id", "company_id", "user_id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
@@ -105,6 +109,10 @@ class RateCard(Base):
 # PROJECT MODEL
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Keyset-paginated project listing of an owner (crud.list_projects)
+        Index("ix_projects_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
@@ -119,6 +127,9 @@ class Project(Base):
     compliance: Mapped[str | None] = mapped_column(Text, nullable=True)
     duration: Mapped[str | None] = mapped_column(String(20), nullable=True)
 
+    # Upload-time RFP precompute: pending, running, ready, failed (None = nothing to precompute yet)
+    precompute_status: Mapped[str | None] = mapped_column(String(50), nullable=True)
+
     # Audit
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -161,6 +172,10 @@ class Project(Base):
 # PROJECT FILE MODEL
 class ProjectFile(Base):
     __tablename__ = "project_files"
+    __table_args__ = (
+        # finalized_scope.json / questions.json lookups of a project
+        Index("ix_project_files_project_id_file_name", "project_id", "file_name"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
@@ -227,43 +242,181 @@ class ProjectPromptHistory(Base):
         return f"<PromptHistory(role={self.role}, project={str(self.project_id)[:8]})>"
 
 
+def _queue_blob_deletion(connection, path: str, is_prefix: bool = False) -> None:
+    """Add a blob (or folder prefix) to the deletion outbox in the current transaction."""
+    connection.execute(
+        BlobDeletionOutbox.__table__.insert().values(
+            path=path,
+            is_prefix=is_prefix,
+            next_attempt_at=datetime.datetime.now(datetime.timezone.utc),
+        )
+    )
+
+
 @event.listens_for(Project, "after_delete")
 def delete_project_folder(mapper, connection, target):
-    """Delete all blobs under the project's folder (safe + explicit)."""
-    try:
-        from app.utils import azure_blob
-        prefix = f"projects/{target.id}/"
-
-        # This ensures folder deletion only when a project is truly deleted
-        import asyncio
-        try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(azure_blob.delete_folder(prefix))
-        except RuntimeError:
-            asyncio.run(azure_blob.delete_folder(prefix))
+    """Queue the project's blob folder for deletion (removed by app.services.blob_gc after commit)."""
+    prefix = f"projects/{target.id}/"
+    _queue_blob_deletion(connection, prefix, is_prefix=True)
 
-        # mark so individual files won’t be deleted again
-        setattr(target, "_blob_folder_deleted", True)
+    # mark so individual files won’t be deleted again
+    setattr(target, "_blob_folder_deleted", True)
 
-    except Exception as e:
-        print(f"[Project] Failed to cleanup folder {prefix}: {e}")
+    # Drop cached text of the project's files in the same transaction
+    connection.execute(
+        ExtractedTextCache.__table__.delete().where(
+            ExtractedTextCache.blob_path.like(f"{prefix}%")
+        )
+    )
 
 
 @event.listens_for(ProjectFile, "after_delete")
 def delete_blob_after_file_delete(mapper, connection, target):
-    """Delete single blob only if it’s not part of a project folder deletion."""
-    try:
-        # Skip if the parent project was just deleted
-        if getattr(getattr(target, "project", None), "_blob_folder_deleted", False):
-            return
+    """Queue a single blob for deletion unless it’s part of a project folder deletion."""
+    # Skip if the parent project was just deleted
+    if getattr(getattr(target, "project", None), "_blob_folder_deleted", False):
+        return
+
+    if target.file_path:
+        connection.execute(
+            ExtractedTextCache.__table__.delete().where(
+                ExtractedTextCache.blob_path == target.file_path
+            )
+        )
+
+    # Delete only files with extension (not folders)
+    if target.file_path and "." in target.file_path:
+        _queue_blob_deletion(connection, target.file_path)
+
+
+# PROJECT PRECOMPUTE MODEL
+class ProjectPrecompute(Base):
+    """RFP context prepared after upload so generation only has to call the LLM."""
+    __tablename__ = "project_precomputes"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    project_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        unique=True,
+        index=True
+    )
+
+    # SHA256 of the project metadata the artifacts were computed from
+    metadata_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # JSON: {blob_path: etag} of the files the artifacts were computed from
+    file_etags: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # JSON: overview, focused content, trimmed scope RFP and the KB chunks for each prompt
+    artifacts: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    rfp_chars: Mapped[int] = mapped_column(default=0)
+    rfp_tokens: Mapped[int] = mapped_column(default=0)
+    rfp_chunks_indexed: Mapped[int] = mapped_column(default=0)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    computed_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<ProjectPrecompute(project={str(self.project_id)[:8]}, tokens={self.rfp_tokens})>"
+
+
+# PROJECT SCOPE VERSIONS
+class ProjectScopeVersion(Base):
+    """
+    A saved finalized scope of a project. The latest version is the canonical
+    scope; finalized_scope.json in blob storage is an archive copy written in
+    the background (app.services.scope_store).
+    """
+    __tablename__ = "project_scope_versions"
+    __table_args__ = (
+        # Latest version of a project
+        Index("ix_project_scope_versions_project_id_version", "project_id", "version", unique=True),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    project_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("projects.id", ondelete="CASCADE"),
+    )
+    version: Mapped[int] = mapped_column(default=1)  # 1, 2, ... per project
+
+    # JSON rather than JSONB: exports and the UI rely on the key order of the scope
+    scope: Mapped[dict] = mapped_column(JSON)
+    content_hash: Mapped[str] = mapped_column(String(64))  # SHA256 of the compact JSON, served as ETag
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    # Set once the blob archive copy is written
+    archived_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<ProjectScopeVersion(project={str(self.project_id)[:8]}, v{self.version}, {self.content_hash[:12]})>"
+
+
+# EXTRACTED TEXT CACHE
+class ExtractedTextCache(Base):
+    """Text extracted from a stored file, keyed by blob path and content hash."""
+    __tablename__ = "extracted_text_cache"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    blob_path: Mapped[str] = mapped_column(Text, unique=True, index=True)
+    content_hash: Mapped[str] = mapped_column(String(64))  # SHA256 of the file bytes
+    etag: Mapped[str | None] = mapped_column(String(100), nullable=True)  # Blob ETag the text was checked against
+    text: Mapped[str] = mapped_column(Text, default="")
+    extracted_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"<ExtractedTextCache({self.blob_path}, {len(self.text or '')} chars)>"
+
+
+# SUMMARY CACHE
+class SummaryCache(Base):
+    """LLM summary of a text section, keyed by the hash of its content and target length."""
+    __tablename__ = "summary_cache"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    content_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    summary: Mapped[str] = mapped_column(Text, default="")
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"<SummaryCache({self.content_hash[:12]}, {len(self.summary or '')} chars)>"
 
-        # Delete only files with extension (not folders)
-        if target.file_path and "." in target.file_path:
-            from app.utils import azure_blob
-            azure_blob.safe_delete_blob(target.file_path)
 
-    except Exception as e:
-        print(f"[File] Failed to delete blob {getattr(target, 'file_path', None)}: {e}")
+# CACHE VERSIONS
+class CacheVersion(Base):
+    """
+    Version of an in-process cache shared by all workers. Writers bump it in
+    the transaction that changes the cached data; readers drop their copy
+    when it moved (see app.utils.ratecards).
+    """
+    __tablename__ = "cache_versions"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<CacheVersion({self.name}, v{self.version})>"
 
 
 # ETL PIPELINE MODELS
@@ -286,8 +439,12 @@ class KnowledgeBaseDocument(Base):
     # Vector status
     is_vectorized: Mapped[bool] = mapped_column(default=False, index=True)
     qdrant_point_ids: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON array of point IDs
+    chunk_hashes: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON array of SHA256 per chunk, aligned with qdrant_point_ids
     vector_count: Mapped[int] = mapped_column(default=0)
 
+    # Near-duplicate detection
+    minhash_signature: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON array of MinHash values
+
     # Timestamps
     uploaded_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -303,18 +460,51 @@ class KnowledgeBaseDocument(Base):
         return f"<KBDocument({self.file_name}, vectorized={self.is_vectorized})>"
 
 
+class KBMinHashBand(Base):
+    """LSH index of KB document MinHash signatures (one row per band bucket)."""
+    __tablename__ = "kb_minhash_bands"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("knowledge_base_documents.id", ondelete="CASCADE"),
+        index=True
+    )
+    band_key: Mapped[str] = mapped_column(String(32), nullable=False, index=True)  # "<band>:<bucket hash>"
+
+    def __repr__(self):
+        return f"<KBMinHashBand({self.band_key}, doc={str(self.document_id)[:8]})>"
+
+
 class DocumentProcessingJob(Base):
-    """Track ETL processing jobs for documents."""
+    """Track ETL processing jobs for documents (also serves as the ETL work queue)."""
     __tablename__ = "document_processing_jobs"
+    __table_args__ = (
+        # Job listing filtered by status, newest first
+        Index("ix_document_processing_jobs_status_created_at", "status", "created_at"),
+        # Worker claim: due pending jobs in order
+        Index("ix_document_processing_jobs_status_next_attempt_at", "status", "next_attempt_at"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
     )
-    document_id: Mapped[uuid.UUID] = mapped_column(
+    # NULL until a queued job has resolved its blob to a KB document
+    document_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("knowledge_base_documents.id", ondelete="CASCADE"),
+        nullable=True,
         index=True
     )
+    blob_path: Mapped[str | None] = mapped_column(Text, nullable=True, index=True)  # Queued KB blob path
+    scan_run_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("etl_scan_runs.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )  # Scan that queued the job (NULL for uploads)
 
     # Job status
     status: Mapped[str] = mapped_column(
@@ -325,6 +515,18 @@ class DocumentProcessingJob(Base):
     chunks_processed: Mapped[int] = mapped_column(default=0)
     vectors_created: Mapped[int] = mapped_column(default=0)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    stage_metrics: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON: {"seconds": {stage: s}, "counts": {counter: n}}
+
+    # Queue / retry state
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=5)
+    next_attempt_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)  # Worker ID holding the job
+    locked_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     # Timestamps
     created_at: Mapped[datetime.datetime] = mapped_column(
@@ -341,9 +543,154 @@ class DocumentProcessingJob(Base):
         return f"<ProcessingJob({self.status}, doc={str(self.document_id)[:8]})>"
 
 
+class ETLScanRun(Base):
+    """A knowledge base storage scan, with a resumable listing cursor."""
+    __tablename__ = "etl_scan_runs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    status: Mapped[str] = mapped_column(
+        String(50), default="running", index=True
+    )  # running (listing), interrupted, processing (jobs outstanding), completed
+    trigger: Mapped[str] = mapped_column(String(50), default="scheduled")  # scheduled, manual
+
+    # Blob listing continuation token; the scan resumes from here after a crash
+    continuation_token: Mapped[str | None] = mapped_column(Text, nullable=True)
+    pages_listed: Mapped[int] = mapped_column(default=0)
+
+    # Listing counters
+    files_listed: Mapped[int] = mapped_column(default=0)
+    changed: Mapped[int] = mapped_column(default=0)
+    unchanged: Mapped[int] = mapped_column(default=0)
+    pending_approval: Mapped[int] = mapped_column(default=0)
+    queued: Mapped[int] = mapped_column(default=0)
+    listing_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+
+    # Processing counters (incremented atomically by workers as queued jobs finish)
+    docs_processed: Mapped[int] = mapped_column(default=0)
+    docs_failed: Mapped[int] = mapped_column(default=0)
+    bytes_downloaded: Mapped[int] = mapped_column(BigInteger, default=0)
+    docs_extracted: Mapped[int] = mapped_column(default=0)
+    chunks_embedded: Mapped[int] = mapped_column(default=0)
+    vectors_upserted: Mapped[int] = mapped_column(default=0)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Timestamps
+    started_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    completed_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<ETLScanRun({self.status}, files={self.files_listed})>"
+
+
+class BlobDeletionJob(Base):
+    """A large folder deletion running in the background (blobs, vectors and KB records)."""
+    __tablename__ = "blob_deletion_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    base: Mapped[str] = mapped_column(String(50))
+    folder: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(
+        String(50), default="pending", index=True
+    )  # pending, running, completed, failed
+
+    documents_total: Mapped[int] = mapped_column(default=0)
+    documents_deleted: Mapped[int] = mapped_column(default=0)
+    blobs_deleted: Mapped[int] = mapped_column(default=0)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    completed_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<BlobDeletionJob({self.status}, {self.base}/{self.folder})>"
+
+
+class BlobDeletionOutbox(Base):
+    """
+    A blob or folder prefix to delete, written in the same transaction that
+    deleted the row owning it and drained by app.services.blob_gc.
+    """
+    __tablename__ = "blob_deletion_outbox"
+    __table_args__ = (
+        # Collector claim: due pending rows in order
+        Index("ix_blob_deletion_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    path: Mapped[str] = mapped_column(Text)
+    is_prefix: Mapped[bool] = mapped_column(default=False)  # Delete everything under path
+    status: Mapped[str] = mapped_column(
+        String(50), default="pending", index=True
+    )  # pending, failed
+
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"<BlobDeletionOutbox({self.status}, {self.path}, attempts={self.attempts})>"
+
+
+class UploadSession(Base):
+    """Files a client uploads straight to blob storage, registered when the client completes the session."""
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    owner_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    base: Mapped[str] = mapped_column(String(50))
+    # Set for project uploads (files become ProjectFiles), NULL for knowledge base uploads
+    project_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=True
+    )
+    # JSON: [{"file_name", "path", "uploaded"}]
+    files: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(50), default="pending")  # pending, completed
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    completed_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<UploadSession({self.status}, {self.base}, id={str(self.id)[:8]})>"
+
+
 class PendingKBUpdate(Base):
     """Track pending admin approvals for KB document updates."""
     __tablename__ = "pending_kb_updates"
+    __table_args__ = (
+        # Pending update of a document (ETL re-ingestion checks)
+        Index("ix_pending_kb_updates_new_document_id_status", "new_document_id", "status"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
@@ -398,6 +745,13 @@ class PendingKBUpdate(Base):
 class PendingGeneratedCaseStudy(Base):
     """Track AI-generated case studies pending admin approval."""
     __tablename__ = "pending_generated_case_studies"
+    __table_args__ = (
+        # Latest pending case study of a project
+        Index(
+            "ix_pending_generated_case_studies_project_id_status_created_at",
+            "project_id", "status", "created_at",
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Depends, BackgroundTasks
-from fastapi.responses import StreamingResponse
-from typing import List, Literal
-from app.utils import azure_blob
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ResourceNotModifiedError
+from typing import List, Literal, Optional, Tuple
+from app.utils import azure_blob, blob_cache
+from app.utils.blob_backends import RangeNotSatisfiable, UnsupportedOperation
+from app.services import blob_deletion, blob_gc, upload_sessions
+from app.models import BlobDeletionJob, User
+from app.schemas import UploadSessionCreate
+from app.config.config import BULK_DELETE_INLINE_LIMIT
 from app.auth.router import fastapi_users
 from app.config.database import get_async_session
 from sqlalchemy.ext.asyncio import AsyncSession
-import io, mimetypes, logging
+import mimetypes, logging, uuid
 
 logger = logging.getLogger(__name__)
 
+get_current_active_user = fastapi_users.current_user(active=True)
 get_current_superuser = fastapi_users.current_user(active=True, superuser=True)
 
 router = APIRouter(prefix="/api/blobs", tags=["Azure Blobs"])
@@ -22,25 +29,21 @@ def _validate_base(base: str) -> str:
     return base
 
 
-async def _trigger_etl_scan():
-    """Background task to trigger ETL scan after KB document upload."""
+async def _enqueue_etl_jobs(db: AsyncSession, paths: List[str]) -> None:
+    """Queue uploaded KB documents for the ETL workers (one job per document)."""
     try:
-        from app.services.etl_pipeline import get_etl_pipeline
-        from app.config.database import AsyncSessionLocal
-
-        # Create a new database session for the background task
-        async with AsyncSessionLocal() as db:
-            etl = get_etl_pipeline()
-            stats = await etl.scan_and_process_new_documents(db)
-            logger.info(f"✅ Post-upload ETL scan completed: {stats}")
+        from app.services import etl_queue
+
+        queued = await etl_queue.enqueue_blobs(db, paths)
+        logger.info(f"📥 Queued {queued} uploaded KB document(s) for ETL")
     except Exception as e:
-        logger.error(f"❌ Post-upload ETL scan failed: {e}")
+        # Upload already succeeded; the next scheduled scan picks the file up
+        logger.error(f"❌ Failed to queue uploaded KB documents for ETL: {e}")
 
 
 # Uploads
 @router.post("/upload/file")
 async def upload_file(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     folder: str = Form(""),
     base: Literal["projects", "knowledge_base"] = Form("knowledge_base"),
@@ -53,13 +56,12 @@ async def upload_file(
         blob_name = f"{folder}/{safe_name}" if folder else safe_name
         blob_name = blob_name.strip("/")
 
-        data = await file.read()
-        path = await azure_blob.upload_bytes(data, blob_name, base)
+        path = await azure_blob.upload_fileobj(file, blob_name, base)
 
-        # If uploading to knowledge_base, trigger ETL scan in background
+        # If uploading to knowledge_base, queue it for ETL processing
         if base == "knowledge_base":
-            logger.info(f"📤 KB document uploaded: {path}, triggering ETL scan...")
-            background_tasks.add_task(_trigger_etl_scan)
+            logger.info(f"📤 KB document uploaded: {path}, queueing for ETL...")
+            await _enqueue_etl_jobs(db, [path])
 
         return {"status": "success", "blob": path}
     except Exception as e:
@@ -68,7 +70,6 @@ async def upload_file(
 
 @router.post("/upload/folder")
 async def upload_folder(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     folder: str = Form(""),
     base: Literal["projects", "knowledge_base"] = Form("knowledge_base"),
@@ -77,29 +78,81 @@ async def upload_folder(
     try:
         base = _validate_base(base)
         folder = folder.strip().rstrip("/")
-        uploaded = []
+        uploads = []
 
         for file in files:
             relative_path = file.filename.replace(" ", "_")
             blob_name = f"{folder}/{relative_path}" if folder else relative_path
             blob_name = blob_name.strip("/")
+            uploads.append((file, blob_name))
 
-            data = await file.read()
-            path = await azure_blob.upload_bytes(data, blob_name, base)
-            uploaded.append(path)
+        # Streamed chunk by chunk, UPLOAD_CONCURRENCY files at a time
+        uploaded = await azure_blob.upload_fileobjs(uploads, base)
 
-        # If uploading to knowledge_base, trigger ETL scan in background
+        # If uploading to knowledge_base, queue each document for ETL processing
         if base == "knowledge_base":
-            logger.info(f"📤 {len(uploaded)} KB documents uploaded, triggering ETL scan...")
-            background_tasks.add_task(_trigger_etl_scan)
+            logger.info(f"📤 {len(uploaded)} KB documents uploaded, queueing for ETL...")
+            await _enqueue_etl_jobs(db, uploaded)
 
         return {"status": "success", "files": uploaded}
     except Exception as e:
         raise HTTPException(500, f"Upload failed: {e}")
 
+# Direct uploads (browser -> storage with per-blob SAS URLs)
+@router.post("/upload-sessions", status_code=201)
+async def create_upload_session(
+    request: UploadSessionCreate,
+    base: Literal["projects", "knowledge_base"] = Query("knowledge_base"),
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_superuser),
+):
+    """
+    Start a direct upload: returns one write-only upload URL per file.
+    PUT the files there (x-ms-blob-type: BlockBlob, or block uploads for
+    large files), then call /upload-sessions/{session_id}/complete.
+
+    Only superusers can upload here; project owners use
+    /api/projects/{project_id}/upload-sessions. Existing blobs are never
+    overwritten (409).
+    """
+    base = _validate_base(base)
+    return await upload_sessions.create_session(db, user.id, base, request.files, folder=request.folder)
+
+
+@router.post("/upload-sessions/{session_id}/complete")
+async def complete_upload_session(
+    session_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_active_user),
+):
+    """Queue the uploaded knowledge base documents of a session for ETL."""
+    session = await upload_sessions.get_session(db, session_id, user.id)
+    return await upload_sessions.complete_session(db, session)
+
+
 # Explorer-Style Listing
-@router.get("/explorer/{base}")
+@router.get("/explorer/{base}/children")
+async def explorer_children(
+    base: Literal["projects", "knowledge_base"],
+    prefix: str = Query("", description="Folder to list, relative to the base"),
+    continuation_token: Optional[str] = Query(None),
+    page_size: int = Query(200, ge=1, le=5000),
+):
+    """
+    Lazily expandable explorer: the folders and files directly inside one
+    folder, a page at a time. Expand a folder by listing its path.
+    """
+    base = _validate_base(base)
+    try:
+        listing = await azure_blob.list_folder(base, prefix, continuation_token, page_size)
+    except HttpResponseError as e:
+        raise HTTPException(502, f"Explorer listing failed: {e}")
+    return {"status": "success", "base": base, **listing}
+
+
+@router.get("/explorer/{base}", deprecated=True)
 async def explorer_tree(base: Literal["projects", "knowledge_base"]):
+    """Whole nested tree in one response (walks the entire base); use /explorer/{base}/children."""
     try:
         base = _validate_base(base)
         tree = await azure_blob.explorer(base)
@@ -112,43 +165,92 @@ async def explorer_tree(base: Literal["projects", "knowledge_base"]):
         raise HTTPException(500, f"Explorer listing failed: {e}")
 
 
-# Download
-@router.get("/download/{blob_name:path}")
-async def download_blob(blob_name: str, base: Literal["projects", "knowledge_base"] = Query(...)):
+# Download / Preview (streamed)
+def _parse_range(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single-range "Range: bytes=..." header into (start, end).
+
+    Returns (None, n) for a suffix range ("bytes=-n"), None when the header
+    is absent, malformed or asks for several ranges (served as a full 200).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, sep, end = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
     try:
-        base = _validate_base(base)
-        blob_bytes = await azure_blob.download_bytes(blob_name, base)
-        file_like = io.BytesIO(blob_bytes)
-        filename = blob_name.split("/")[-1]
-        content_type, _ = mimetypes.guess_type(filename)
-        content_type = content_type or "application/octet-stream"
-
-        return StreamingResponse(
-            file_like,
-            media_type=content_type,
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        if not start:
+            return (None, int(end)) if end else None
+        first, last = int(start), int(end) if end else None
+    except ValueError:
+        return None
+    if last is not None and last < first:
+        return None
+    return first, last
+
+
+async def _stream_blob(request: Request, blob_name: str, base: str, disposition: str) -> Response:
+    """Stream a blob to the client in chunks, honouring Range and If-None-Match."""
+    base = _validate_base(base)
+    filename = blob_name.split("/")[-1]
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'{disposition}; filename="{filename}"',
+    }
+
+    byte_range = _parse_range(request.headers.get("range"))
+    offset = length = None
+    try:
+        if byte_range:
+            first, last = byte_range
+            if first is None:
+                # Suffix range: the last n bytes
+                total = await azure_blob.get_blob_size(blob_name, base)
+                if total == 0 or last == 0:
+                    return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+                first, last = max(total - last, 0), total - 1
+            offset = first
+            length = last - first + 1 if last is not None else None
+
+        stream = await azure_blob.open_download_stream(
+            blob_name, base,
+            offset=offset, length=length,
+            if_none_match=request.headers.get("if-none-match"),
         )
-    except Exception as e:
-        raise HTTPException(404, f"Blob not found: {e}")
+    except ResourceNotModifiedError:
+        return Response(status_code=304, headers={"ETag": request.headers.get("if-none-match", "")})
+    except ResourceNotFoundError:
+        raise HTTPException(404, "Blob not found")
+    except RangeNotSatisfiable as e:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{e.total_size}"})
+    except HttpResponseError as e:
+        raise HTTPException(502, f"Blob download failed: {e}")
+
+    headers["Content-Length"] = str(stream.size)
+    if stream.etag:
+        headers["ETag"] = stream.etag
+    status_code = 200
+    if offset is not None:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {offset}-{offset + stream.size - 1}/{stream.total_size}"
+
+    return StreamingResponse(
+        stream.chunks(),
+        status_code=status_code,
+        media_type=content_type,
+        headers=headers,
+    )
+
+
+@router.get("/download/{blob_name:path}")
+async def download_blob(request: Request, blob_name: str, base: Literal["projects", "knowledge_base"] = Query(...)):
+    return await _stream_blob(request, blob_name, base, "attachment")
 
 # Preview
 @router.get("/preview/{blob_name:path}")
-async def preview_blob(blob_name: str, base: Literal["projects", "knowledge_base"] = Query(...)):
-    try:
-        base = _validate_base(base)
-        blob_bytes = await azure_blob.download_bytes(blob_name, base)
-        file_like = io.BytesIO(blob_bytes)
-        filename = blob_name.split("/")[-1]
-        content_type, _ = mimetypes.guess_type(filename)
-        content_type = content_type or "application/octet-stream"
-
-        return StreamingResponse(
-            file_like,
-            media_type=content_type,
-            headers={"Content-Disposition": f'inline; filename="{filename}"'},
-        )
-    except Exception as e:
-        raise HTTPException(404, f"Blob not found: {e}")
+async def preview_blob(request: Request, blob_name: str, base: Literal["projects", "knowledge_base"] = Query(...)):
+    return await _stream_blob(request, blob_name, base, "inline")
 
 
 # Delete
@@ -171,76 +273,63 @@ async def delete_folder(
     try:
         base = _validate_base(base)
 
-        # If deleting from knowledge_base, also clean up database and Qdrant
+        # Large KB folders are deleted in the background; poll the returned job
         if base == "knowledge_base":
-            from sqlalchemy import select, delete
-            from app.models import KnowledgeBaseDocument
-            from app.config.config import QDRANT_COLLECTION, CASE_STUDY_COLLECTION
-            from app.utils.ai_clients import get_qdrant_client
-            from qdrant_client import models as models_qdrant
-
-            # Construct blob path prefix (folder_name already includes base in the path)
-            blob_prefix = f"{folder_name}/"
-            logger.info(f"🗑️ Cleaning up KB documents with prefix: {blob_prefix}")
-
-            # Find all documents under this folder
-            result = await db.execute(
-                select(KnowledgeBaseDocument).where(
-                    KnowledgeBaseDocument.blob_path.like(f"{blob_prefix}%")
-                )
-            )
-            documents = result.scalars().all()
-
-            if documents:
-                logger.info(f"🗑️ Found {len(documents)} KB documents to delete")
-                qdrant_client = get_qdrant_client()
-
-                # Delete vectors from Qdrant for each document
-                for doc in documents:
-                    try:
-                        # Determine which collection based on document_type
-                        collection = CASE_STUDY_COLLECTION if doc.document_type == "case_study" else QDRANT_COLLECTION
-
-                        qdrant_client.delete(
-                            collection_name=collection,
-                            points_selector=models_qdrant.FilterSelector(
-                                filter=models_qdrant.Filter(
-                                    must=[
-                                        models_qdrant.FieldCondition(
-                                            key="document_id",
-                                            match=models_qdrant.MatchValue(value=str(doc.id))
-                                        )
-                                    ]
-                                )
-                            )
-                        )
-                        logger.info(f"✅ Deleted vectors for: {doc.file_name} from {collection}")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to delete vectors for {doc.file_name}: {e}")
-
-                # Delete database records
-                await db.execute(
-                    delete(KnowledgeBaseDocument).where(
-                        KnowledgeBaseDocument.blob_path.like(f"{blob_prefix}%")
-                    )
+            documents_total = await blob_deletion.count_kb_documents(db, folder_name)
+            if documents_total > BULK_DELETE_INLINE_LIMIT:
+                job = await blob_deletion.start_deletion_job(db, folder_name, base, documents_total)
+                return JSONResponse(
+                    status_code=202,
+                    content={"status": "accepted", **blob_deletion.deletion_job_status(job)}
                 )
-                await db.commit()
-                logger.info(f"✅ Deleted {len(documents)} KB document records from database")
 
-        # Delete blob files
-        deleted = await azure_blob.delete_folder(folder_name, base)
-        if not deleted:
+        result = await blob_deletion.delete_folder(db, folder_name, base)
+        if not result["deleted"]:
             raise HTTPException(404, "Folder is empty or not found")
-        return {"status": "success", "deleted": deleted}
+        return {"status": "success", **result}
     except Exception as e:
         raise HTTPException(404, f"Folder not found: {e}")
 
 
+@router.get("/delete/jobs/{job_id}")
+async def get_deletion_job(job_id: uuid.UUID, db: AsyncSession = Depends(get_async_session)):
+    job = await db.get(BlobDeletionJob, job_id)
+    if not job:
+        raise HTTPException(404, "Deletion job not found")
+    return blob_deletion.deletion_job_status(job)
+
+
+@router.get("/cache/stats")
+async def get_download_cache_stats(user=Depends(get_current_superuser)):
+    """Hit ratio and bytes saved of the local blob download cache."""
+    return blob_cache.stats()
+
+
+@router.get("/gc/stats")
+async def get_blob_gc_stats(
+    db: AsyncSession = Depends(get_async_session),
+    user=Depends(get_current_superuser)
+):
+    """Backlog and failures of the blob deletion outbox."""
+    return await blob_gc.outbox_stats(db)
+
+
+@router.post("/gc/retry-failed")
+async def retry_failed_blob_deletions(
+    db: AsyncSession = Depends(get_async_session),
+    user=Depends(get_current_superuser)
+):
+    """Queue deletions that exhausted their attempts again."""
+    return {"status": "success", "requeued": await blob_gc.retry_failed(db)}
+
+
 # SAS Token
 @router.get("/sas-token")
 async def get_sas_token(hours: int = 1):
     try:
         url = azure_blob.generate_sas_url(hours)
         return {"status": "success", "sas_url": url}
+    except UnsupportedOperation as e:
+        raise HTTPException(501, str(e))
     except Exception as e:
         raise HTTPException(500, f"SAS generation failed: {e}")
\ No newline at end of file
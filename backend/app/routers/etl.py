@@ -4,22 +4,27 @@ ETL Pipeline API Endpoints
 Provides admin endpoints for managing the ETL pipeline:
 - View pending KB document approvals
 - Approve/reject KB updates
-- Trigger manual ETL scans
+- Trigger manual ETL scans (queued for the ETL workers)
+- Follow scan progress live (Server-Sent Events)
 - View processing job status
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import uuid
 
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.config.database import get_async_session, AsyncSessionLocal
 from app.auth.router import fastapi_users
 from app.services.etl_pipeline import get_etl_pipeline
+from app.services import etl_queue
+from app.services.etl_metrics import scan_progress
+from app.config.config import ETL_JOB_LEASE_SECONDS
 import json
 import asyncio
 
@@ -28,43 +33,44 @@ get_current_superuser = fastapi_users.current_user(active=True, superuser=True)
 
 router = APIRouter(prefix="/api/etl", tags=["ETL Pipeline"])
 
-# In-memory state to track active scan
-_scan_state = {
-    "is_scanning": False,
-    "started_at": None,
-    "stats": None,
-    "error": None
-}
+SCAN_STREAM_INTERVAL_SECONDS = 2
+SCAN_STREAM_KEEPALIVE_SECONDS = 15
 
 
 async def _run_etl_scan_background():
-    """Background task to run ETL scan."""
-    global _scan_state
+    """Background task to scan KB storage and queue changed documents."""
     import logging
     logger = logging.getLogger(__name__)
 
     try:
-        _scan_state["is_scanning"] = True
-        _scan_state["started_at"] = datetime.utcnow().isoformat()
-        _scan_state["stats"] = None
-        _scan_state["error"] = None
-
         logger.info("🚀 ETL background scan started")
+        stats = await etl_queue.enqueue_scan(trigger="manual")
+        if stats is None:
+            logger.info("⏭️  ETL scan already running on another worker")
+        else:
+            logger.info(f"✅ ETL background scan queued documents: {stats}")
 
-        # Create new DB session for background task
-        async with AsyncSessionLocal() as db:
-            etl = get_etl_pipeline()
-            stats = await etl.scan_and_process_new_documents(db)
+    except Exception as e:
+        # The scan run records the error and resumes on the next scan
+        logger.error(f"❌ ETL background scan failed: {e}")
 
-            _scan_state["stats"] = stats
-            _scan_state["is_scanning"] = False
 
-        logger.info(f"✅ ETL background scan completed: {stats}")
+async def _latest_scan_run(db: AsyncSession, scan_id: Optional[str] = None) -> Optional[models.ETLScanRun]:
+    query = select(models.ETLScanRun)
+    if scan_id:
+        query = query.where(models.ETLScanRun.id == uuid.UUID(scan_id))
+    else:
+        query = query.order_by(desc(models.ETLScanRun.started_at)).limit(1)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
 
-    except Exception as e:
-        logger.error(f"❌ ETL background scan failed: {e}")
-        _scan_state["error"] = str(e)
-        _scan_state["is_scanning"] = False
+
+async def _scan_status_payload(db: AsyncSession, scan_id: Optional[str] = None) -> dict:
+    run = await _latest_scan_run(db, scan_id)
+    if run is None:
+        return {"is_scanning": False, "scan": None}
+    progress = await scan_progress(db, run)
+    return {"is_scanning": progress["is_scanning"], "scan": progress}
 
 
 @router.post("/scan")
@@ -76,20 +82,34 @@ async def trigger_etl_scan(
     """
     Manually trigger an ETL scan of knowledge base documents.
 
-    Returns immediately and runs scan in background.
-    Use GET /scan/status to check progress.
+    Returns immediately and runs scan in background. The scan only queues
+    new or changed documents; ETL workers process the queued jobs.
+    Use GET /scan/status or GET /scan/stream to follow progress.
 
     Only superusers can trigger ETL scans.
     """
-    global _scan_state
-
-    # Check if scan is already running
-    if _scan_state["is_scanning"]:
-        return {
-            "status": "already_running",
-            "message": "ETL scan is already in progress",
-            "started_at": _scan_state["started_at"]
-        }
+    # Check if a scan is still listing storage (state shared by all workers)
+    run = await etl_queue.latest_unfinished_scan(db)
+    if run and run.status == "running":
+        last_update = run.updated_at or run.started_at
+        if last_update.tzinfo is None:
+            last_update = last_update.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - last_update < timedelta(seconds=ETL_JOB_LEASE_SECONDS):
+            return {
+                "status": "already_running",
+                "message": "ETL scan is already in progress",
+                "scan_id": str(run.id),
+                "started_at": run.started_at.isoformat() if run.started_at else None
+            }
+    if run is None:
+        # Record the run up front so clients can follow it right away;
+        # the background scan picks it up as the latest unfinished run
+        now = datetime.now(timezone.utc)
+        run = models.ETLScanRun(trigger="manual", status="running", started_at=now, updated_at=now)
+        db.add(run)
+        await db.commit()
+    # Otherwise an interrupted run (or one whose scanner died) exists;
+    # the background scan resumes it from its last committed page
 
     # Start background task
     background_tasks.add_task(_run_etl_scan_background)
@@ -97,33 +117,91 @@ async def trigger_etl_scan(
     return {
         "status": "started",
         "message": "ETL scan started in background",
-        "started_at": datetime.utcnow().isoformat()
+        "scan_id": str(run.id),
+        "started_at": run.started_at.isoformat() if run.started_at else None
     }
 
 
 @router.get("/scan/status")
 async def get_scan_status(
+    scan_id: Optional[str] = Query(None, description="Scan run ID (defaults to the latest scan)"),
+    db: AsyncSession = Depends(get_async_session),
     current_user: models.User = Depends(get_current_superuser)
 ):
     """
-    Get the current status of ETL scan.
+    Get the progress of the latest (or given) ETL scan run.
 
-    Returns whether a scan is running, when it started, and latest stats.
-    Frontend can poll this endpoint to show scan progress.
+    Includes live counters, per-stage throughput and latency percentiles,
+    the bottleneck stage and an ETA. Prefer GET /scan/stream for live updates.
 
     Only superusers can check scan status.
     """
-    global _scan_state
+    try:
+        payload = await _scan_status_payload(db, scan_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid scan_id")
 
+    scan = payload["scan"]
     return {
         "status": "success",
-        "is_scanning": _scan_state["is_scanning"],
-        "started_at": _scan_state["started_at"],
-        "stats": _scan_state["stats"],
-        "error": _scan_state["error"]
+        "is_scanning": payload["is_scanning"],
+        "started_at": scan["started_at"] if scan else None,
+        "stats": scan,
+        "error": scan["error"] if scan else None
     }
 
 
+@router.get("/scan/stream")
+async def stream_scan_progress(
+    request: Request,
+    scan_id: Optional[str] = Query(None, description="Scan run ID (defaults to the latest scan)"),
+    current_user: models.User = Depends(get_current_superuser)
+):
+    """
+    Stream ETL scan progress as Server-Sent Events.
+
+    Emits a "progress" event whenever the scan run changes and a final
+    "done" event once it is no longer running. Progress is read from the
+    database, so it includes work done by every ETL worker.
+
+    Only superusers can stream scan progress.
+    """
+    if scan_id:
+        try:
+            uuid.UUID(scan_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid scan_id")
+
+    async def event_stream():
+        last_data = None
+        idle_seconds = 0
+        while not await request.is_disconnected():
+            async with AsyncSessionLocal() as db:
+                payload = await _scan_status_payload(db, scan_id)
+            data = json.dumps(payload)
+
+            if not payload["is_scanning"]:
+                yield f"event: done\ndata: {data}\n\n"
+                return
+
+            if data != last_data:
+                yield f"event: progress\ndata: {data}\n\n"
+                last_data = data
+                idle_seconds = 0
+            elif idle_seconds >= SCAN_STREAM_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                idle_seconds = 0
+
+            await asyncio.sleep(SCAN_STREAM_INTERVAL_SECONDS)
+            idle_seconds += SCAN_STREAM_INTERVAL_SECONDS
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/pending-updates")
 async def get_pending_updates(
     status: str = Query("pending", description="Filter by status: pending, approved, rejected"),
@@ -152,11 +230,11 @@ async def get_pending_updates(
 
         # Enrich with document details
         response_data = []
-        for update in pending_updates:
+        for pending in pending_updates:
             # Get document info
             doc_result = await db.execute(
                 select(models.KnowledgeBaseDocument).where(
-                    models.KnowledgeBaseDocument.id == update.new_document_id
+                    models.KnowledgeBaseDocument.id == pending.new_document_id
                 )
             )
             doc = doc_result.scalar_one_or_none()
@@ -166,24 +244,24 @@ async def get_pending_updates(
 
             # Parse related documents
             related_docs = []
-            if update.related_documents:
+            if pending.related_documents:
                 try:
-                    related_docs = json.loads(update.related_documents)
+                    related_docs = json.loads(pending.related_documents)
                 except:
                     pass
 
             # Get reviewer info if reviewed
             reviewer_name = None
-            if update.reviewed_by:
+            if pending.reviewed_by:
                 user_result = await db.execute(
-                    select(models.User).where(models.User.id == update.reviewed_by)
+                    select(models.User).where(models.User.id == pending.reviewed_by)
                 )
                 reviewer = user_result.scalar_one_or_none()
                 if reviewer:
                     reviewer_name = reviewer.username
 
             response_data.append({
-                "id": str(update.id),
+                "id": str(pending.id),
                 "document": {
                     "id": str(doc.id),
                     "file_name": doc.file_name,
@@ -191,15 +269,15 @@ async def get_pending_updates(
                     "file_size": doc.file_size,
                     "uploaded_at": doc.uploaded_at.isoformat() if doc.uploaded_at else None
                 },
-                "update_type": update.update_type,
-                "similarity_score": update.similarity_score,
-                "reason": update.reason,
+                "update_type": pending.update_type,
+                "similarity_score": pending.similarity_score,
+                "reason": pending.reason,
                 "related_documents": related_docs,
-                "status": update.status,
+                "status": pending.status,
                 "reviewed_by": reviewer_name,
-                "reviewed_at": update.reviewed_at.isoformat() if update.reviewed_at else None,
-                "admin_comment": update.admin_comment,
-                "created_at": update.created_at.isoformat()
+                "reviewed_at": pending.reviewed_at.isoformat() if pending.reviewed_at else None,
+                "admin_comment": pending.admin_comment,
+                "created_at": pending.created_at.isoformat()
             })
 
         return {
@@ -292,36 +370,41 @@ async def get_processing_jobs(
     Only superusers can view processing jobs.
     """
     try:
-        query = select(models.DocumentProcessingJob).order_by(
-            desc(models.DocumentProcessingJob.created_at)
-        ).limit(limit).offset(offset)
+        # Document details come from the same query (outer join)
+        query = (
+            select(
+                models.DocumentProcessingJob,
+                models.KnowledgeBaseDocument.id,
+                models.KnowledgeBaseDocument.file_name,
+            )
+            .outerjoin(
+                models.KnowledgeBaseDocument,
+                models.KnowledgeBaseDocument.id == models.DocumentProcessingJob.document_id
+            )
+            .order_by(desc(models.DocumentProcessingJob.created_at))
+            .limit(limit)
+            .offset(offset)
+        )
 
         if status:
             query = query.where(models.DocumentProcessingJob.status == status)
 
         result = await db.execute(query)
-        jobs = result.scalars().all()
 
-        # Enrich with document details
         response_data = []
-        for job in jobs:
-            doc_result = await db.execute(
-                select(models.KnowledgeBaseDocument).where(
-                    models.KnowledgeBaseDocument.id == job.document_id
-                )
-            )
-            doc = doc_result.scalar_one_or_none()
-
+        for job, doc_id, doc_file_name in result.all():
             response_data.append({
                 "id": str(job.id),
                 "document": {
-                    "id": str(doc.id) if doc else None,
-                    "file_name": doc.file_name if doc else "Unknown"
+                    "id": str(doc_id) if doc_id else None,
+                    "file_name": doc_file_name if doc_id else (job.blob_path or "Unknown")
                 },
                 "status": job.status,
                 "chunks_processed": job.chunks_processed,
                 "vectors_created": job.vectors_created,
                 "error_message": job.error_message,
+                "attempts": job.attempts,
+                "next_attempt_at": job.next_attempt_at.isoformat() if job.next_attempt_at else None,
                 "created_at": job.created_at.isoformat(),
                 "started_at": job.started_at.isoformat() if job.started_at else None,
                 "completed_at": job.completed_at.isoformat() if job.completed_at else None
@@ -395,28 +478,29 @@ async def get_etl_stats(
     Only superusers can view ETL stats.
     """
     try:
-        # Count documents
-        total_docs_result = await db.execute(select(models.KnowledgeBaseDocument))
-        total_docs = len(total_docs_result.scalars().all())
-
-        vectorized_docs_result = await db.execute(
-            select(models.KnowledgeBaseDocument).where(
-                models.KnowledgeBaseDocument.is_vectorized == True
-            )
-        )
-        vectorized_docs = len(vectorized_docs_result.scalars().all())
-
-        # Count pending approvals
-        pending_approvals_result = await db.execute(
-            select(models.PendingKBUpdate).where(
-                models.PendingKBUpdate.status == "pending"
+        # Document and approval counts in one round trip
+        counts = await db.execute(
+            select(
+                select(func.count())
+                .select_from(models.KnowledgeBaseDocument)
+                .scalar_subquery(),
+                select(func.count())
+                .select_from(models.KnowledgeBaseDocument)
+                .where(models.KnowledgeBaseDocument.is_vectorized == True)
+                .scalar_subquery(),
+                select(func.count())
+                .select_from(models.PendingKBUpdate)
+                .where(models.PendingKBUpdate.status == "pending")
+                .scalar_subquery(),
             )
         )
-        pending_approvals = len(pending_approvals_result.scalars().all())
+        total_docs, vectorized_docs, pending_approvals = counts.one()
 
         # Count processing jobs by status
-        jobs_result = await db.execute(select(models.DocumentProcessingJob))
-        all_jobs = jobs_result.scalars().all()
+        jobs_result = await db.execute(
+            select(models.DocumentProcessingJob.status, func.count())
+            .group_by(models.DocumentProcessingJob.status)
+        )
 
         jobs_by_status = {
             "pending": 0,
@@ -424,8 +508,8 @@ async def get_etl_stats(
             "completed": 0,
             "failed": 0
         }
-        for job in all_jobs:
-            jobs_by_status[job.status] = jobs_by_status.get(job.status, 0) + 1
+        for job_status, count in jobs_result.all():
+            jobs_by_status[job_status] = count
 
         return {
             "status": "success",
@@ -456,32 +540,26 @@ async def reset_failed_documents(
     Only superusers can reset failed documents.
     """
     try:
-        # Find all failed processing jobs
-        failed_jobs_result = await db.execute(
-            select(models.DocumentProcessingJob).where(
-                models.DocumentProcessingJob.status == "failed"
-            )
+        # One UPDATE over every document with a failed processing job
+        failed_documents = select(models.DocumentProcessingJob.document_id).where(
+            models.DocumentProcessingJob.status == "failed",
+            models.DocumentProcessingJob.document_id.isnot(None)
         )
-        failed_jobs = failed_jobs_result.scalars().all()
-
-        reset_count = 0
-        for job in failed_jobs:
-            # Get the document
-            doc_result = await db.execute(
-                select(models.KnowledgeBaseDocument).where(
-                    models.KnowledgeBaseDocument.id == job.document_id
-                )
-            )
-            doc = doc_result.scalar_one_or_none()
-
-            if doc:
+        result = await db.execute(
+            update(models.KnowledgeBaseDocument)
+            .where(models.KnowledgeBaseDocument.id.in_(failed_documents))
+            .values(
                 # Mark as not vectorized so it will be reprocessed
-                doc.is_vectorized = False
-                doc.vectorized_at = None
-                doc.vector_count = 0
-                doc.qdrant_point_ids = None
-                reset_count += 1
-
+                is_vectorized=False,
+                vectorized_at=None,
+                vector_count=0,
+                # Re-check every chunk: points missing from Qdrant are embedded again,
+                # ones that exist are adopted. Point IDs are kept so stale vectors still get deleted
+                chunk_hashes=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        reset_count = result.rowcount
         await db.commit()
 
         return {
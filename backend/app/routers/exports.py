@@ -11,6 +11,7 @@ from app import crud as projects
 from app.config.database import get_async_session
 from app.auth.router import fastapi_users
 from app.utils import export, scope_engine
+from app.services import scope_store
 
 logger = logging.getLogger(__name__)
 current_active_user = fastapi_users.current_user(active=True)
@@ -27,16 +28,12 @@ async def _get_project(project_id: uuid.UUID, user_id: uuid.UUID, db: AsyncSessi
     return project
 
 
-async def _load_finalized_scope(project: models.Project) -> Optional[Dict[str, Any]]:
-    for f in project.files:
-        if f.file_name == "finalized_scope.json":
-            try:
-                blob_bytes = await azure_blob.download_bytes(f.file_path)
-                return json.loads(blob_bytes.decode("utf-8"))
-            except Exception as e:
-                logging.warning(f"Failed to load finalized scope from blob {f.file_path}: {e}")
-                return None
-    return None
+async def _load_finalized_scope(project: models.Project, db: AsyncSession) -> Optional[Dict[str, Any]]:
+    try:
+        return await scope_store.load_scope(db, project.id)
+    except Exception as e:
+        logging.warning(f"Failed to load finalized scope of project {project.id}: {e}")
+        return None
 
 
 def _safe_filename(name: str) -> str:
@@ -78,14 +75,12 @@ async def _fetch_related_case_study(project_id: uuid.UUID, db: AsyncSession) ->
         if not project:
             return None
 
-        # Load finalized_scope.json to get executive summary
-        blob_name = f"projects/{project_id}/finalized_scope.json"
+        # Load the finalized scope to get executive summary
         executive_summary = ""
         rfp_text = None
 
         try:
-            scope_bytes = await azure_blob.download_bytes(blob_name)
-            scope_data = json.loads(scope_bytes.decode("utf-8"))
+            scope_data = await scope_store.load_scope(db, project_id) or {}
             executive_summary = scope_data.get("project_summary", {}).get("executive_summary", "")
         except:
             pass
@@ -260,7 +255,7 @@ async def _fetch_related_case_study(project_id: uuid.UUID, db: AsyncSession) ->
 
 
 async def _ensure_scope(project: models.Project, db: AsyncSession) -> Dict[str, Any]:
-    scope = await _load_finalized_scope(project)
+    scope = await _load_finalized_scope(project, db)
     if not scope:
         raw_scope = await scope_engine.generate_project_scope(db, project)
         scope = export.generate_json_data(raw_scope or {})
@@ -283,7 +278,7 @@ async def preview_json_from_scope(
     current_user: models.User = Depends(current_active_user),
 ):
     project = await _get_project(project_id, current_user.id, db)
-    finalized = await _load_finalized_scope(project)
+    finalized = await _load_finalized_scope(project, db)
     if (not scope or len(scope) == 0) and finalized:
         # Add case study to finalized scope
         case_study = await _fetch_related_case_study(project_id, db)
@@ -307,7 +302,7 @@ async def preview_excel_from_scope(
     current_user: models.User = Depends(current_active_user),
 ):
     project = await _get_project(project_id, current_user.id, db)
-    finalized = await _load_finalized_scope(project)
+    finalized = await _load_finalized_scope(project, db)
     normalized = export.generate_json_data(scope or {}) if not finalized else finalized
 
     # Add case study to preview
@@ -335,7 +330,7 @@ async def preview_pdf_from_scope(
     try:
         logger.info(f" Generating PDF preview for project {project_id}")
         project = await _get_project(project_id, current_user.id, db)
-        finalized = await _load_finalized_scope(project)
+        finalized = await _load_finalized_scope(project, db)
         normalized = export.generate_json_data(scope or {}) if not finalized else finalized
 
         # Add case study to preview
@@ -461,7 +456,7 @@ async def preview_pptx_from_scope(
     current_user: models.User = Depends(current_active_user),
 ):
     project = await _get_project(project_id, current_user.id, db)
-    finalized = await _load_finalized_scope(project)
+    finalized = await _load_finalized_scope(project, db)
     normalized = export.generate_json_data(scope or {}) if not finalized else finalized
     
     # Add case study
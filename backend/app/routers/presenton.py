@@ -8,10 +8,9 @@ from app.config.database import get_async_session
 from app.auth.router import fastapi_users
 from app import models
 from app.utils.presenton_client import presenton_client
-from app.utils import azure_blob
+from app.services import scope_store
 from uuid import UUID
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -77,27 +76,17 @@ async def generate_with_presenton(
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Load finalized scope
-    result = await db.execute(
-        select(models.ProjectFile).filter(
-            models.ProjectFile.project_id == project_id,
-            models.ProjectFile.file_name == "finalized_scope.json"
-        )
-    )
-    scope_file = result.scalars().first()
-    
-    if not scope_file:
-        raise HTTPException(
-            status_code=404,
-            detail="No finalized scope found. Please finalize the scope first."
-        )
-    
-    # Download and parse scope data
     try:
-        scope_bytes = await azure_blob.download_bytes(scope_file.file_path)
-        scope_data = json.loads(scope_bytes.decode('utf-8'))
+        scope_data = await scope_store.load_scope(db, project_id)
     except Exception as e:
         logger.error(f"Failed to load scope data: {e}")
         raise HTTPException(status_code=500, detail="Failed to load scope data")
+
+    if not scope_data:
+        raise HTTPException(
+            status_code=404,
+            detail="No finalized scope found. Please finalize the scope first."
+        )
     
     # Check Presenton availability
     if not await presenton_client.health_check():
@@ -2,8 +2,9 @@ import uuid, json, logging
 from typing import List, Optional, Dict, Any
 
 from fastapi import (
-    APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+    APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response, status
 )
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -11,6 +12,7 @@ from app import schemas, models
 from app import crud as projects
 from app.config.database import get_async_session
 from app.utils import scope_engine, azure_blob
+from app.services import scope_store, upload_sessions
 from app.auth.router import fastapi_users
 
 get_current_active_user = fastapi_users.current_user(active=True)
@@ -22,17 +24,18 @@ router = APIRouter(prefix="/api/projects", tags=["Projects"])
 # LIST ALL PROJECTS
 @router.get("", response_model=List[schemas.Project])
 async def list_projects(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (all projects when omitted)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    include_files: bool = Query(True, description="Include each project's file list"),
     db: AsyncSession = Depends(get_async_session),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    items = await projects.list_projects(db, owner_id=current_user.id)
-
-    for p in items:
-        p.has_finalized_scope = await projects.has_finalized_scope(db, p.id)
-
-        if p.company_id:
-            await db.refresh(p, attribute_names=["company"])
-
+    items, next_cursor = await projects.list_projects(
+        db, owner_id=current_user.id, limit=limit, cursor=cursor, include_files=include_files
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return items
 
 
@@ -74,8 +77,8 @@ async def create_project(
 
     if company_id:
         from app.utils import ratecards
-        sigmoid = await ratecards.get_or_create_sigmoid_company(db)
-        if company_id != sigmoid.id:
+        sigmoid_id = await ratecards.get_sigmoid_company_id(db)
+        if company_id != sigmoid_id:
             result = await db.execute(
                 select(models.Company).filter(
                     models.Company.id == company_id,
@@ -105,6 +108,37 @@ async def create_project(
     return db_project
 
 
+# DIRECT UPLOADS
+@router.post("/{project_id}/upload-sessions", status_code=status.HTTP_201_CREATED)
+async def create_project_upload_session(
+    project_id: uuid.UUID,
+    request: schemas.UploadSessionCreate,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Write-only SAS URLs to upload project files straight to storage."""
+    project = await projects.get_project(db, project_id=project_id, owner_id=current_user.id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return await upload_sessions.create_session(
+        db, current_user.id, "projects", request.files, project_id=project_id
+    )
+
+
+@router.post("/{project_id}/upload-sessions/{session_id}/complete")
+async def complete_project_upload_session(
+    project_id: uuid.UUID,
+    session_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Register the uploaded blobs of a session as project files."""
+    session = await upload_sessions.get_session(db, session_id, current_user.id)
+    if session.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return await upload_sessions.complete_session(db, session)
+
+
 # GET PROJECT DETAILS
 @router.get("/{project_id}", response_model=schemas.Project)
 async def get_project(
@@ -230,32 +264,56 @@ async def finalize_project_scope(
 @router.get("/{project_id}/finalized_scope")
 async def get_finalized_scope(
     project_id: uuid.UUID,
+    request: Request,
     db: AsyncSession = Depends(get_async_session),
     current_user: models.User = Depends(get_current_active_user),
 ):
+    """
+    Latest finalized scope, with its content hash as ETag. Clients sending
+    If-None-Match get 304 without the scope being loaded.
+    """
     db_project = await projects.get_project(db, project_id=project_id, owner_id=current_user.id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    result = await db.execute(
-        select(models.ProjectFile).filter(
-            models.ProjectFile.project_id == project_id,
-            models.ProjectFile.file_name == "finalized_scope.json"
-        )
-    )
-    db_file = result.scalars().first()
-
-    if not db_file:
-        return None 
-
     try:
-        blob_bytes = await azure_blob.download_bytes(db_file.file_path)
-        scope_data = json.loads(blob_bytes.decode("utf-8"))
-        return scope_data
+        version = await scope_store.get_latest_version(db, project_id, with_scope=False)
     except Exception as e:
         logger.error(f"Failed to fetch finalized scope: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch finalized scope")
 
+    if not version:
+        return None
+
+    headers = {
+        "ETag": scope_store.etag(version),
+        "X-Scope-Version": str(version.version),
+        # Browsers revalidate with If-None-Match instead of reusing a stale copy
+        "Cache-Control": "private, no-cache",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    version = await scope_store.get_latest_version(db, project_id)
+    return JSONResponse(version.scope, headers=headers)
+
+
+# Finalized Scope Version (cheap change check)
+@router.get("/{project_id}/finalized_scope/version")
+async def get_finalized_scope_version(
+    project_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    db_project = await projects.get_project(db, project_id=project_id, owner_id=current_user.id)
+    if not db_project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    version = await scope_store.get_latest_version(db, project_id, with_scope=False)
+    if not version:
+        raise HTTPException(status_code=404, detail="No finalized scope found")
+    return scope_store.version_info(version)
+
 # ==========================================================
 # 🔁 Regenerate Scope with User Instructions
 # ==========================================================
@@ -443,21 +501,15 @@ async def get_related_case_study(
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Load finalized_scope.json from blob storage
-    blob_name = f"projects/{project_id}/finalized_scope.json"
-
     try:
-        # Check if scope exists
-        if not await azure_blob.blob_exists(blob_name):
+        # Load the finalized scope
+        scope_data = await scope_store.load_scope(db, project_id)
+        if not scope_data:
             raise HTTPException(
                 status_code=404,
                 detail="Project scope not generated yet. Please generate project scope first."
             )
 
-        # Download and parse scope
-        scope_bytes = await azure_blob.download_bytes(blob_name)
-        scope_data = json.loads(scope_bytes.decode("utf-8"))
-
         # Extract executive summary from project_summary
         project_summary = scope_data.get("project_summary", {})
         executive_summary = project_summary.get("executive_summary", "")
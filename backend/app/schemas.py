@@ -97,6 +97,12 @@ class ProjectFile(BaseModel):
         from_attributes = True
 
 
+# DIRECT UPLOAD SCHEMAS
+class UploadSessionCreate(BaseModel):
+    files: List[str] = Field(..., min_length=1)  # File names, relative paths for folder uploads
+    folder: str = ""  # Knowledge base destination folder
+
+
 #  PROJECT SCHEMAS
 class ProjectBase(BaseModel):
     name: Optional[str] = None
@@ -121,6 +127,7 @@ class Project(ProjectBase):
     created_at: datetime
     updated_at: Optional[datetime]
     has_finalized_scope: bool = False
+    precompute_status: Optional[str] = None
 
     class Config:
         from_attributes = True
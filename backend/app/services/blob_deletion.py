@@ -0,0 +1,280 @@
+"""
+Bulk Folder Deletion
+
+Deletes a storage folder together with the Qdrant vectors and database
+records of the knowledge base documents inside it.
+
+Vectors are removed with MatchAny filter deletes over batches of document
+IDs, grouped by collection, instead of one filtered delete per document.
+The vector deletes run concurrently with the blob batch deletes. Folders
+holding more than BULK_DELETE_INLINE_LIMIT documents are deleted by a
+background task tracked in blob_deletion_jobs; jobs left unfinished by a
+restart are resumed at startup.
+
+Database records are only removed for documents whose vectors and blobs
+are gone, so a failed deletion can simply be retried.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.config import QDRANT_COLLECTION, CASE_STUDY_COLLECTION
+from app.config.database import AsyncSessionLocal
+from app.utils import azure_blob
+from app.utils.ai_clients import get_qdrant_client
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DELETE_BATCH = 500  # Document IDs per MatchAny filter
+
+# Background deletions keep a reference so the task is not garbage collected
+_running_jobs: set = set()
+
+
+class VectorDeletionError(Exception):
+    """Vectors of some documents could not be deleted (the rest were)."""
+
+    def __init__(self, failed_ids: List[str], deleted_ids: List[str], error: Exception):
+        super().__init__(f"Failed to delete vectors of {len(failed_ids)} document(s): {error}")
+        self.failed_ids = failed_ids
+        self.deleted_ids = deleted_ids
+
+
+def _collection_for(document_type: Optional[str]) -> str:
+    return CASE_STUDY_COLLECTION if document_type == "case_study" else QDRANT_COLLECTION
+
+
+def delete_document_vectors(documents: Iterable[Tuple[Any, Optional[str]]]) -> int:
+    """
+    Delete the vectors of many KB documents.
+
+    Args:
+        documents: (document_id, document_type) pairs
+
+    Returns:
+        Number of documents whose vectors were deleted
+
+    Raises:
+        VectorDeletionError: A batch failed; every other batch was still attempted
+    """
+    from qdrant_client import models as models_qdrant
+
+    by_collection: Dict[str, List[str]] = {}
+    for document_id, document_type in documents:
+        by_collection.setdefault(_collection_for(document_type), []).append(str(document_id))
+    if not by_collection:
+        return 0
+
+    qdrant_client = get_qdrant_client()
+    deleted_ids: List[str] = []
+    failed_ids: List[str] = []
+    last_error: Optional[Exception] = None
+    for collection, document_ids in by_collection.items():
+        for start in range(0, len(document_ids), VECTOR_DELETE_BATCH):
+            batch = document_ids[start:start + VECTOR_DELETE_BATCH]
+            try:
+                qdrant_client.delete(
+                    collection_name=collection,
+                    points_selector=models_qdrant.FilterSelector(
+                        filter=models_qdrant.Filter(
+                            must=[
+                                models_qdrant.FieldCondition(
+                                    key="document_id",
+                                    match=models_qdrant.MatchAny(any=batch)
+                                )
+                            ]
+                        )
+                    )
+                )
+                deleted_ids.extend(batch)
+            except Exception as e:
+                failed_ids.extend(batch)
+                last_error = e
+                logger.warning(f"⚠️ Failed to delete vectors for {len(batch)} documents from {collection}: {e}")
+
+    if failed_ids:
+        raise VectorDeletionError(failed_ids, deleted_ids, last_error)
+    logger.info(f"✅ Deleted vectors for {len(deleted_ids)} documents")
+    return len(deleted_ids)
+
+
+async def delete_document_vectors_async(documents: Iterable[Tuple[Any, Optional[str]]]) -> int:
+    """delete_document_vectors off the event loop (the Qdrant client is synchronous)."""
+    return await asyncio.to_thread(delete_document_vectors, list(documents))
+
+
+def _kb_prefix(folder_name: str) -> str:
+    # folder_name already includes the base in the path
+    return f"{folder_name.strip('/')}/"
+
+
+async def count_kb_documents(db: AsyncSession, folder_name: str) -> int:
+    result = await db.execute(
+        select(func.count(models.KnowledgeBaseDocument.id)).where(
+            models.KnowledgeBaseDocument.blob_path.like(f"{_kb_prefix(folder_name)}%")
+        )
+    )
+    return result.scalar_one()
+
+
+async def delete_folder(db: AsyncSession, folder_name: str, base: str) -> Dict:
+    """
+    Delete a folder's blobs and, for the knowledge base, its documents' vectors and records.
+
+    If either side fails, the error is raised after the database is brought
+    in line with what was deleted: records of documents whose vectors are
+    gone are removed if the blobs were deleted, or kept and marked not
+    vectorized if they were not. Records whose vectors remain are kept.
+
+    Returns:
+        Dict with the deleted blob paths and the number of KB documents removed
+    """
+    documents = []
+    if base == "knowledge_base":
+        prefix = _kb_prefix(folder_name)
+        result = await db.execute(
+            select(models.KnowledgeBaseDocument.id, models.KnowledgeBaseDocument.document_type).where(
+                models.KnowledgeBaseDocument.blob_path.like(f"{prefix}%")
+            )
+        )
+        documents = result.all()
+        logger.info(f"🗑️ Deleting folder {folder_name} with {len(documents)} KB documents")
+
+    blob_result, vector_result = await asyncio.gather(
+        azure_blob.delete_folder(folder_name, base),
+        delete_document_vectors_async(documents),
+        return_exceptions=True
+    )
+    blob_error = blob_result if isinstance(blob_result, BaseException) else None
+    vector_error = vector_result if isinstance(vector_result, BaseException) else None
+
+    if isinstance(vector_error, VectorDeletionError):
+        vectors_deleted = vector_error.deleted_ids
+    elif vector_error is not None:
+        vectors_deleted = []
+    else:
+        vectors_deleted = [str(document_id) for document_id, _ in documents]
+
+    documents_deleted = 0
+    if vectors_deleted:
+        if blob_error is None and vector_error is None:
+            await db.execute(
+                delete(models.KnowledgeBaseDocument).where(
+                    models.KnowledgeBaseDocument.blob_path.like(f"{prefix}%")
+                )
+            )
+            documents_deleted = len(documents)
+        else:
+            for start in range(0, len(vectors_deleted), VECTOR_DELETE_BATCH):
+                batch = [uuid.UUID(document_id) for document_id in vectors_deleted[start:start + VECTOR_DELETE_BATCH]]
+                where = models.KnowledgeBaseDocument.id.in_(batch)
+                if blob_error is None:
+                    await db.execute(delete(models.KnowledgeBaseDocument).where(where))
+                    documents_deleted += len(batch)
+                else:
+                    # Blobs may still exist: keep the records, without the vectors they pointed to
+                    await db.execute(
+                        update(models.KnowledgeBaseDocument)
+                        .where(where)
+                        .values(
+                            is_vectorized=False,
+                            vectorized_at=None,
+                            vector_count=0,
+                            qdrant_point_ids=None,
+                            chunk_hashes=None,
+                        )
+                    )
+        await db.commit()
+        if documents_deleted:
+            logger.info(f"✅ Deleted {documents_deleted} KB document records from database")
+
+    if blob_error is not None:
+        raise blob_error
+    if vector_error is not None:
+        raise vector_error
+    return {"deleted": blob_result, "documents_deleted": documents_deleted}
+
+
+async def start_deletion_job(
+    db: AsyncSession,
+    folder_name: str,
+    base: str,
+    documents_total: int = 0
+) -> models.BlobDeletionJob:
+    """Record a deletion job and run it in the background."""
+    job = models.BlobDeletionJob(base=base, folder=folder_name, documents_total=documents_total)
+    db.add(job)
+    await db.commit()
+
+    _schedule(job.id)
+    logger.info(f"🗑️ Started background deletion {job.id} for {base}/{folder_name}")
+    return job
+
+
+def _schedule(job_id: uuid.UUID) -> None:
+    task = asyncio.create_task(_run_deletion_job(job_id))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+
+
+async def schedule_unfinished_deletions() -> int:
+    """Restart deletion jobs left pending or running by a previous process (run at startup)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.BlobDeletionJob.id).where(models.BlobDeletionJob.status.in_(["pending", "running"]))
+        )
+        job_ids = list(result.scalars().all())
+
+    # Deleting a folder again is harmless: whatever is already gone is skipped
+    for job_id in job_ids:
+        _schedule(job_id)
+    if job_ids:
+        logger.info(f"🗑️ Resuming {len(job_ids)} unfinished folder deletion(s)")
+    return len(job_ids)
+
+
+async def _run_deletion_job(job_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(models.BlobDeletionJob, job_id)
+        if job is None:
+            return
+        job.status = "running"
+        await db.commit()
+
+        try:
+            result = await delete_folder(db, job.folder, job.base)
+            job.status = "completed"
+            job.documents_deleted = result["documents_deleted"]
+            job.blobs_deleted = len(result["deleted"])
+            logger.info(f"✅ Background deletion {job_id} finished: {job.blobs_deleted} blobs")
+        except Exception as e:
+            await db.rollback()
+            job = await db.get(models.BlobDeletionJob, job_id)
+            job.status = "failed"
+            job.error_message = str(e)
+            logger.error(f"❌ Background deletion {job_id} failed: {e}")
+
+        job.completed_at = datetime.now(timezone.utc)
+        await db.commit()
+
+
+def deletion_job_status(job: models.BlobDeletionJob) -> Dict:
+    return {
+        "job_id": str(job.id),
+        "base": job.base,
+        "folder": job.folder,
+        "status": job.status,
+        "documents_total": job.documents_total,
+        "documents_deleted": job.documents_deleted,
+        "blobs_deleted": job.blobs_deleted,
+        "error": job.error_message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+    }
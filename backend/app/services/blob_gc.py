@@ -0,0 +1,258 @@
+"""
+Blob Garbage Collector
+
+Deleting a project or project file used to delete its blobs from inside
+the SQLAlchemy flush (fire-and-forget tasks or a nested event loop): the
+transaction waited on storage, tasks were lost on shutdown and deleting
+all of a user's projects started one unbounded folder deletion each.
+
+The after_delete listeners in app.models now only insert the blob path
+(or folder prefix) into blob_deletion_outbox, in the same transaction as
+the delete, so a rolled back delete leaves the blobs alone and a
+committed one is never forgotten. This collector drains the outbox:
+
+1. Claim up to BLOB_GC_BATCH_SIZE due rows (FOR UPDATE SKIP LOCKED, so
+   several API/worker processes can collect side by side)
+2. Delete folder prefixes and single blobs (Azure batch deletes of up to
+   256 blobs), at most BLOB_GC_CONCURRENCY storage operations at a time
+3. Remove the rows that succeeded; reschedule failures with exponential
+   backoff until BLOB_GC_MAX_ATTEMPTS, then mark them failed
+
+Pending/failed counts and the oldest pending row are exposed by
+outbox_stats() together with this process's counters.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.config import (
+    BLOB_GC_BATCH_SIZE,
+    BLOB_GC_CONCURRENCY,
+    BLOB_GC_MAX_ATTEMPTS,
+    BLOB_GC_POLL_SECONDS,
+    BLOB_GC_RETRY_BASE_SECONDS,
+)
+from app.config.database import AsyncSessionLocal
+from app.utils import azure_blob
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 3600
+
+# Counters of this process since startup
+_counters: Dict[str, int] = {
+    "rounds": 0,
+    "blobs_deleted": 0,
+    "prefixes_deleted": 0,
+    "failed_attempts": 0,
+    "given_up": 0,
+}
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2x base, 4x base, ... capped at one hour."""
+    seconds = BLOB_GC_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, MAX_RETRY_DELAY_SECONDS))
+
+
+async def _delete_prefix(prefix: str) -> Optional[str]:
+    """Delete everything under a folder prefix; returns an error or None."""
+    try:
+        await azure_blob.delete_folder(prefix)
+        # Listing errors raise; blobs whose batch sub-request failed are still listed
+        async for page, _ in azure_blob.list_blob_pages("", prefix, page_size=1):
+            if page:
+                return f"Blobs remain under {prefix} after deletion"
+        return None
+    except Exception as e:
+        return str(e)
+
+
+async def _delete_paths(paths: List[str]) -> Dict[str, Optional[str]]:
+    """Batch delete blobs; a blob that no longer exists counts as deleted."""
+    try:
+        deleted = set(await azure_blob.delete_blobs(paths))
+    except Exception as e:
+        return {path: str(e) for path in paths}
+
+    errors: Dict[str, Optional[str]] = {path: None for path in deleted}
+    for path in paths:
+        if path in deleted:
+            continue
+        try:
+            # Batch sub-requests fail with 404 for blobs that are already gone
+            exists = await azure_blob.blob_exists(path)
+            errors[path] = "Blob deletion failed" if exists else None
+        except Exception as e:
+            errors[path] = str(e)
+    return errors
+
+
+async def _run_deletions(rows: List[models.BlobDeletionOutbox]) -> Dict[str, Optional[str]]:
+    """Delete the blobs of claimed rows; returns {row path: error or None}."""
+    semaphore = asyncio.Semaphore(BLOB_GC_CONCURRENCY)
+    prefixes = sorted({row.path for row in rows if row.is_prefix})
+
+    async def _bounded(coro):
+        async with semaphore:
+            return await coro
+
+    prefix_errors = await asyncio.gather(*(_bounded(_delete_prefix(p)) for p in prefixes))
+    results: Dict[str, Optional[str]] = dict(zip(prefixes, prefix_errors))
+    deleted_prefixes = [p for p, error in results.items() if error is None]
+
+    # Files inside a folder deleted in this round need no request of their own
+    paths = sorted({
+        row.path for row in rows
+        if not row.is_prefix and not any(row.path.startswith(p) for p in deleted_prefixes)
+    })
+    covered = {row.path for row in rows if not row.is_prefix} - set(paths)
+    results.update({path: None for path in covered})
+
+    batches = [
+        paths[i:i + azure_blob.BLOB_DELETE_BATCH]
+        for i in range(0, len(paths), azure_blob.BLOB_DELETE_BATCH)
+    ]
+    for batch_errors in await asyncio.gather(*(_bounded(_delete_paths(b)) for b in batches)):
+        results.update(batch_errors)
+    return results
+
+
+async def _claim(db: AsyncSession, limit: int) -> List[models.BlobDeletionOutbox]:
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(models.BlobDeletionOutbox)
+        .where(
+            models.BlobDeletionOutbox.status == "pending",
+            models.BlobDeletionOutbox.next_attempt_at <= now,
+        )
+        .order_by(models.BlobDeletionOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list(result.scalars().all())
+
+
+async def collect_once(limit: int = BLOB_GC_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Process one batch of due outbox rows.
+
+    The claimed rows stay locked until their outcome is committed, so a
+    crash mid-round just leaves them pending for the next collector.
+
+    Returns:
+        (rows processed, rows that failed this attempt)
+    """
+    async with AsyncSessionLocal() as db:
+        rows = await _claim(db, limit)
+        if not rows:
+            await db.rollback()
+            return 0, 0
+
+        results = await _run_deletions(rows)
+        now = datetime.now(timezone.utc)
+
+        done_ids = []
+        failed = 0
+        for row in rows:
+            error = results.get(row.path)
+            if error is None:
+                done_ids.append(row.id)
+                _counters["prefixes_deleted" if row.is_prefix else "blobs_deleted"] += 1
+                continue
+
+            failed += 1
+            row.attempts += 1
+            row.last_error = error[:2000]
+            _counters["failed_attempts"] += 1
+            if row.attempts >= BLOB_GC_MAX_ATTEMPTS:
+                row.status = "failed"
+                _counters["given_up"] += 1
+                logger.error(f"❌ Giving up deleting {row.path} after {row.attempts} attempts: {error}")
+            else:
+                row.next_attempt_at = now + _retry_delay(row.attempts)
+                logger.warning(
+                    f"⚠️ Blob deletion of {row.path} failed (attempt {row.attempts}/{BLOB_GC_MAX_ATTEMPTS}): {error}"
+                )
+
+        if done_ids:
+            await db.execute(
+                delete(models.BlobDeletionOutbox).where(models.BlobDeletionOutbox.id.in_(done_ids))
+            )
+        await db.commit()
+
+    _counters["rounds"] += 1
+    logger.info(f"🧹 Blob collector: {len(rows) - failed} deleted, {failed} failed")
+    return len(rows), failed
+
+
+async def _sleep_until_stopped(stop: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_collector(stop: asyncio.Event) -> None:
+    """Drain the outbox until stopped, polling every BLOB_GC_POLL_SECONDS when idle."""
+    logger.info("🤖 Blob collector started")
+
+    while not stop.is_set():
+        try:
+            processed, _ = await collect_once()
+        except Exception as e:
+            logger.error(f"❌ Blob collector error: {e}")
+            processed = 0
+
+        # A full batch means more rows are probably due
+        if processed < BLOB_GC_BATCH_SIZE:
+            await _sleep_until_stopped(stop, BLOB_GC_POLL_SECONDS)
+
+    logger.info("🛑 Blob collector stopped")
+
+
+def start_collector_task(stop: asyncio.Event) -> asyncio.Task:
+    return asyncio.create_task(run_collector(stop))
+
+
+async def outbox_stats(db: AsyncSession) -> Dict:
+    """Outbox backlog (shared by all processes) and this process's counters."""
+    result = await db.execute(
+        select(
+            models.BlobDeletionOutbox.status,
+            func.count(),
+            func.min(models.BlobDeletionOutbox.created_at),
+        ).group_by(models.BlobDeletionOutbox.status)
+    )
+    by_status = {status: (count, oldest) for status, count, oldest in result.all()}
+    pending, oldest_pending = by_status.get("pending", (0, None))
+
+    oldest_age = None
+    if oldest_pending is not None:
+        if oldest_pending.tzinfo is None:
+            oldest_pending = oldest_pending.replace(tzinfo=timezone.utc)
+        oldest_age = round((datetime.now(timezone.utc) - oldest_pending).total_seconds(), 1)
+
+    return {
+        "pending": pending,
+        "failed": by_status.get("failed", (0, None))[0],
+        "oldest_pending_seconds": oldest_age,
+        "process": dict(_counters),
+    }
+
+
+async def retry_failed(db: AsyncSession) -> int:
+    """Put rows that exhausted their attempts back in the queue."""
+    result = await db.execute(
+        update(models.BlobDeletionOutbox)
+        .where(models.BlobDeletionOutbox.status == "failed")
+        .values(status="pending", attempts=0, next_attempt_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,224 @@
+"""
+ETL Progress and Throughput Metrics
+
+Workers time each pipeline stage of a job (download, extract, dedupe,
+embed, upsert) and roll the job's counters into its scan run with atomic
+UPDATEs, so progress is shared by every worker process and survives
+restarts. Percentiles are computed over a rolling window of recently
+finished jobs.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+STAGES = ("download", "extract", "dedupe", "embed", "upsert")
+
+# Counter each stage's throughput is measured in
+STAGE_UNITS = {
+    "list": ("files_listed", "files/s"),
+    "download": ("bytes_downloaded", "bytes/s"),
+    "extract": ("docs_extracted", "docs/s"),
+    "dedupe": ("docs_extracted", "docs/s"),
+    "embed": ("chunks_embedded", "chunks/s"),
+    "upsert": ("vectors_upserted", "vectors/s"),
+}
+
+COUNTERS = ("bytes_downloaded", "docs_extracted", "chunks_embedded", "vectors_upserted")
+
+PERCENTILE_WINDOW = 500  # Most recent jobs used for latency percentiles
+
+
+class StageMetrics:
+    """Stage timings and counters collected while processing one job."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {name: 0 for name in COUNTERS}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] += amount
+
+
+async def record_job_outcome(
+    db: AsyncSession,
+    job: models.DocumentProcessingJob,
+    metrics: Optional[StageMetrics] = None
+) -> None:
+    """
+    Store the job's stage timings and add its counters to its scan run.
+
+    Runs in the caller's transaction, so the counters commit together
+    with the job's final status.
+    """
+    if metrics is not None:
+        job.stage_metrics = json.dumps({
+            "seconds": {k: round(v, 4) for k, v in metrics.timings.items()},
+            "counts": metrics.counters,
+        })
+
+    if job.scan_run_id is None or job.status not in ("completed", "failed"):
+        return
+
+    run = models.ETLScanRun
+    values = {
+        "docs_processed": run.docs_processed + (1 if job.status == "completed" else 0),
+        "docs_failed": run.docs_failed + (1 if job.status == "failed" else 0),
+        "updated_at": datetime.now(timezone.utc),
+    }
+    if metrics is not None:
+        for name, amount in metrics.counters.items():
+            if amount:
+                values[name] = getattr(run, name) + amount
+
+    await db.execute(update(run).where(run.id == job.scan_run_id).values(**values))
+
+
+async def finish_scan_run_if_done(db: AsyncSession, scan_run_id) -> None:
+    """Mark a scan run completed once listing is done and none of its jobs are outstanding."""
+    if scan_run_id is None:
+        return
+
+    job = models.DocumentProcessingJob
+    outstanding = exists().where(
+        and_(job.scan_run_id == scan_run_id, job.status.in_(("pending", "processing")))
+    )
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(models.ETLScanRun)
+        .where(
+            models.ETLScanRun.id == scan_run_id,
+            models.ETLScanRun.status == "processing",
+            ~outstanding
+        )
+        .values(status="completed", completed_at=now, updated_at=now)
+    )
+    await db.commit()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def scan_progress(db: AsyncSession, run: models.ETLScanRun) -> Dict:
+    """
+    Build the live progress report for a scan run.
+
+    Includes raw counters, per-stage throughput and p50/p95 latency,
+    the current bottleneck stage and an ETA for the outstanding jobs.
+    """
+    result = await db.execute(
+        select(models.DocumentProcessingJob.stage_metrics)
+        .where(
+            models.DocumentProcessingJob.scan_run_id == run.id,
+            models.DocumentProcessingJob.stage_metrics.isnot(None)
+        )
+        .order_by(models.DocumentProcessingJob.completed_at.desc())
+        .limit(PERCENTILE_WINDOW)
+    )
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    window_counts: Dict[str, int] = {name: 0 for name in COUNTERS}
+    sampled_jobs = 0
+    for raw in result.scalars().all():
+        job_metrics = json.loads(raw)
+        sampled_jobs += 1
+        for stage, seconds in job_metrics.get("seconds", {}).items():
+            if stage in samples:
+                samples[stage].append(seconds)
+        for name, amount in job_metrics.get("counts", {}).items():
+            if name in window_counts:
+                window_counts[name] += amount
+
+    counters = {
+        "files_listed": run.files_listed,
+        "bytes_downloaded": run.bytes_downloaded,
+        "docs_extracted": run.docs_extracted,
+        "chunks_embedded": run.chunks_embedded,
+        "vectors_upserted": run.vectors_upserted,
+    }
+
+    stages = {
+        "list": {
+            "samples": run.pages_listed,
+            "total_seconds": round(run.listing_seconds or 0.0, 3),
+        }
+    }
+    for stage in STAGES:
+        values = sorted(samples[stage])
+        stages[stage] = {
+            "samples": len(values),
+            "total_seconds": round(sum(values), 3),
+            "p50_seconds": round(_percentile(values, 50), 3),
+            "p95_seconds": round(_percentile(values, 95), 3),
+        }
+
+    # Throughput over the sampled window (listing uses the whole run)
+    for stage, data in stages.items():
+        counter, unit = STAGE_UNITS[stage]
+        items = counters[counter] if stage == "list" else window_counts[counter]
+        data["throughput"] = round(items / data["total_seconds"], 2) if data["total_seconds"] else 0.0
+        data["throughput_unit"] = unit
+
+    # The stage that took the most time across the window
+    bottleneck = max(STAGES, key=lambda s: stages[s]["total_seconds"]) if sampled_jobs else None
+
+    # ETA from the observed job completion rate since the scan started
+    finished = run.docs_processed + run.docs_failed
+    remaining = max(run.queued - finished, 0)
+    eta_seconds = None
+    started_at = _as_utc(run.started_at)
+    if remaining and finished and started_at:
+        elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+        if elapsed > 0:
+            eta_seconds = round(remaining / (finished / elapsed))
+    elif not remaining and run.status == "completed":
+        eta_seconds = 0
+
+    return {
+        "scan_id": str(run.id),
+        "status": run.status,
+        "trigger": run.trigger,
+        "is_scanning": run.status in ("running", "processing"),
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "updated_at": run.updated_at.isoformat() if run.updated_at else None,
+        "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+        "error": run.error_message,
+        "counters": {
+            **counters,
+            "changed": run.changed,
+            "unchanged": run.unchanged,
+            "pending_approval": run.pending_approval,
+            "queued": run.queued,
+            "docs_processed": run.docs_processed,
+            "docs_failed": run.docs_failed,
+            "remaining": remaining,
+        },
+        "stages": stages,
+        "bottleneck": bottleneck,
+        "eta_seconds": eta_seconds,
+    }
@@ -3,9 +3,10 @@ ETL Pipeline Service for Knowledge Base Documents
 
 This service monitors Azure Blob Storage for new knowledge base documents,
 converts them to vectors, stores in Qdrant, and manages admin approvals for updates.
+Documents are processed one at a time through the queue in app.services.etl_queue.
 
 Architecture:
-1. Monitor blob storage for new uploads
+1. Monitor blob storage for new uploads (queued as processing jobs)
 2. Extract text and chunk documents
 3. Generate embeddings using Ollama
 4. Check similarity with existing KB documents
@@ -18,31 +19,36 @@ import hashlib
 import json
 import logging
 import io
-from typing import List, Dict, Tuple, Optional
+import uuid
+from typing import List, Dict, Set, Tuple, Optional
 from datetime import datetime, timezone
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from qdrant_client import models as models_qdrant
 
 from app import models
+from app.config.database import AsyncSessionLocal
 from app.utils import azure_blob
 from app.utils.scope_engine import extract_text_from_file
 from app.utils.ai_clients import embed_text_ollama, get_qdrant_client
 from app.utils.case_study_parser import parse_case_study_from_ppt, extract_all_text_from_ppt
+from app.utils.chunking import chunk_text
+from app.services.etl_metrics import StageMetrics
+from app.services.blob_deletion import delete_document_vectors_async
 from app.config.config import QDRANT_COLLECTION, CASE_STUDY_COLLECTION
 
 logger = logging.getLogger(__name__)
 
+MINHASH_BACKFILL_BATCH = 20  # Documents signed per backfill transaction
+
 
 class ETLPipeline:
     """ETL Pipeline for Knowledge Base documents."""
 
     def __init__(self):
         self.qdrant_client = get_qdrant_client()
-        self.chunk_size = 1000  # Characters per chunk
-        self.overlap = 200  # Overlap between chunks
-        self.similarity_threshold = 0.85  # Threshold for detecting updates
+        self.duplicate_threshold = 0.9  # Jaccard similarity treated as a duplicate
+        self.update_threshold = 0.5  # Jaccard similarity treated as an update
 
     def _is_case_study_document(self, blob_path: str, file_name: str) -> bool:
         """
@@ -70,72 +76,124 @@ class ETLPipeline:
 
         return False
 
-    async def scan_and_process_new_documents(self, db: AsyncSession) -> Dict[str, int]:
+    async def filter_changed_blobs(
+        self,
+        db: AsyncSession,
+        blobs: List[Dict]
+    ) -> Tuple[List[str], Dict[str, int]]:
         """
-        Scan blob storage for new KB documents and process them.
+        Find the blobs in one listing page that need processing.
+
+        Uses blob size and last-modified time only, so unchanged documents
+        are never downloaded. Processing itself happens in queued jobs.
 
         Returns:
-            Dict with counts of new, updated, and failed documents
+            Tuple of (blob paths to enqueue, page counts)
         """
-        logger.info("🔍 Starting ETL scan for new KB documents...")
-
-        stats = {
-            "scanned": 0,
-            "new": 0,
-            "updated": 0,
-            "failed": 0,
+        counts = {
+            "changed": 0,
+            "unchanged": 0,
             "pending_approval": 0
         }
+        paths = [blob["path"] for blob in blobs]
+        if not paths:
+            return [], counts
 
-        try:
-            # List all documents in knowledge_base blob storage
-            tree = await azure_blob.explorer("knowledge_base")
-            all_files = self._flatten_tree(tree)
-            stats["scanned"] = len(all_files)
-
-            logger.info(f"📄 Found {len(all_files)} files in knowledge_base storage")
-
-            for file_info in all_files:
-                # Skip files in the pending/ folder (awaiting admin approval)
-                blob_path = file_info.get("path", "")
-                if blob_path.startswith("pending/") or "/pending/" in blob_path:
-                    logger.debug(f"⏭️ Skipping pending file: {blob_path}")
-                    stats["pending_approval"] += 1
+        result = await db.execute(
+            select(
+                models.KnowledgeBaseDocument.blob_path,
+                models.KnowledgeBaseDocument.file_size,
+                models.KnowledgeBaseDocument.is_vectorized,
+                models.KnowledgeBaseDocument.last_checked,
+                models.KnowledgeBaseDocument.vectorized_at,
+            ).where(models.KnowledgeBaseDocument.blob_path.in_(paths))
+        )
+        known = {row.blob_path: row for row in result.all()}
+
+        result = await db.execute(
+            select(models.KnowledgeBaseDocument.blob_path)
+            .join(
+                models.PendingKBUpdate,
+                models.PendingKBUpdate.new_document_id == models.KnowledgeBaseDocument.id
+            )
+            .where(
+                models.PendingKBUpdate.status == "pending",
+                models.KnowledgeBaseDocument.blob_path.in_(paths)
+            )
+        )
+        awaiting_approval = set(result.scalars().all())
+
+        to_process = []
+        for blob in blobs:
+            blob_path = blob["path"]
+
+            # Skip files in the pending/ folder (awaiting admin approval)
+            if is_pending_path(blob_path) or blob_path in awaiting_approval:
+                counts["pending_approval"] += 1
+                continue
+
+            doc = known.get(blob_path)
+            if doc and doc.is_vectorized and doc.file_size == blob["size"]:
+                seen_at = max(
+                    (_as_utc(t) for t in (doc.last_checked, doc.vectorized_at) if t),
+                    default=None
+                )
+                if seen_at and blob["last_modified"] and seen_at >= _as_utc(blob["last_modified"]):
+                    counts["unchanged"] += 1
                     continue
 
-                try:
-                    await self._process_single_document(db, file_info, stats)
-                except Exception as e:
-                    logger.error(f"❌ Failed to process {file_info['name']}: {e}")
-                    stats["failed"] += 1
+            to_process.append(blob_path)
 
-            await db.commit()
+        counts["changed"] = len(to_process)
+        return to_process, counts
 
-            logger.info(f"✅ ETL scan completed: {stats}")
-            return stats
+    async def process_job(
+        self,
+        db: AsyncSession,
+        job: models.DocumentProcessingJob,
+        metrics: Optional[StageMetrics] = None
+    ) -> Dict[str, int]:
+        """
+        Process one queued blob. Nothing is committed here: the queue
+        commits the document state together with the job's completion, so
+        every case study of a deck is stored in that one transaction.
 
-        except Exception as e:
-            logger.error(f"❌ ETL scan failed: {e}")
-            await db.rollback()
-            raise
+        Stage timings and counters are collected into metrics if given.
+        """
+        stats = {
+            "new": 0,
+            "updated": 0,
+            "pending_approval": 0
+        }
+        file_info = {
+            "path": job.blob_path,
+            "name": job.blob_path.rsplit("/", 1)[-1]
+        }
+        await self._process_single_document(db, file_info, stats, job=job, metrics=metrics)
+        return stats
 
     async def _process_single_document(
         self,
         db: AsyncSession,
         file_info: Dict,
-        stats: Dict
+        stats: Dict,
+        job: Optional[models.DocumentProcessingJob] = None,
+        metrics: Optional[StageMetrics] = None
     ) -> None:
         """Process a single document through the ETL pipeline."""
+        metrics = metrics or StageMetrics()
 
         blob_path = file_info["path"]
         file_name = file_info["name"]
 
         # Download document and calculate hash
         try:
-            file_bytes = await azure_blob.download_bytes(blob_path, "knowledge_base")
+            with metrics.stage("download"):
+                file_bytes = await azure_blob.download_bytes(blob_path, "knowledge_base")
+            metrics.add("bytes_downloaded", len(file_bytes))
         except Exception as e:
             logger.warning(f"⚠️ Could not download {blob_path}: {e}")
-            return
+            raise
 
         file_hash = hashlib.sha256(file_bytes).hexdigest()
         file_size = len(file_bytes)
@@ -154,6 +212,7 @@ class ETLPipeline:
                 # File hasn't changed, but check if it needs reprocessing
                 if existing_doc.is_vectorized:
                     logger.debug(f"⏭️  Skipping unchanged document: {file_name}")
+                    existing_doc.last_checked = datetime.now(timezone.utc)
                     return
                 else:
                     # Check if document already has a pending approval
@@ -197,153 +256,53 @@ class ETLPipeline:
                 file_hash=file_hash,
                 file_size=file_size,
                 is_vectorized=False,
-                document_type=doc_type
+                document_type=doc_type,
+                last_checked=datetime.now(timezone.utc)
             )
             db.add(doc)
             await db.flush()  # Get the document ID
             stats["new"] += 1
             logger.info(f"📝 New {doc_type} document added: {file_name}")
 
+        if job is not None:
+            job.document_id = doc.id
+
         # Extract text from document
+        case_studies = []
+        text_content = ""
         try:
-            # For case study PPTs, try structured parsing first
             if doc.document_type == "case_study" and file_name.lower().endswith(('.ppt', '.pptx')):
-                # Save file temporarily for parsing
-                import tempfile
-                import os
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1]) as tmp_file:
-                    tmp_file.write(file_bytes)
-                    tmp_path = tmp_file.name
-
-                try:
-                    # Parse structured case study data
-                    case_studies = parse_case_study_from_ppt(tmp_path)
-
-                    if case_studies and len(case_studies) > 0:
-                        logger.info(f"📚 Found {len(case_studies)} case studies in {file_name}")
-
-                        # Process each case study separately
-                        for idx, case_study in enumerate(case_studies):
-                            # For first case study, use existing doc record
-                            # For additional ones, create new document records
-                            if idx == 0:
-                                current_doc = doc
-                            else:
-                                # Create unique identifier for additional case studies
-                                case_study_blob_path = f"{blob_path}#case_study_{idx + 1}"
-                                client_name = case_study.get('client_name', f'Case Study {idx + 1}')
-                                case_study_file_name = f"{file_name} - {client_name}"
-
-                                # Check if this specific case study already exists
-                                result = await db.execute(
-                                    select(models.KnowledgeBaseDocument).where(
-                                        models.KnowledgeBaseDocument.blob_path == case_study_blob_path
-                                    )
-                                )
-                                existing_case_doc = result.scalar_one_or_none()
-
-                                if existing_case_doc:
-                                    # Update existing case study document
-                                    existing_case_doc.file_hash = file_hash
-                                    existing_case_doc.file_size = file_size
-                                    existing_case_doc.is_vectorized = False
-                                    existing_case_doc.last_checked = datetime.now(timezone.utc)
-                                    current_doc = existing_case_doc
-                                    logger.info(f"🔄 Updating existing case study: {client_name}")
-                                else:
-                                    # Create new document record for this case study
-                                    current_doc = models.KnowledgeBaseDocument(
-                                        file_name=case_study_file_name,
-                                        blob_path=case_study_blob_path,
-                                        file_hash=file_hash,
-                                        file_size=file_size,
-                                        is_vectorized=False,
-                                        document_type="case_study"
-                                    )
-                                    db.add(current_doc)
-                                    await db.flush()
-                                    logger.info(f"📝 Created new case study document: {client_name}")
-
-                            # Store metadata for this specific case study
-                            current_doc.case_study_metadata = json.dumps({
-                                "client_name": case_study.get("client_name", ""),
-                                "overview": case_study.get("overview", ""),
-                                "solution": case_study.get("solution", ""),
-                                "impact": case_study.get("impact", ""),
-                                "slide_range": case_study.get("slide_range", "")
-                            })
-
-                            case_text_content = case_study.get("full_text", "")
-
-                            if case_text_content and len(case_text_content.strip()) >= 50:
-                                # Vectorize and store this case study
-                                await self._vectorize_and_store(db, current_doc, case_text_content)
-                                logger.info(f"✅ Case study vectorized: {case_study.get('client_name', 'Unknown')}")
-                            else:
-                                logger.warning(f"⚠️ Insufficient text for case study: {case_study.get('client_name', 'Unknown')}")
-
-                        # Cleanup: Remove orphaned case study documents
-                        # If file previously had more case studies than now, delete the extras
-                        orphan_check_idx = len(case_studies) + 1
-                        while True:
-                            orphan_blob_path = f"{blob_path}#case_study_{orphan_check_idx}"
-                            result = await db.execute(
-                                select(models.KnowledgeBaseDocument).where(
-                                    models.KnowledgeBaseDocument.blob_path == orphan_blob_path
-                                )
-                            )
-                            orphan_doc = result.scalar_one_or_none()
-
-                            if orphan_doc:
-                                logger.info(f"🗑️  Removing orphaned case study document: {orphan_doc.file_name}")
-                                # Delete from Qdrant first
-                                try:
-                                    self.qdrant_client.delete(
-                                        collection_name=CASE_STUDY_COLLECTION,
-                                        points_selector=models_qdrant.FilterSelector(
-                                            filter=models_qdrant.Filter(
-                                                must=[
-                                                    models_qdrant.FieldCondition(
-                                                        key="document_id",
-                                                        match=models_qdrant.MatchValue(value=str(orphan_doc.id))
-                                                    )
-                                                ]
-                                            )
-                                        )
-                                    )
-                                except Exception as e:
-                                    logger.warning(f"⚠️ Failed to delete vectors for orphaned case study: {e}")
-
-                                # Delete from database
-                                await db.delete(orphan_doc)
-                                orphan_check_idx += 1
-                            else:
-                                # No more orphaned documents found
-                                break
-
-                        # All case studies processed, return early
-                        return
-                    else:
-                        # Fallback to full text extraction
-                        text_content = extract_all_text_from_ppt(tmp_path)
+                # For case study decks, try structured parsing first (in memory, no temp file)
+                with metrics.stage("extract"):
+                    case_studies = await asyncio.to_thread(parse_case_study_from_ppt, io.BytesIO(file_bytes))
+                    if not case_studies:
+                        text_content = await asyncio.to_thread(extract_all_text_from_ppt, io.BytesIO(file_bytes))
                         logger.warning(f"⚠️ Structured parsing failed, using full text extraction")
-                finally:
-                    # Clean up temp file
-                    if os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
             else:
                 # Standard text extraction for non-case-study documents
-                text_content = extract_text_from_file(io.BytesIO(file_bytes), file_name)
+                with metrics.stage("extract"):
+                    text_content = await asyncio.to_thread(extract_text_from_file, io.BytesIO(file_bytes), file_name)
 
-            if not text_content or len(text_content.strip()) < 50:
+            if not case_studies and (not text_content or len(text_content.strip()) < 50):
                 logger.warning(f"⚠️ No meaningful text extracted from {file_name}")
                 return
         except Exception as e:
             logger.error(f"❌ Text extraction failed for {file_name}: {e}")
             return
 
-        # Check for similar existing documents
-        similar_docs = await self._find_similar_documents(db, text_content, doc.id)
+        metrics.add("docs_extracted")
+
+        if case_studies:
+            logger.info(f"📚 Found {len(case_studies)} case studies in {file_name}")
+            await self._process_case_study_deck(db, doc, file_info, file_hash, file_size, case_studies, job, metrics)
+            return
+
+        # Check for near-duplicate existing documents (local MinHash, no API calls)
+        with metrics.stage("dedupe"):
+            from app.utils.minhash import compute_signature  # NumPy loads with the first document
+            signature = await asyncio.to_thread(compute_signature, text_content)
+            similar_docs = await self._find_similar_documents(db, signature, doc.id)
+            await self._index_signature(db, doc, signature)
 
         if similar_docs:
             # Create pending approval for admin review
@@ -352,17 +311,197 @@ class ETLPipeline:
             logger.info(f"⏸️  Pending admin approval for {file_name} (found {len(similar_docs)} similar docs)")
         else:
             # No similar documents, proceed with vectorization
-            await self._vectorize_and_store(db, doc, text_content)
+            await self._vectorize_and_store(db, doc, text_content, job=job, metrics=metrics)
             logger.info(f"✅ Document vectorized: {file_name}")
 
+    async def _process_case_study_deck(
+        self,
+        db: AsyncSession,
+        doc: models.KnowledgeBaseDocument,
+        file_info: Dict,
+        file_hash: str,
+        file_size: int,
+        case_studies: List[Dict],
+        job: Optional[models.DocumentProcessingJob],
+        metrics: StageMetrics
+    ) -> None:
+        """
+        Store every case study parsed from a deck and vectorize them together.
+
+        The first case study uses the deck's own document record, the others
+        get "<blob_path>#case_study_N" records. All chunks of the deck are
+        embedded in one batched step and upserted in one batch.
+        """
+        blob_path = file_info["path"]
+        file_name = file_info["name"]
+
+        documents = []
+        for idx, case_study in enumerate(case_studies):
+            # For first case study, use existing doc record
+            # For additional ones, create new document records
+            if idx == 0:
+                current_doc = doc
+            else:
+                # Create unique identifier for additional case studies
+                case_study_blob_path = f"{blob_path}#case_study_{idx + 1}"
+                client_name = case_study.get('client_name', f'Case Study {idx + 1}')
+                case_study_file_name = f"{file_name} - {client_name}"
+
+                # Check if this specific case study already exists
+                result = await db.execute(
+                    select(models.KnowledgeBaseDocument).where(
+                        models.KnowledgeBaseDocument.blob_path == case_study_blob_path
+                    )
+                )
+                existing_case_doc = result.scalar_one_or_none()
+
+                if existing_case_doc:
+                    # Update existing case study document
+                    existing_case_doc.file_hash = file_hash
+                    existing_case_doc.file_size = file_size
+                    existing_case_doc.is_vectorized = False
+                    existing_case_doc.last_checked = datetime.now(timezone.utc)
+                    current_doc = existing_case_doc
+                    logger.info(f"🔄 Updating existing case study: {client_name}")
+                else:
+                    # Create new document record for this case study
+                    current_doc = models.KnowledgeBaseDocument(
+                        file_name=case_study_file_name,
+                        blob_path=case_study_blob_path,
+                        file_hash=file_hash,
+                        file_size=file_size,
+                        is_vectorized=False,
+                        document_type="case_study"
+                    )
+                    db.add(current_doc)
+                    await db.flush()
+                    logger.info(f"📝 Created new case study document: {client_name}")
+
+            # Store metadata for this specific case study
+            current_doc.case_study_metadata = json.dumps({
+                "client_name": case_study.get("client_name", ""),
+                "overview": case_study.get("overview", ""),
+                "solution": case_study.get("solution", ""),
+                "impact": case_study.get("impact", ""),
+                "slide_range": case_study.get("slide_range", "")
+            })
+
+            case_text_content = case_study.get("full_text", "")
+            if case_text_content and len(case_text_content.strip()) >= 50:
+                documents.append((current_doc, case_text_content))
+            else:
+                logger.warning(f"⚠️ Insufficient text for case study: {case_study.get('client_name', 'Unknown')}")
+
+        if documents:
+            await self._vectorize_documents(db, documents, job=job, metrics=metrics)
+            logger.info(f"✅ Vectorized {len(documents)} case studies from {file_name}")
+
+        # Cleanup: Remove orphaned case study documents
+        # If file previously had more case studies than now, delete the extras
+        result = await db.execute(
+            select(models.KnowledgeBaseDocument).where(
+                models.KnowledgeBaseDocument.blob_path.startswith(f"{blob_path}#case_study_")
+            )
+        )
+        orphan_docs = []
+        for case_doc in result.scalars().all():
+            suffix = case_doc.blob_path.rsplit("#case_study_", 1)[-1]
+            if suffix.isdigit() and int(suffix) > len(case_studies):
+                orphan_docs.append(case_doc)
+
+        if orphan_docs:
+            logger.info(f"🗑️  Removing {len(orphan_docs)} orphaned case study documents from {file_name}")
+            # Delete from Qdrant first (batched by collection)
+            await delete_document_vectors_async(
+                (orphan_doc.id, orphan_doc.document_type) for orphan_doc in orphan_docs
+            )
+            await db.execute(
+                delete(models.KnowledgeBaseDocument).where(
+                    models.KnowledgeBaseDocument.id.in_([orphan_doc.id for orphan_doc in orphan_docs])
+                )
+            )
+
+    async def backfill_signatures(self, exclude: Set[uuid.UUID], limit: int = MINHASH_BACKFILL_BATCH) -> int:
+        """
+        Sign vectorized documents that have no MinHash signature yet (indexed
+        before near-duplicate detection used MinHash), so they can be found as
+        duplicates of new uploads.
+
+        Documents whose text cannot be extracted are added to exclude and
+        skipped by later batches. Returns the number of documents selected.
+
+        No row locks are held while blobs are downloaded and extracted: the
+        signatures are written back in a short transaction that skips
+        documents signed or changed in the meantime.
+        """
+        from app.utils.minhash import compute_signature
+
+        doc_model = models.KnowledgeBaseDocument
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(doc_model.id, doc_model.blob_path, doc_model.file_name, doc_model.file_hash)
+                .where(
+                    doc_model.minhash_signature.is_(None),
+                    doc_model.is_vectorized == True,
+                    doc_model.document_type != "case_study",
+                )
+                .order_by(doc_model.id)
+                .limit(limit)
+            )
+            if exclude:
+                query = query.where(doc_model.id.notin_(exclude))
+            docs = (await db.execute(query)).all()
+
+        signatures = {}
+        for doc in docs:
+            try:
+                file_bytes = await azure_blob.download_bytes(doc.blob_path, "knowledge_base")
+                text_content = await asyncio.to_thread(
+                    extract_text_from_file, io.BytesIO(file_bytes), doc.file_name
+                )
+                signature = await asyncio.to_thread(compute_signature, text_content)
+                if not signature:
+                    raise ValueError("no text extracted")
+                signatures[doc.id] = (doc.file_hash, signature)
+            except Exception as e:
+                exclude.add(doc.id)
+                logger.warning(f"⚠️ MinHash backfill skipped {doc.file_name}: {e}")
+
+        if signatures:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(doc_model)
+                    .where(doc_model.id.in_(signatures), doc_model.minhash_signature.is_(None))
+                    .order_by(doc_model.id)
+                    .with_for_update()
+                )
+                signed = set()
+                for row in result.scalars().all():
+                    file_hash, signature = signatures[row.id]
+                    if row.file_hash == file_hash:
+                        await self._index_signature(db, row, signature)
+                        signed.add(row.id)
+                await db.commit()
+
+            # Documents changed since they were read get signed by their ETL job
+            exclude.update(set(signatures) - signed)
+
+        if docs:
+            logger.info(f"🔏 MinHash backfill: {len(docs)} document(s) processed")
+        return len(docs)
+
     async def _find_similar_documents(
         self,
         db: AsyncSession,
-        text_content: str,
+        signature: List[int],
         exclude_doc_id: str
     ) -> List[Dict]:
         """
-        Find existing KB documents similar to the new content.
+        Find existing KB documents that are near-duplicates of the new content.
+
+        Candidates come from the MinHash LSH index (documents sharing at least
+        one band bucket), then the Jaccard similarity is estimated from the
+        full signatures. Everything runs locally in one DB query.
 
         NOTE: This only searches within KB documents, NOT case studies.
         Case studies have their own separate collection and are not mixed with KB.
@@ -370,55 +509,70 @@ class ETLPipeline:
         Returns:
             List of similar documents with similarity scores
         """
-        try:
-            # Generate embedding for the document
-            sample_text = text_content[:2000]  # Use first 2000 chars for comparison
-            embeddings = embed_text_ollama([sample_text])
+        from app.utils.minhash import jaccard_similarity, lsh_band_keys
 
-            if not embeddings or not embeddings[0]:
+        try:
+            band_keys = lsh_band_keys(signature)
+            if not band_keys:
                 return []
 
-            query_vector = embeddings[0]
-
-            # Search Qdrant for similar vectors (KB collection only, no case studies)
-            search_results = self.qdrant_client.query_points(
-                collection_name=QDRANT_COLLECTION,  # Only search KB documents
-                query=query_vector,
-                limit=5,
-                score_threshold=self.similarity_threshold
-            ).points
-
-            if not search_results:
-                return []
+            result = await db.execute(
+                select(
+                    models.KnowledgeBaseDocument.id,
+                    models.KnowledgeBaseDocument.file_name,
+                    models.KnowledgeBaseDocument.blob_path,
+                    models.KnowledgeBaseDocument.minhash_signature,
+                )
+                .join(
+                    models.KBMinHashBand,
+                    models.KBMinHashBand.document_id == models.KnowledgeBaseDocument.id
+                )
+                .where(
+                    models.KBMinHashBand.band_key.in_(band_keys),
+                    models.KnowledgeBaseDocument.id != exclude_doc_id,
+                    models.KnowledgeBaseDocument.is_vectorized == True,
+                    models.KnowledgeBaseDocument.document_type != "case_study",
+                )
+                .distinct()
+            )
 
             similar_docs = []
-            for hit in search_results:
-                payload = hit.payload or {}
-                doc_id = payload.get("document_id")
-
-                if doc_id and doc_id != str(exclude_doc_id):
-                    # Get document details from DB
-                    result = await db.execute(
-                        select(models.KnowledgeBaseDocument).where(
-                            models.KnowledgeBaseDocument.id == doc_id
-                        )
-                    )
-                    doc = result.scalar_one_or_none()
-
-                    if doc:
-                        similar_docs.append({
-                            "document_id": str(doc.id),
-                            "file_name": doc.file_name,
-                            "similarity_score": float(hit.score),
-                            "blob_path": doc.blob_path
-                        })
-
-            return similar_docs
+            for doc_id, file_name, blob_path, candidate_signature in result.all():
+                if not candidate_signature:
+                    continue
+                score = jaccard_similarity(signature, json.loads(candidate_signature))
+                if score >= self.update_threshold:
+                    similar_docs.append({
+                        "document_id": str(doc_id),
+                        "file_name": file_name,
+                        "similarity_score": score,
+                        "blob_path": blob_path
+                    })
+
+            similar_docs.sort(key=lambda d: d["similarity_score"], reverse=True)
+            return similar_docs[:5]
 
         except Exception as e:
             logger.warning(f"⚠️ Similarity check failed: {e}")
             return []
 
+    async def _index_signature(
+        self,
+        db: AsyncSession,
+        doc: models.KnowledgeBaseDocument,
+        signature: List[int]
+    ) -> None:
+        """Store the document's MinHash signature and replace its LSH band rows."""
+        from app.utils.minhash import lsh_band_keys
+
+        doc.minhash_signature = json.dumps(signature) if signature else None
+
+        await db.execute(
+            delete(models.KBMinHashBand).where(models.KBMinHashBand.document_id == doc.id)
+        )
+        for band_key in lsh_band_keys(signature):
+            db.add(models.KBMinHashBand(document_id=doc.id, band_key=band_key))
+
     async def _create_pending_approval(
         self,
         db: AsyncSession,
@@ -428,15 +582,15 @@ class ETLPipeline:
     ) -> None:
         """Create a pending KB update for admin approval."""
 
-        # Determine update type
+        # Determine update type from estimated Jaccard similarity
         max_similarity = max(d["similarity_score"] for d in similar_docs)
 
-        if max_similarity > 0.95:
+        if max_similarity >= self.duplicate_threshold:
             update_type = "duplicate"
-            reason = f"Very high similarity ({max_similarity:.2%}) with existing document(s)"
-        elif max_similarity > self.similarity_threshold:
+            reason = f"Near-identical content ({max_similarity:.2%} Jaccard similarity) with existing document(s)"
+        elif max_similarity >= self.update_threshold:
             update_type = "update"
-            reason = f"High similarity ({max_similarity:.2%}) - possible update to existing content"
+            reason = f"High content overlap ({max_similarity:.2%} Jaccard similarity) - possible update to existing content"
         else:
             update_type = "new"
             reason = "New document with some related content"
@@ -457,149 +611,251 @@ class ETLPipeline:
         self,
         db: AsyncSession,
         doc: models.KnowledgeBaseDocument,
-        text_content: str
+        text_content: str,
+        job: Optional[models.DocumentProcessingJob] = None,
+        metrics: Optional[StageMetrics] = None
+    ) -> None:
+        """Chunk a single document, generate embeddings, and store in Qdrant."""
+        await self._vectorize_documents(db, [(doc, text_content)], job=job, metrics=metrics)
+
+    async def _vectorize_documents(
+        self,
+        db: AsyncSession,
+        documents: List[Tuple[models.KnowledgeBaseDocument, str]],
+        job: Optional[models.DocumentProcessingJob] = None,
+        metrics: Optional[StageMetrics] = None
     ) -> None:
         """
-        Chunk the document, generate embeddings, and store in Qdrant.
+        Chunk documents, generate embeddings, and store in Qdrant.
+
+        Re-vectorization is incremental: each chunk is identified by the SHA256
+        of its content, so only new or changed chunks are embedded. Chunks that
+        disappeared are deleted from Qdrant in a single batched call.
+
+        The chunks of all documents are embedded together and each Qdrant
+        operation is issued once per collection, so a case study deck costs
+        the same number of round trips as a single document.
+
+        When called for a queued job, that job records the counts and the
+        queue owns its status; otherwise a new processing job is created.
         """
-        # Create processing job
-        job = models.DocumentProcessingJob(
-            document_id=doc.id,
-            status="processing",
-            started_at=datetime.now(timezone.utc)
-        )
-        db.add(job)
-        await db.flush()
+        metrics = metrics or StageMetrics()
+        owns_job = job is None
+        if owns_job:
+            job = models.DocumentProcessingJob(
+                document_id=documents[0][0].id,
+                status="processing",
+                started_at=datetime.now(timezone.utc)
+            )
+            db.add(job)
+            await db.flush()
+        elif job.document_id is None:
+            job.document_id = documents[0][0].id
 
+        names = ", ".join(doc.file_name for doc, _ in documents)
         try:
-            # Chunk the text
-            chunks = self._chunk_text(text_content)
-            job.chunks_processed = len(chunks)
-
-            # Generate embeddings for all chunks
-            embeddings = embed_text_ollama(chunks)
+            plans = []
+            for doc, text_content in documents:
+                chunks = chunk_text(text_content)
+                chunk_hashes = [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
+
+                # Previously stored chunks (content hash -> point ID)
+                old_point_ids = json.loads(doc.qdrant_point_ids) if doc.qdrant_point_ids else []
+                old_hashes = json.loads(doc.chunk_hashes) if doc.chunk_hashes else []
+
+                # Route to correct collection based on document type
+                if doc.document_type == "case_study":
+                    target_collection = CASE_STUDY_COLLECTION
+                else:
+                    target_collection = QDRANT_COLLECTION
+
+                plans.append({
+                    "doc": doc,
+                    "chunks": chunks,
+                    "chunk_hashes": chunk_hashes,
+                    "point_ids": self._chunk_point_ids(doc.id, chunk_hashes),
+                    "old_point_ids": old_point_ids,
+                    "old_index": {
+                        point_id: idx
+                        for idx, point_id in enumerate(old_point_ids)
+                        if idx < len(old_hashes)
+                    },
+                    "collection": target_collection,
+                })
+            job.chunks_processed = sum(len(plan["chunks"]) for plan in plans)
+
+            # Only embed chunks whose content-addressed point does not exist yet
+            missing_by_collection: Dict[str, List[int]] = {}
+            for plan in plans:
+                plan["missing"] = [
+                    idx for idx, point_id in enumerate(plan["point_ids"])
+                    if point_id not in plan["old_index"]
+                ]
+                missing_by_collection.setdefault(plan["collection"], []).extend(
+                    plan["point_ids"][idx] for idx in plan["missing"]
+                )
 
-            if not embeddings or len(embeddings) != len(chunks):
-                raise ValueError(f"Embedding count mismatch: expected {len(chunks)}, got {len(embeddings)}")
+            # Points upserted by a run that crashed before its Postgres commit
+            # are still in Qdrant: adopt them instead of embedding again
+            recovered = set()
+            for collection, missing_ids in missing_by_collection.items():
+                if not missing_ids:
+                    continue
+                existing = self.qdrant_client.retrieve(
+                    collection_name=collection,
+                    ids=missing_ids,
+                    with_payload=False,
+                    with_vectors=False
+                )
+                recovered.update(point.id for point in existing)
+            if recovered:
+                logger.info(f"♻️  Recovered {len(recovered)} vectors from an interrupted run: {names}")
+
+            changed = [
+                (plan, idx)
+                for plan in plans
+                for idx in plan["missing"]
+                if plan["point_ids"][idx] not in recovered
+            ]
+            # One batched embedding step for every document, off the event loop
+            # so the worker keeps renewing its job lease
+            with metrics.stage("embed"):
+                embeddings = await asyncio.to_thread(
+                    embed_text_ollama, [plan["chunks"][idx] for plan, idx in changed]
+                ) if changed else []
+            metrics.add("chunks_embedded", len(changed))
+
+            if len(embeddings) != len(changed):
+                raise ValueError(f"Embedding count mismatch: expected {len(changed)}, got {len(embeddings)}")
 
-            # Store vectors in Qdrant
             from qdrant_client.http import models as qdrant_models
 
-            points = []
-            for idx, (chunk, vector) in enumerate(zip(chunks, embeddings)):
-                # Convert UUID + index to stable integer ID for Qdrant
-                # Qdrant requires pure integers or pure UUIDs, not concatenated strings
-                point_id_str = f"{doc.id}_{idx}"
-                point_id = int(hashlib.sha256(point_id_str.encode()).hexdigest()[:16], 16)
-
-                payload = {
-                    "document_id": str(doc.id),
-                    "file_name": doc.file_name,
-                    "blob_path": doc.blob_path,
-                    "chunk_index": idx,
-                    "content": chunk[:1000],  # Store first 1000 chars
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "document_type": doc.document_type or "general"
-                }
-
-                # Add case study metadata to payload if available
-                if doc.document_type == "case_study" and doc.case_study_metadata:
-                    payload["case_study_metadata"] = doc.case_study_metadata
-
-                points.append(
+            points_by_collection: Dict[str, List] = {}
+            for (plan, idx), vector in zip(changed, embeddings):
+                plan["embedded"] = plan.get("embedded", 0) + 1
+                points_by_collection.setdefault(plan["collection"], []).append(
                     qdrant_models.PointStruct(
-                        id=point_id,
+                        id=plan["point_ids"][idx],
                         vector=vector,
-                        payload=payload
+                        payload=self._chunk_payload(plan["doc"], plan["chunks"][idx], idx)
                     )
                 )
 
-            # Route to correct collection based on document type
-            if doc.document_type == "case_study":
-                target_collection = CASE_STUDY_COLLECTION
-                logger.info(f"📚 Storing case study in separate collection: {CASE_STUDY_COLLECTION}")
-            else:
-                target_collection = QDRANT_COLLECTION
-                logger.debug(f"📄 Storing KB document in collection: {QDRANT_COLLECTION}")
+            # Unchanged and recovered chunks keep their vector, only the payload is refreshed
+            updates_by_collection: Dict[str, List] = {}
+            stale_by_collection: Dict[str, List[int]] = {}
+            for plan in plans:
+                doc = plan["doc"]
+                for idx, point_id in enumerate(plan["point_ids"]):
+                    if point_id in recovered:
+                        update = self._chunk_payload(doc, plan["chunks"][idx], idx)
+                    elif point_id in plan["old_index"]:
+                        update = {}
+                        if plan["old_index"][point_id] != idx:
+                            update["chunk_index"] = idx
+                        if doc.document_type == "case_study" and doc.case_study_metadata:
+                            update["case_study_metadata"] = doc.case_study_metadata
+                    else:
+                        continue
+                    if update:
+                        updates_by_collection.setdefault(plan["collection"], []).append(
+                            qdrant_models.SetPayloadOperation(
+                                set_payload=qdrant_models.SetPayload(payload=update, points=[point_id])
+                            )
+                        )
 
-            # Upload to Qdrant
-            self.qdrant_client.upsert(
-                collection_name=target_collection,
-                points=points
-            )
+                # Vectors for chunks that no longer exist
+                new_ids = set(plan["point_ids"])
+                plan["stale"] = [point_id for point_id in plan["old_point_ids"] if point_id not in new_ids]
+                if plan["stale"]:
+                    stale_by_collection.setdefault(plan["collection"], []).extend(plan["stale"])
+
+            # Upload new/changed chunks to Qdrant (one batch per collection)
+            for collection, points in points_by_collection.items():
+                with metrics.stage("upsert"):
+                    self.qdrant_client.upsert(
+                        collection_name=collection,
+                        points=points
+                    )
+                metrics.add("vectors_upserted", len(points))
 
-            # Update document record
-            doc.is_vectorized = True
-            doc.vectorized_at = datetime.now(timezone.utc)
-            doc.vector_count = len(points)
-            # Store point IDs as integers (not strings)
-            doc.qdrant_point_ids = json.dumps([int(p.id) for p in points])
+            for collection, payload_updates in updates_by_collection.items():
+                self.qdrant_client.batch_update_points(
+                    collection_name=collection,
+                    update_operations=payload_updates
+                )
 
-            # Update job status
-            job.status = "completed"
-            job.vectors_created = len(points)
-            job.completed_at = datetime.now(timezone.utc)
+            for collection, stale_ids in stale_by_collection.items():
+                self.qdrant_client.delete(
+                    collection_name=collection,
+                    points_selector=qdrant_models.PointIdsList(points=stale_ids)
+                )
 
-            logger.info(f"✅ Vectorized {doc.file_name}: {len(points)} vectors created in '{target_collection}' collection")
+            # Update document records
+            for plan in plans:
+                doc = plan["doc"]
+                doc.is_vectorized = True
+                doc.vectorized_at = datetime.now(timezone.utc)
+                doc.vector_count = len(plan["point_ids"])
+                # Store point IDs as integers (not strings), aligned with chunk_hashes
+                doc.qdrant_point_ids = json.dumps(plan["point_ids"])
+                doc.chunk_hashes = json.dumps(plan["chunk_hashes"])
+
+                embedded = plan.get("embedded", 0)
+                logger.info(
+                    f"✅ Vectorized {doc.file_name} in '{plan['collection']}' collection: "
+                    f"{embedded} embedded, {len(plan['point_ids']) - embedded} reused, {len(plan['stale'])} removed"
+                )
+
+            # Update job status
+            job.vectors_created = len(changed)
+            if owns_job:
+                job.status = "completed"
+                job.completed_at = datetime.now(timezone.utc)
 
         except Exception as e:
-            job.status = "failed"
-            job.error_message = str(e)
-            job.completed_at = datetime.now(timezone.utc)
-            logger.error(f"❌ Vectorization failed for {doc.file_name}: {e}")
+            if owns_job:
+                job.status = "failed"
+                job.error_message = str(e)
+                job.completed_at = datetime.now(timezone.utc)
+            logger.error(f"❌ Vectorization failed for {names}: {e}")
             raise
 
-    def _chunk_text(self, text: str) -> List[str]:
+    def _chunk_point_ids(self, document_id, chunk_hashes: List[str]) -> List[int]:
         """
-        Split text into overlapping chunks.
-
-        Args:
-            text: Input text to chunk
+        Build content-addressed Qdrant point IDs for a document's chunks.
 
-        Returns:
-            List of text chunks
+        The ID depends on the chunk content (plus an occurrence counter for
+        repeated chunks), not its position, so an unchanged chunk keeps its
+        point when text is inserted or removed before it.
         """
-        if len(text) <= self.chunk_size:
-            return [text]
-
-        chunks = []
-        start = 0
-
-        while start < len(text):
-            end = start + self.chunk_size
-            chunk = text[start:end]
-
-            # Try to break at sentence boundary
-            if end < len(text):
-                last_period = chunk.rfind('. ')
-                if last_period > self.chunk_size * 0.7:  # At least 70% of chunk size
-                    end = start + last_period + 1
-                    chunk = text[start:end]
-
-            chunks.append(chunk.strip())
-            start = end - self.overlap  # Overlap with next chunk
-
-        return [c for c in chunks if c]  # Remove empty chunks
-
-    def _flatten_tree(self, tree: Dict) -> List[Dict]:
-        """Flatten the blob explorer tree into a list of files."""
-        files = []
-
-        def traverse(node, path=""):
-            # Check if this is a file (not a folder)
-            if node.get("is_folder") is False:
-                files.append({
-                    "name": node["name"],
-                    "path": node.get("path", f"{path}/{node['name']}".lstrip("/"))
-                })
-            # If it has children (is a folder), traverse them
-            if node.get("children"):
-                for child in node["children"]:
-                    child_path = f"{path}/{node['name']}".lstrip("/") if node.get("name") else path
-                    traverse(child, child_path)
+        seen: Dict[str, int] = {}
+        point_ids = []
+        for chunk_hash in chunk_hashes:
+            occurrence = seen.get(chunk_hash, 0)
+            seen[chunk_hash] = occurrence + 1
+            # Qdrant requires pure integers or pure UUIDs, not concatenated strings
+            point_id_str = f"{document_id}_{chunk_hash}_{occurrence}"
+            point_ids.append(int(hashlib.sha256(point_id_str.encode()).hexdigest()[:16], 16))
+        return point_ids
+
+    def _chunk_payload(self, doc: models.KnowledgeBaseDocument, chunk: str, idx: int) -> Dict:
+        """Build the Qdrant payload stored with a chunk vector."""
+        payload = {
+            "document_id": str(doc.id),
+            "file_name": doc.file_name,
+            "blob_path": doc.blob_path,
+            "chunk_index": idx,
+            "content": chunk[:1000],  # Store first 1000 chars
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "document_type": doc.document_type or "general"
+        }
+
+        # Add case study metadata to payload if available
+        if doc.document_type == "case_study" and doc.case_study_metadata:
+            payload["case_study_metadata"] = doc.case_study_metadata
 
-        traverse(tree)
-        return files
+        return payload
 
     async def approve_and_process(
         self,
@@ -647,7 +903,7 @@ class ETLPipeline:
         # Download and process the document
         try:
             file_bytes = await azure_blob.download_bytes(doc.blob_path, "knowledge_base")
-            text_content = extract_text_from_file(io.BytesIO(file_bytes), doc.file_name)
+            text_content = await asyncio.to_thread(extract_text_from_file, io.BytesIO(file_bytes), doc.file_name)
 
             # Vectorize and store
             await self._vectorize_and_store(db, doc, text_content)
@@ -705,6 +961,16 @@ class ETLPipeline:
         }
 
 
+def is_pending_path(blob_path: str) -> bool:
+    """Files in a pending/ folder are awaiting admin approval and never processed."""
+    return blob_path.startswith("pending/") or "/pending/" in blob_path
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive timestamps (e.g. from SQLite) as UTC so they compare with blob times."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 # Global ETL pipeline instance
 _etl_pipeline = None
 
@@ -0,0 +1,577 @@
+"""
+Durable ETL Work Queue
+
+Knowledge base documents are processed through a queue stored in the
+document_processing_jobs table instead of ad-hoc in-process scans:
+
+1. Uploads and scheduled/manual scans enqueue one "pending" job per blob
+2. Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+   of API processes or `python -m app.worker` replicas can share the queue
+3. Failed jobs are retried with exponential backoff until max_attempts
+
+Scheduled scans only enqueue work; a Postgres advisory lock makes sure a
+single replica runs each scan. Scans commit their listing cursor page by
+page (etl_scan_runs), so an interrupted scan resumes where it stopped.
+Jobs queued by a scan report their stage metrics back to its scan run
+(see app.services.etl_metrics).
+
+Claimed jobs hold a lease that the worker renews while processing. Jobs
+left in "processing" by a crashed worker are reclaimed once their lease
+expires, at startup and periodically.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.config import (
+    ETL_JOB_LEASE_SECONDS,
+    ETL_JOB_MAX_ATTEMPTS,
+    ETL_RETRY_BASE_SECONDS,
+    ETL_SCAN_INTERVAL_MINUTES,
+    ETL_WORKER_CONCURRENCY,
+    ETL_WORKER_POLL_SECONDS,
+)
+from app.config.database import AsyncSessionLocal, async_engine
+from app.services.etl_pipeline import get_etl_pipeline, is_pending_path
+from app.services.etl_metrics import StageMetrics, finish_scan_run_if_done, record_job_outcome
+from app.utils import azure_blob
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+MAX_RETRY_DELAY_SECONDS = 3600
+SCAN_LOCK_KEY = 72_810_028  # pg advisory lock ID for scheduled scans
+
+ACTIVE_STATUSES = ("pending", "processing")
+UNFINISHED_SCAN_STATUSES = ("running", "interrupted")
+
+
+# ---------- Enqueue ----------
+
+async def _add_jobs(db: AsyncSession, blob_paths: Iterable[str], scan_run_id=None) -> int:
+    """Add pending jobs for blobs without an active job (caller commits)."""
+    paths = [p for p in dict.fromkeys(blob_paths) if p and not is_pending_path(p)]
+    if not paths:
+        return 0
+
+    result = await db.execute(
+        select(models.DocumentProcessingJob.blob_path).where(
+            models.DocumentProcessingJob.blob_path.in_(paths),
+            models.DocumentProcessingJob.status.in_(ACTIVE_STATUSES)
+        )
+    )
+    active = set(result.scalars().all())
+
+    now = datetime.now(timezone.utc)
+    queued = 0
+    for path in paths:
+        if path in active:
+            continue
+        db.add(models.DocumentProcessingJob(
+            blob_path=path,
+            scan_run_id=scan_run_id,
+            status="pending",
+            max_attempts=ETL_JOB_MAX_ATTEMPTS,
+            next_attempt_at=now
+        ))
+        queued += 1
+    return queued
+
+
+async def enqueue_blobs(db: AsyncSession, blob_paths: Iterable[str]) -> int:
+    """
+    Queue KB blobs for processing and commit.
+
+    Blobs that already have a pending or in-flight job are skipped.
+
+    Returns:
+        Number of jobs created
+    """
+    queued = await _add_jobs(db, blob_paths)
+    await db.commit()
+
+    if queued:
+        logger.info(f"📥 Queued {queued} KB document(s) for ETL")
+    return queued
+
+
+# ---------- Claim / complete ----------
+
+async def claim_next_job(db: AsyncSession) -> Optional[models.DocumentProcessingJob]:
+    """
+    Claim the next due job for this worker.
+
+    FOR UPDATE SKIP LOCKED lets concurrent workers claim different rows
+    without blocking on each other.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(models.DocumentProcessingJob)
+        .where(
+            models.DocumentProcessingJob.status == "pending",
+            models.DocumentProcessingJob.blob_path.isnot(None),
+            models.DocumentProcessingJob.next_attempt_at <= now
+        )
+        .order_by(models.DocumentProcessingJob.next_attempt_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar_one_or_none()
+
+    if job is None:
+        await db.rollback()
+        return None
+
+    job.status = "processing"
+    job.attempts += 1
+    job.locked_by = WORKER_ID
+    job.locked_at = now
+    job.started_at = now
+    job.completed_at = None
+    await db.commit()
+    return job
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2x base, 4x base, ... capped at one hour."""
+    seconds = ETL_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, MAX_RETRY_DELAY_SECONDS))
+
+
+def _release_failed_job(job: models.DocumentProcessingJob, error: str, now: datetime) -> None:
+    """Reschedule a job after a failed attempt, or fail it for good."""
+    job.error_message = error
+    job.locked_by = None
+    job.locked_at = None
+
+    if job.attempts >= job.max_attempts or not job.blob_path:
+        job.status = "failed"
+        job.completed_at = now
+        logger.error(f"❌ ETL job for {job.blob_path} failed permanently after {job.attempts} attempts: {error}")
+    else:
+        delay = _retry_delay(job.attempts)
+        job.status = "pending"
+        job.next_attempt_at = now + delay
+        logger.warning(
+            f"⚠️ ETL job for {job.blob_path} failed (attempt {job.attempts}/{job.max_attempts}), "
+            f"retrying in {int(delay.total_seconds())}s: {error}"
+        )
+
+
+def _holds_lease(job_id, attempt: int):
+    """
+    Match a job only while this worker's claim on it is current.
+
+    Once the lease expires the job can be reclaimed, possibly by another
+    worker loop of this process, which bumps its attempt count.
+    """
+    return and_(
+        models.DocumentProcessingJob.id == job_id,
+        models.DocumentProcessingJob.locked_by == WORKER_ID,
+        models.DocumentProcessingJob.attempts == attempt
+    )
+
+
+async def _fail_job(
+    db: AsyncSession,
+    job_id,
+    attempt: int,
+    error: str,
+    metrics: Optional[StageMetrics] = None
+) -> None:
+    """Record a failed attempt and either reschedule the job or give up."""
+    # A reclaimed job belongs to its new owner, whose attempt decides the outcome
+    result = await db.execute(
+        select(models.DocumentProcessingJob)
+        .where(_holds_lease(job_id, attempt))
+        .with_for_update()
+    )
+    job = result.scalar_one_or_none()
+    if job is None:
+        await db.rollback()
+        logger.warning(f"⚠️ ETL job {job_id} failed after its lease was lost: {error}")
+        return
+    _release_failed_job(job, error, datetime.now(timezone.utc))
+    await record_job_outcome(db, job, metrics)
+    await db.commit()
+    await finish_scan_run_if_done(db, job.scan_run_id)
+
+
+async def _renew_lease(job_id, attempt: int) -> None:
+    """Keep a claimed job's lease alive while it is being processed."""
+    while True:
+        await asyncio.sleep(ETL_JOB_LEASE_SECONDS / 3)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(models.DocumentProcessingJob)
+                    .where(_holds_lease(job_id, attempt))
+                    .values(locked_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to renew ETL job lease: {e}")
+
+
+async def process_next_job() -> bool:
+    """
+    Claim and process a single job.
+
+    The document's state and the job's completion are committed together.
+
+    Returns:
+        True if a job was processed (successfully or not), False if the queue was empty
+    """
+    async with AsyncSessionLocal() as db:
+        job = await claim_next_job(db)
+        if job is None:
+            return False
+
+        job_id = job.id
+        scan_run_id = job.scan_run_id
+        blob_path = job.blob_path
+        attempt = job.attempts
+        logger.info(f"⚙️  {WORKER_ID} processing {blob_path} (attempt {attempt})")
+
+        metrics = StageMetrics()
+        lease = asyncio.create_task(_renew_lease(job_id, attempt))
+        try:
+            stats = await get_etl_pipeline().process_job(db, job, metrics)
+            await db.flush()
+
+            # Complete only while the lease is ours; if the job was reclaimed,
+            # its new owner's attempt decides the outcome
+            result = await db.execute(
+                update(models.DocumentProcessingJob)
+                .where(_holds_lease(job_id, attempt))
+                .values(
+                    status="completed",
+                    completed_at=datetime.now(timezone.utc),
+                    error_message=None,
+                    locked_by=None,
+                    locked_at=None
+                )
+            )
+            if result.rowcount == 0:
+                await db.rollback()
+                logger.warning(f"⚠️ Lost the lease on {blob_path}; discarding this attempt")
+                return True
+
+            await record_job_outcome(db, job, metrics)
+            await db.commit()
+            await finish_scan_run_if_done(db, scan_run_id)
+            logger.info(f"✅ ETL job completed for {blob_path}: {stats}")
+        except Exception as e:
+            await db.rollback()
+            await _fail_job(db, job_id, attempt, str(e), metrics)
+        finally:
+            lease.cancel()
+
+        return True
+
+
+# ---------- Crash recovery ----------
+
+async def reconcile_stale_jobs() -> int:
+    """
+    Release jobs left in "processing" by a worker that died.
+
+    A job is stale once its lease has not been renewed for
+    ETL_JOB_LEASE_SECONDS. Queued jobs go back to pending (counting the lost
+    attempt); jobs without a blob path cannot be retried and are failed.
+
+    Returns:
+        Number of jobs reconciled
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=ETL_JOB_LEASE_SECONDS)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.DocumentProcessingJob)
+            .where(
+                models.DocumentProcessingJob.status == "processing",
+                or_(
+                    models.DocumentProcessingJob.locked_at < cutoff,
+                    and_(
+                        models.DocumentProcessingJob.locked_at.is_(None),
+                        models.DocumentProcessingJob.started_at < cutoff
+                    )
+                )
+            )
+            .with_for_update(skip_locked=True)
+        )
+        jobs = result.scalars().all()
+
+        for job in jobs:
+            owner = job.locked_by or "an earlier process"
+            _release_failed_job(job, f"Interrupted: worker {owner} stopped while processing", now)
+            await record_job_outcome(db, job)
+
+        await db.commit()
+
+        for scan_run_id in {job.scan_run_id for job in jobs}:
+            await finish_scan_run_if_done(db, scan_run_id)
+
+    if jobs:
+        logger.info(f"🧹 Reconciled {len(jobs)} interrupted ETL job(s)")
+    return len(jobs)
+
+
+async def run_reconciler(stop: asyncio.Event) -> None:
+    """Reconcile stale jobs at startup and then once per lease period."""
+    while not stop.is_set():
+        try:
+            await reconcile_stale_jobs()
+        except Exception as e:
+            logger.error(f"❌ ETL job reconciliation failed: {e}")
+        await _sleep_until_stopped(stop, ETL_JOB_LEASE_SECONDS)
+
+
+async def run_minhash_backfill(stop: asyncio.Event) -> None:
+    """Sign KB documents indexed before MinHash signatures existed, then exit."""
+    skipped: set = set()
+    while not stop.is_set():
+        try:
+            if await get_etl_pipeline().backfill_signatures(skipped) == 0:
+                break
+        except Exception as e:
+            logger.error(f"❌ MinHash backfill failed: {e}")
+            await _sleep_until_stopped(stop, ETL_WORKER_POLL_SECONDS)
+    if skipped:
+        logger.warning(f"⚠️ MinHash backfill left {len(skipped)} document(s) unsigned")
+
+
+# ---------- Scans ----------
+
+@asynccontextmanager
+async def _scan_lock() -> AsyncIterator[bool]:
+    """
+    Hold the cluster-wide scan lock for the duration of a scan.
+
+    Uses a session-level Postgres advisory lock on a dedicated connection,
+    so it is released if the process dies. Other backends are single-process.
+    """
+    if async_engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SCAN_LOCK_KEY})
+        acquired = bool(result.scalar())
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCAN_LOCK_KEY})
+
+
+async def latest_unfinished_scan(db: AsyncSession) -> Optional[models.ETLScanRun]:
+    """The newest scan run that is still listing or was interrupted, if any."""
+    result = await db.execute(
+        select(models.ETLScanRun)
+        .where(models.ETLScanRun.status.in_(UNFINISHED_SCAN_STATUSES))
+        .order_by(models.ETLScanRun.started_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _start_or_resume_scan(db: AsyncSession, trigger: str) -> models.ETLScanRun:
+    """
+    Resume the latest unfinished scan run, or start a new one.
+
+    Called while holding the scan lock, so a run still marked "running"
+    belongs to a scanner that crashed (or was just requested via the API).
+    """
+    run = await latest_unfinished_scan(db)
+
+    if run:
+        if run.pages_listed:
+            logger.info(f"⏯️  Resuming interrupted ETL scan {run.id} after {run.files_listed} files")
+        run.status = "running"
+        run.error_message = None
+    else:
+        run = models.ETLScanRun(trigger=trigger, status="running")
+        db.add(run)
+
+    run.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    return run
+
+
+async def _listed_recently(db: AsyncSession) -> bool:
+    """A scan finished listing storage less than ETL_SCAN_INTERVAL_MINUTES ago (on any replica)."""
+    since = datetime.now(timezone.utc) - timedelta(minutes=ETL_SCAN_INTERVAL_MINUTES)
+    result = await db.execute(
+        select(models.ETLScanRun.id)
+        .where(
+            models.ETLScanRun.status.in_(["processing", "completed"]),
+            models.ETLScanRun.started_at >= since,
+        )
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+def scan_run_stats(run: models.ETLScanRun) -> Dict:
+    """Summarize a scan run for logs and API responses."""
+    return {
+        "scan_id": str(run.id),
+        "status": run.status,
+        "files_listed": run.files_listed,
+        "changed": run.changed,
+        "unchanged": run.unchanged,
+        "pending_approval": run.pending_approval,
+        "queued": run.queued
+    }
+
+
+async def enqueue_scan(trigger: str = "scheduled") -> Optional[Dict]:
+    """
+    Scan knowledge_base storage and queue new or changed documents.
+
+    Each listing page's jobs are committed together with the scan cursor,
+    so an interrupted scan resumes after the last committed page.
+
+    Returns:
+        Scan stats, or None if another replica is already scanning (or, for
+        scheduled scans, already scanned within ETL_SCAN_INTERVAL_MINUTES)
+    """
+    async with _scan_lock() as acquired:
+        if not acquired:
+            logger.info("⏭️  ETL scan already running on another worker")
+            return None
+
+        async with AsyncSessionLocal() as db:
+            # Every API process runs the scheduler: list storage once per interval, not once per replica
+            if trigger == "scheduled" and not await _has_unfinished_scan() and await _listed_recently(db):
+                logger.info("⏭️  ETL scan skipped: storage was listed within the scan interval")
+                return None
+
+            run = await _start_or_resume_scan(db, trigger)
+            etl = get_etl_pipeline()
+
+            try:
+                pages = azure_blob.list_blob_pages("knowledge_base", continuation_token=run.continuation_token)
+                page_started = time.perf_counter()
+                async for blobs, continuation_token in pages:
+                    run.listing_seconds = (run.listing_seconds or 0.0) + time.perf_counter() - page_started
+                    blob_paths, counts = await etl.filter_changed_blobs(db, blobs)
+
+                    run.queued += await _add_jobs(db, blob_paths, scan_run_id=run.id)
+                    run.files_listed += len(blobs)
+                    run.changed += counts["changed"]
+                    run.unchanged += counts["unchanged"]
+                    run.pending_approval += counts["pending_approval"]
+                    run.pages_listed += 1
+                    run.continuation_token = continuation_token
+                    run.updated_at = datetime.now(timezone.utc)
+                    await db.commit()
+                    page_started = time.perf_counter()
+
+                # Listing done; the run completes when its last queued job finishes
+                run.status = "processing"
+                run.continuation_token = None
+                run.updated_at = datetime.now(timezone.utc)
+                await db.commit()
+                await finish_scan_run_if_done(db, run.id)
+                await db.refresh(run)
+
+            except Exception as e:
+                # Keep the cursor: the next scan resumes from the last committed page
+                await db.rollback()
+                await db.refresh(run)
+                run.status = "interrupted"
+                run.error_message = str(e)
+                run.updated_at = datetime.now(timezone.utc)
+                await db.commit()
+                raise
+
+            stats = scan_run_stats(run)
+            logger.info(f"✅ ETL scan listing completed: {stats}")
+            return stats
+
+
+async def _has_unfinished_scan() -> bool:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.ETLScanRun.id)
+            .where(models.ETLScanRun.status.in_(UNFINISHED_SCAN_STATUSES))
+            .limit(1)
+        )
+        return result.first() is not None
+
+
+async def run_scheduled_scans(stop: asyncio.Event) -> None:
+    """
+    Enqueue a knowledge base scan every ETL_SCAN_INTERVAL_MINUTES.
+
+    A scan interrupted by a crash or restart is resumed right away.
+    """
+    logger.info(f"🤖 ETL scan scheduler started (every {ETL_SCAN_INTERVAL_MINUTES} minutes)")
+
+    try:
+        resume_now = await _has_unfinished_scan()
+    except Exception as e:
+        logger.error(f"❌ Could not check for interrupted ETL scans: {e}")
+        resume_now = False
+
+    while not stop.is_set():
+        if not resume_now:
+            await _sleep_until_stopped(stop, ETL_SCAN_INTERVAL_MINUTES * 60)
+            if stop.is_set():
+                break
+        resume_now = False
+
+        try:
+            logger.info("🔄 Running scheduled ETL scan...")
+            await enqueue_scan()
+        except Exception as e:
+            logger.error(f"❌ Scheduled ETL scan failed: {e}")
+
+
+# ---------- Worker loops ----------
+
+async def _sleep_until_stopped(stop: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_worker(stop: asyncio.Event) -> None:
+    """Claim and process jobs until stopped, polling when the queue is empty."""
+    logger.info(f"🤖 ETL worker {WORKER_ID} started")
+
+    while not stop.is_set():
+        try:
+            worked = await process_next_job()
+        except Exception as e:
+            logger.error(f"❌ ETL worker error: {e}")
+            worked = False
+
+        if not worked:
+            await _sleep_until_stopped(stop, ETL_WORKER_POLL_SECONDS)
+
+    logger.info(f"🛑 ETL worker {WORKER_ID} stopped")
+
+
+def start_worker_tasks(stop: asyncio.Event, concurrency: int = ETL_WORKER_CONCURRENCY) -> List[asyncio.Task]:
+    """Start the worker loops, the stale-job reconciler, the MinHash backfill and the scan scheduler."""
+    tasks = [asyncio.create_task(run_worker(stop)) for _ in range(max(concurrency, 1))]
+    tasks.append(asyncio.create_task(run_reconciler(stop)))
+    tasks.append(asyncio.create_task(run_minhash_backfill(stop)))
+    tasks.append(asyncio.create_task(run_scheduled_scans(stop)))
+    return tasks
@@ -0,0 +1,284 @@
+"""
+Project RFP Precompute
+
+Everything scope and questionnaire generation needs before the LLM call
+depends only on the project's files and metadata: downloading and
+extracting the RFP, the document overview, token counts, the KB
+retrieval queries. It is computed in the background whenever files are
+added or the project is edited, so "Generate" only waits for the LLM.
+
+Artifacts are stored in project_precomputes with the blob ETags and the
+metadata hash they were computed from; generation uses them only while
+both still match and falls back to computing inline otherwise. The RFP
+is also embedded into the per-project RFP collection (partitioned by the
+project_id payload). Projects expose the state as precompute_status;
+runs interrupted by a restart are resumed at startup. Generated files
+(finalized_scope.json, questions.json, diagrams) are not part of the
+input.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import anyio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app import models
+from app.config.config import PRECOMPUTE_CONCURRENCY, PROJECT_RFP_COLLECTION
+from app.config.database import AsyncSessionLocal
+from app.services import rfp_summarizer
+from app.utils import azure_blob
+from app.utils.ai_clients import embed_text_ollama, get_qdrant_client
+from app.utils.chunking import chunk_text, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Project fields that feed the prompts; editing any of them invalidates the artifacts
+METADATA_FIELDS = ("name", "domain", "complexity", "tech_stack", "use_cases", "compliance", "duration")
+
+_tasks: Dict[uuid.UUID, asyncio.Task] = {}
+_rerun: set = set()
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _metadata_hash(project) -> str:
+    values = [str(getattr(project, field, None) or "") for field in METADATA_FIELDS]
+    return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def _project_files(project) -> List[dict]:
+    """Uploaded files only: generated ones (finalized_scope.json, ...) change on every Generate."""
+    from app.utils.scope_engine import is_generated_file
+
+    return [
+        {"file_name": f.file_name, "file_path": f.file_path}
+        for f in project.files
+        if not is_generated_file(f.file_name)
+    ]
+
+
+async def _file_etags(files: List[dict]) -> Dict[str, Optional[str]]:
+    paths = sorted({f["file_path"] for f in files})
+    etags = await asyncio.gather(*(azure_blob.get_blob_etag(path) for path in paths))
+    return dict(zip(paths, etags))
+
+
+async def _set_status(db: AsyncSession, project_id: uuid.UUID, status: Optional[str]) -> None:
+    # Keep updated_at: precompute progress is not a user edit
+    await db.execute(
+        update(models.Project)
+        .where(models.Project.id == project_id)
+        .values(precompute_status=status, updated_at=models.Project.updated_at)
+    )
+    await db.commit()
+
+
+async def request_precompute(db: AsyncSession, project_id: uuid.UUID) -> None:
+    """Mark the project's RFP context as pending and (re)compute it in the background."""
+    await _set_status(db, project_id, "pending")
+    schedule_precompute(project_id)
+
+
+def schedule_precompute(project_id: uuid.UUID) -> None:
+    """Start a precompute for the project, or queue one more run if one is in progress."""
+    task = _tasks.get(project_id)
+    if task is not None and not task.done():
+        _rerun.add(project_id)
+        return
+    _tasks[project_id] = asyncio.create_task(_run(project_id))
+
+
+async def schedule_unfinished_precomputes() -> int:
+    """Restart precomputes left pending or running by a previous process (run at startup)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Project.id).where(models.Project.precompute_status.in_(["pending", "running"]))
+        )
+        project_ids = list(result.scalars().all())
+
+    for project_id in project_ids:
+        schedule_precompute(project_id)
+    if project_ids:
+        logger.info(f"⚡ Resuming {len(project_ids)} unfinished RFP precompute(s)")
+    return len(project_ids)
+
+
+async def _run(project_id: uuid.UUID) -> None:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PRECOMPUTE_CONCURRENCY)
+    try:
+        while True:
+            _rerun.discard(project_id)
+            async with _semaphore:
+                await precompute_project(project_id)
+            # Files were added while computing: run again with the new set
+            if project_id not in _rerun:
+                break
+    finally:
+        _tasks.pop(project_id, None)
+
+
+async def precompute_project(project_id: uuid.UUID) -> None:
+    """Compute and store the generation context of one project."""
+    from app.utils import scope_engine
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Project)
+            .options(selectinload(models.Project.files))
+            .where(models.Project.id == project_id)
+        )
+        project = result.scalar_one_or_none()
+        if project is None:
+            return
+
+        await _set_status(db, project_id, "running")
+        result = await db.execute(
+            select(models.ProjectPrecompute).where(models.ProjectPrecompute.project_id == project_id)
+        )
+        entry = result.scalar_one_or_none()
+        if entry is None:
+            entry = models.ProjectPrecompute(project_id=project_id)
+            db.add(entry)
+
+        try:
+            files = _project_files(project)
+            file_etags = await _file_etags(files)
+
+            # Extraction warms the extracted text cache as well
+            rfp_text = await scope_engine._extract_text_from_files(files) if files else ""
+            rfp_tokens = await anyio.to_thread.run_sync(count_tokens, rfp_text)
+            rfp_overview = scope_engine._extract_document_overview(rfp_text, max_chars=10000)
+            indexed = await index_project_rfp(project_id, rfp_text)
+
+            # RFP sections by aspect (from the index just built) and KB retrieval for both prompts
+            focused_rfp_content, questions_kb_chunks = await anyio.to_thread.run_sync(
+                scope_engine._questions_rfp_context, project, rfp_text, indexed > 0
+            )
+            condensed_rfp = await rfp_summarizer.condense_rfp(rfp_text)
+            scope_rfp_text, scope_kb_chunks = await anyio.to_thread.run_sync(
+                scope_engine._scope_rfp_context, project, condensed_rfp
+            )
+
+            entry.metadata_hash = _metadata_hash(project)
+            entry.file_etags = json.dumps(file_etags)
+            entry.artifacts = json.dumps({
+                "rfp_overview": rfp_overview,
+                "focused_rfp_content": focused_rfp_content,
+                "questions_kb_chunks": questions_kb_chunks,
+                "scope_rfp_text": scope_rfp_text,
+                "scope_kb_chunks": scope_kb_chunks,
+            })
+            entry.rfp_chars = len(rfp_text)
+            entry.rfp_tokens = rfp_tokens
+            entry.rfp_chunks_indexed = indexed
+            entry.error_message = None
+            entry.computed_at = datetime.now(timezone.utc)
+            status = "ready"
+            logger.info(
+                f"⚡ Precomputed RFP context for project {project_id}: "
+                f"{rfp_tokens} tokens, {indexed} chunks indexed"
+            )
+        except Exception as e:
+            entry.error_message = str(e)
+            status = "failed"
+            logger.error(f"❌ RFP precompute failed for project {project_id}: {e}")
+
+        await db.commit()
+        await _set_status(db, project_id, status)
+
+
+async def get_ready_artifacts(db: AsyncSession, project) -> Optional[Dict]:
+    """
+    Return the precomputed generation context if it matches the project's current state.
+
+    Costs one query plus one blob metadata request per file.
+    """
+    if getattr(project, "precompute_status", None) != "ready":
+        return None
+
+    result = await db.execute(
+        select(models.ProjectPrecompute).where(models.ProjectPrecompute.project_id == project.id)
+    )
+    entry = result.scalar_one_or_none()
+    if entry is None or not entry.artifacts or entry.metadata_hash != _metadata_hash(project):
+        return None
+
+    files = _project_files(project)
+    stored_etags = json.loads(entry.file_etags or "{}")
+    if set(stored_etags) != {f["file_path"] for f in files}:
+        return None
+    if await _file_etags(files) != stored_etags:
+        return None
+
+    return json.loads(entry.artifacts)
+
+
+def _delete_project_points(project_id: uuid.UUID) -> None:
+    from qdrant_client import models as models_qdrant
+
+    get_qdrant_client().delete(
+        collection_name=PROJECT_RFP_COLLECTION,
+        points_selector=models_qdrant.FilterSelector(
+            filter=models_qdrant.Filter(
+                must=[
+                    models_qdrant.FieldCondition(
+                        key="project_id",
+                        match=models_qdrant.MatchValue(value=str(project_id))
+                    )
+                ]
+            )
+        )
+    )
+
+
+async def index_project_rfp(project_id: uuid.UUID, rfp_text: str) -> int:
+    """Replace the project's chunks in the RFP collection. Returns the number indexed."""
+    from qdrant_client import models as models_qdrant
+
+    chunks = chunk_text(rfp_text)
+    await anyio.to_thread.run_sync(_delete_project_points, project_id)
+    if not chunks:
+        return 0
+
+    embeddings = await anyio.to_thread.run_sync(embed_text_ollama, chunks)
+    if len(embeddings) != len(chunks):
+        raise ValueError(f"Embedding count mismatch: expected {len(chunks)}, got {len(embeddings)}")
+
+    points = []
+    for idx, (chunk, vector) in enumerate(zip(chunks, embeddings)):
+        point_id_str = f"{project_id}_{idx}"
+        points.append(
+            models_qdrant.PointStruct(
+                id=int(hashlib.sha256(point_id_str.encode()).hexdigest()[:16], 16),
+                vector=vector,
+                payload={
+                    "project_id": str(project_id),
+                    "chunk_index": idx,
+                    "content": chunk,
+                }
+            )
+        )
+
+    client = get_qdrant_client()
+    await anyio.to_thread.run_sync(
+        lambda: client.upsert(collection_name=PROJECT_RFP_COLLECTION, points=points)
+    )
+    return len(points)
+
+
+async def delete_project_index(project_ids: List[uuid.UUID]) -> None:
+    """Remove deleted projects' chunks from the RFP collection."""
+    for project_id in project_ids:
+        try:
+            await anyio.to_thread.run_sync(_delete_project_points, project_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to delete RFP index for project {project_id}: {e}")
@@ -3,11 +3,11 @@ import logging
 import uuid
 import hashlib
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import Dict, Any
 
 from app.utils.ai_clients import embed_text_ollama, get_qdrant_client
+from app.utils.chunking import chunk_text
 from app.config.config import QDRANT_COLLECTION, CASE_STUDY_COLLECTION
-from qdrant_client import models as models_qdrant
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +19,13 @@ async def vectorize_text(text: str, metadata: Dict[str, Any]) -> None:
         logger.warning("⚠️ No text to vectorize.")
         return
 
+    from qdrant_client import models as models_qdrant
+
     try:
         qdrant_client = get_qdrant_client()
         
-        # 1. Chunking (Simple chunking for now)
-        chunks = _chunk_text(text)
+        # 1. Chunking
+        chunks = chunk_text(text)
         
         # 2. Embedding
         embeddings = embed_text_ollama(chunks)
@@ -70,17 +72,3 @@ async def vectorize_text(text: str, metadata: Dict[str, Any]) -> None:
     except Exception as e:
         logger.error(f"❌ Error in vectorize_text: {e}")
         raise e
-
-def _chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
-    """Helper to split text into chunks"""
-    if len(text) <= chunk_size:
-        return [text]
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
-    return chunks
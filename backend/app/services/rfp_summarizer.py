@@ -0,0 +1,193 @@
+"""
+RFP Summarization
+
+Scope generation has a fixed RFP token budget (SCOPE_RFP_TOKENS). Longer
+RFPs used to be cut to their first pages, so requirements further in
+never reached the model. They are now condensed map-reduce style:
+
+    1. Split into sections of SUMMARY_SECTION_TOKENS (structure-aware chunker)
+    2. Summarize every section concurrently through the async LLM client,
+       at most SUMMARY_CONCURRENCY calls in flight, each asked for its
+       share of the budget
+    3. Merge the summaries in document order; if they still exceed the
+       budget, summarize the merged text again (next level)
+
+Wall-clock time is a few waves of parallel calls rather than one call per
+section. Section summaries and final results are cached in summary_cache
+by the SHA256 of their input, so re-generating a scope or re-uploading
+the same RFP costs no LLM calls.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Tuple
+
+import anyio
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.config.config import (
+    AZURE_OPENAI_DEPLOYMENT,
+    SCOPE_RFP_TOKENS,
+    SUMMARY_SECTION_TOKENS,
+    SUMMARY_CONCURRENCY,
+)
+from app.config.database import AsyncSessionLocal
+from app.utils.ai_clients import get_async_azure_client
+from app.utils.chunking import chunk_text, count_tokens, get_encoding
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompt changes so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "1"
+MIN_SUMMARY_TOKENS = 150
+MAX_LEVELS = 3
+
+SUMMARY_PROMPT = """You are condensing one part of an RFP (request for proposal) so that a
+project scope can be written from the summaries of all its parts.
+
+Summarize the text below in at most {target_words} words. Keep every concrete
+requirement, deliverable, integration, constraint, compliance need, timeline,
+milestone, volume and technology that is mentioned. Drop boilerplate, legal
+terms and repetition. Use short bullet points; do not add information.
+
+TEXT:
+{text}
+"""
+
+
+def _cache_key(text: str, target_tokens: int) -> str:
+    return hashlib.sha256(f"{SUMMARY_PROMPT_VERSION}:{target_tokens}:{text}".encode("utf-8")).hexdigest()
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    return encoding.decode(encoding.encode_ordinary(text)[:max_tokens])
+
+
+async def _load_cached(keys: List[str]) -> Dict[str, str]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.SummaryCache.content_hash, models.SummaryCache.summary).where(
+                models.SummaryCache.content_hash.in_(keys)
+            )
+        )
+        return dict(result.all())
+
+
+async def _store(summaries: Dict[str, str]) -> None:
+    if not summaries:
+        return
+    async with AsyncSessionLocal() as db:
+        db.add_all(models.SummaryCache(content_hash=k, summary=v) for k, v in summaries.items())
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Summarized concurrently by another request; store the rest one by one
+            await db.rollback()
+            for key, summary in summaries.items():
+                db.add(models.SummaryCache(content_hash=key, summary=summary))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    await db.rollback()
+
+
+async def _summarize_section(semaphore: asyncio.Semaphore, text: str, target_tokens: int) -> str:
+    """One LLM call; returns "" on failure."""
+    prompt = SUMMARY_PROMPT.format(target_words=int(target_tokens * 0.75), text=text)
+    async with semaphore:
+        try:
+            response = await get_async_azure_client().chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                max_tokens=target_tokens,
+            )
+            return (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            logger.warning(f"⚠️ Section summarization failed: {e}")
+            return ""
+
+
+async def _summarize_sections(sections: List[str], target_tokens: int) -> Tuple[List[str], bool]:
+    """
+    Summarize sections concurrently, reusing cached summaries.
+
+    Returns the summaries and whether any section fell back to its truncated start.
+    """
+    keys = [_cache_key(section, target_tokens) for section in sections]
+    cached = await _load_cached(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_summarize_section(semaphore, sections[i], target_tokens) for i in missing)
+    )
+
+    fresh = {}
+    for i, summary in zip(missing, results):
+        if summary:
+            fresh[keys[i]] = summary
+            cached[keys[i]] = summary
+    await _store(fresh)
+
+    failed = len(missing) - len(fresh)
+    logger.info(
+        f"🧾 Summarized {len(sections)} sections ({len(sections) - len(missing)} cached, "
+        f"{len(fresh)} new, {failed} failed)"
+    )
+    # A failed call keeps the start of its section rather than dropping it
+    summaries = [
+        cached.get(key) or _truncate(section, target_tokens)
+        for key, section in zip(keys, sections)
+    ]
+    return summaries, failed > 0
+
+
+async def condense_rfp(rfp_text: str, budget_tokens: int = SCOPE_RFP_TOKENS) -> str:
+    """
+    Return the RFP unchanged if it fits the token budget, otherwise a merged
+    hierarchical summary that does.
+
+    Args:
+        rfp_text: Full RFP text
+        budget_tokens: Maximum tokens of the result
+    """
+    tokens = await anyio.to_thread.run_sync(count_tokens, rfp_text)
+    if tokens <= budget_tokens:
+        return rfp_text
+
+    final_key = _cache_key(rfp_text, budget_tokens)
+    cached = await _load_cached([final_key])
+    if final_key in cached:
+        logger.info(f"🧾 Using cached RFP summary ({tokens} tokens -> budget {budget_tokens})")
+        return cached[final_key]
+
+    text = rfp_text
+    degraded = False
+    for level in range(1, MAX_LEVELS + 1):
+        sections = await anyio.to_thread.run_sync(
+            lambda: chunk_text(text, max_tokens=SUMMARY_SECTION_TOKENS, overlap_tokens=0)
+        )
+        target_tokens = max(MIN_SUMMARY_TOKENS, budget_tokens // max(len(sections), 1))
+        summaries, fell_back = await _summarize_sections(sections, target_tokens)
+        degraded = degraded or fell_back
+        text = "\n\n".join(summaries)
+
+        tokens_after = await anyio.to_thread.run_sync(count_tokens, text)
+        logger.info(f"🧾 Summary level {level}: {len(sections)} sections -> {tokens_after} tokens")
+        if tokens_after <= budget_tokens:
+            break
+    else:
+        text = await anyio.to_thread.run_sync(_truncate, text, budget_tokens)
+
+    if degraded:
+        # Not cached, so the next call retries the failed sections
+        logger.warning("⚠️ RFP summary used truncated sections; not caching it")
+    else:
+        await _store({final_key: text})
+    logger.info(f"✅ Condensed RFP from {tokens} tokens to fit {budget_tokens}")
+    return text
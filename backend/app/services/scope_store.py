@@ -0,0 +1,278 @@
+"""
+Project Scope Store
+
+The finalized scope used to live only in finalized_scope.json: every
+export, preview, case study lookup and GET /finalized_scope found the
+ProjectFile row, downloaded the blob and parsed it.
+
+Scopes are now saved as rows of project_scope_versions (JSON, version
+number, SHA256 of the content). Reads are one indexed query on
+(project_id, version); saving a scope identical to the latest version
+adds nothing. The SHA256 doubles as ETag so clients can revalidate
+cheaply.
+
+finalized_scope.json is still written (compact) and keeps its
+ProjectFile row, but as an archive copy: a background task uploads the
+latest version after the save commits and marks it archived_at. Versions
+left unarchived by a failed or interrupted upload are picked up again at
+startup. Scopes saved before this table existed are copied from their
+blob on first read.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app import models
+from app.config.database import AsyncSessionLocal
+from app.utils import azure_blob
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_BASE = "projects"
+SCOPE_FILE_NAME = "finalized_scope.json"
+
+SAVE_ATTEMPTS = 3  # Concurrent saves of one project race for the next version number
+ARCHIVE_RETRY_DELAYS = [2, 10, 60]  # Seconds before retrying a failed archive upload
+
+# Running archive upload per project, and projects saved again meanwhile
+_tasks: Dict[uuid.UUID, asyncio.Task] = {}
+_rerun: Set[uuid.UUID] = set()
+
+
+def scope_blob_path(project_id: uuid.UUID) -> str:
+    return f"{PROJECTS_BASE}/{project_id}/{SCOPE_FILE_NAME}"
+
+
+def _serialize(scope: Dict[str, Any]) -> bytes:
+    return json.dumps(scope, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_hash(scope: Dict[str, Any]) -> str:
+    return hashlib.sha256(_serialize(scope)).hexdigest()
+
+
+def etag(version: models.ProjectScopeVersion) -> str:
+    return f'"{version.content_hash}"'
+
+
+def version_info(version: models.ProjectScopeVersion) -> Dict[str, Any]:
+    return {
+        "version": version.version,
+        "content_hash": version.content_hash,
+        "created_at": version.created_at.isoformat() if version.created_at else None,
+        "archived": version.archived_at is not None,
+    }
+
+
+async def _latest(
+    db: AsyncSession, project_id: uuid.UUID, with_scope: bool = True
+) -> Optional[models.ProjectScopeVersion]:
+    query = (
+        select(models.ProjectScopeVersion)
+        .where(models.ProjectScopeVersion.project_id == project_id)
+        .order_by(models.ProjectScopeVersion.version.desc())
+        .limit(1)
+    )
+    if not with_scope:
+        query = query.options(defer(models.ProjectScopeVersion.scope))
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def _scope_file(db: AsyncSession, project_id: uuid.UUID) -> Optional[models.ProjectFile]:
+    result = await db.execute(
+        select(models.ProjectFile).filter(
+            models.ProjectFile.project_id == project_id,
+            models.ProjectFile.file_name == SCOPE_FILE_NAME,
+        )
+    )
+    return result.scalars().first()
+
+
+async def _import_from_blob(db: AsyncSession, project_id: uuid.UUID) -> Optional[models.ProjectScopeVersion]:
+    """Store the blob-only scope of a project saved before scope versions existed."""
+    db_file = await _scope_file(db, project_id)
+    if not db_file:
+        return None
+    try:
+        scope = json.loads((await azure_blob.download_bytes(db_file.file_path)).decode("utf-8"))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to load finalized scope from blob {db_file.file_path}: {e}")
+        return None
+
+    version = models.ProjectScopeVersion(
+        project_id=project_id,
+        version=1,
+        scope=scope,
+        content_hash=content_hash(scope),
+        archived_at=datetime.now(timezone.utc),
+    )
+    db.add(version)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Imported concurrently by another request
+        await db.rollback()
+        return await _latest(db, project_id)
+    logger.info(f"📥 Imported finalized scope of project {project_id} from blob storage")
+    return version
+
+
+async def get_latest_version(
+    db: AsyncSession, project_id: uuid.UUID, with_scope: bool = True
+) -> Optional[models.ProjectScopeVersion]:
+    """
+    Latest scope version of a project, or None if it has no finalized scope.
+
+    with_scope=False leaves the scope itself unloaded (version/ETag checks).
+    """
+    version = await _latest(db, project_id, with_scope=with_scope)
+    if version is None:
+        version = await _import_from_blob(db, project_id)
+    return version
+
+
+async def load_scope(db: AsyncSession, project_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+    """The project's finalized scope, or None if it has none."""
+    version = await get_latest_version(db, project_id)
+    # Callers add keys (related_case_study, ...) to the result
+    return dict(version.scope) if version else None
+
+
+async def save_scope(
+    db: AsyncSession, project_id: uuid.UUID, scope: Dict[str, Any]
+) -> Tuple[models.ProjectFile, models.ProjectScopeVersion]:
+    """
+    Store a scope as the project's latest version and archive it to blob storage.
+
+    Commits the session. Returns the finalized_scope.json ProjectFile and
+    the version (the existing latest one if the scope is unchanged).
+    """
+    digest = content_hash(scope)
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        latest = await _latest(db, project_id, with_scope=False)
+        if latest is not None and latest.content_hash == digest:
+            version = latest
+        else:
+            version = models.ProjectScopeVersion(
+                project_id=project_id,
+                version=(latest.version + 1) if latest else 1,
+                scope=scope,
+                content_hash=digest,
+            )
+            db.add(version)
+
+        db_file = await _scope_file(db, project_id)
+        if not db_file:
+            db_file = models.ProjectFile(
+                project_id=project_id,
+                file_name=SCOPE_FILE_NAME,
+                file_path=scope_blob_path(project_id),
+            )
+            db.add(db_file)
+
+        try:
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+            if attempt == SAVE_ATTEMPTS:
+                raise
+            logger.info(f"🔁 Scope version of project {project_id} taken concurrently, retrying")
+
+    await db.refresh(db_file)
+    if version.archived_at is None:
+        schedule_archive(project_id)
+    logger.info(f"💾 Saved scope v{version.version} of project {project_id}")
+    return db_file, version
+
+
+async def archive_latest(project_id: uuid.UUID) -> bool:
+    """
+    Write the latest scope version of a project to finalized_scope.json.
+
+    Returns True once the latest version is archived (also when there is
+    nothing to do).
+    """
+    async with AsyncSessionLocal() as db:
+        version = await _latest(db, project_id)
+        if version is None or version.archived_at is not None:
+            return True
+
+        await azure_blob.upload_bytes(_serialize(version.scope), scope_blob_path(project_id), overwrite=True)
+        await db.execute(
+            update(models.ProjectScopeVersion)
+            .where(models.ProjectScopeVersion.id == version.id)
+            .values(archived_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+        logger.info(f"📦 Archived scope v{version.version} of project {project_id}")
+        return True
+
+
+def schedule_archive(project_id: uuid.UUID) -> None:
+    """Archive the project's latest scope in the background (again, if one is running)."""
+    task = _tasks.get(project_id)
+    if task is not None and not task.done():
+        _rerun.add(project_id)
+        return
+    _tasks[project_id] = asyncio.create_task(_run_archive(project_id))
+
+
+async def _run_archive(project_id: uuid.UUID) -> None:
+    try:
+        while True:
+            _rerun.discard(project_id)
+            for attempt, delay in enumerate([0] + ARCHIVE_RETRY_DELAYS):
+                await asyncio.sleep(delay)
+                try:
+                    await archive_latest(project_id)
+                    break
+                except Exception as e:
+                    logger.warning(f"⚠️ Scope archive of project {project_id} failed (attempt {attempt + 1}): {e}")
+            else:
+                logger.error(f"❌ Giving up archiving the scope of project {project_id} until restart")
+            # Saved again while uploading: archive the newer version
+            if project_id not in _rerun:
+                break
+    finally:
+        _tasks.pop(project_id, None)
+
+
+async def schedule_pending_archives() -> int:
+    """Archive latest versions that never reached blob storage (run at startup)."""
+    latest_versions = (
+        select(
+            models.ProjectScopeVersion.project_id,
+            func.max(models.ProjectScopeVersion.version).label("version"),
+        )
+        .group_by(models.ProjectScopeVersion.project_id)
+        .subquery()
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.ProjectScopeVersion.project_id)
+            .join(
+                latest_versions,
+                (models.ProjectScopeVersion.project_id == latest_versions.c.project_id)
+                & (models.ProjectScopeVersion.version == latest_versions.c.version),
+            )
+            .where(models.ProjectScopeVersion.archived_at.is_(None))
+        )
+        project_ids = list(result.scalars().all())
+
+    for project_id in project_ids:
+        schedule_archive(project_id)
+    if project_ids:
+        logger.info(f"📦 Archiving {len(project_ids)} unarchived project scope(s)")
+    return len(project_ids)
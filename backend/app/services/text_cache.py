@@ -0,0 +1,94 @@
+"""
+Extracted Text Cache
+
+Parsing a project file (pdfminer, OCR, python-docx...) is far more
+expensive than reading it back from the database, and the same RFP is
+read by question generation, scope generation, finalization and every
+export. Extracted text is stored once per blob path together with the
+SHA256 of the file bytes and the blob ETag it was checked against.
+
+A lookup costs one blob metadata request while the ETag is unchanged.
+When the ETag moved, the file is downloaded and hashed: identical bytes
+reuse the cached text, changed bytes are re-extracted and replace it.
+Empty extractions (parser failures) are not cached.
+Rows are removed with their ProjectFile / Project.
+"""
+
+import hashlib
+import logging
+from io import BytesIO
+from typing import Optional
+
+import anyio
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.config.database import AsyncSessionLocal
+from app.utils import azure_blob
+
+logger = logging.getLogger(__name__)
+
+
+async def _load(blob_path: str) -> Optional[models.ExtractedTextCache]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.ExtractedTextCache).where(models.ExtractedTextCache.blob_path == blob_path)
+        )
+        return result.scalar_one_or_none()
+
+
+async def _store(blob_path: str, content_hash: str, etag: Optional[str], text: str) -> None:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.ExtractedTextCache).where(models.ExtractedTextCache.blob_path == blob_path)
+        )
+        entry = result.scalar_one_or_none()
+        if entry is None:
+            entry = models.ExtractedTextCache(blob_path=blob_path)
+            db.add(entry)
+        entry.content_hash = content_hash
+        entry.etag = etag
+        entry.text = text
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request cached the same file concurrently
+            await db.rollback()
+
+
+async def _extract(data: bytes, file_name: str) -> str:
+    from app.utils.scope_engine import extract_text_from_file
+
+    return await anyio.to_thread.run_sync(extract_text_from_file, BytesIO(data), file_name)
+
+
+async def get_extracted_text(blob_path: str, file_name: str) -> str:
+    """
+    Return the extracted text of a stored file, extracting it only on a cache miss.
+
+    Args:
+        blob_path: Full blob path (e.g. "projects/<id>/<file>")
+        file_name: Original file name (selects the parser)
+    """
+    cached = await _load(blob_path)
+    etag = await azure_blob.get_blob_etag(blob_path)
+    if cached and etag and cached.etag == etag:
+        logger.debug(f"📄 Extracted text cache hit: {blob_path}")
+        return cached.text
+
+    data = await azure_blob.download_bytes(blob_path)
+    content_hash = hashlib.sha256(data).hexdigest()
+    if cached and cached.content_hash == content_hash:
+        # Blob rewritten with identical bytes: keep the text, remember the new ETag
+        await _store(blob_path, content_hash, etag, cached.text)
+        return cached.text
+
+    text = await _extract(data, file_name)
+    if not text:
+        # The extractors return "" on failure (missing OCR binary, corrupt file...): retry next time
+        logger.warning(f"⚠️ No text extracted from {file_name}; not caching it")
+        return text
+    await _store(blob_path, content_hash, etag, text)
+    logger.info(f"📄 Extracted and cached text for {file_name} ({len(text)} chars)")
+    return text
@@ -0,0 +1,205 @@
+"""
+Direct Upload Sessions
+
+Uploading through the API (crud.add_project_files, /api/blobs/upload/*)
+streams every file through an API worker, so large RFP packs and KB
+dumps tie up a worker and cross the network twice.
+
+An upload session hands the client one create-only SAS URL per file
+(valid UPLOAD_SESSION_TTL_MINUTES), which cannot overwrite existing
+blobs: project files get unique names, and knowledge base sessions
+(superusers only) refuse paths that already exist. The browser uploads straight to
+Azure (Put Blob, or Put Block + Put Block List for large files) and then
+completes the session: the blobs that arrived are registered as
+ProjectFiles (project uploads) or queued for ETL (knowledge base
+uploads). Backend memory and bandwidth no longer grow with upload size.
+
+Completion is idempotent: the session is claimed with a conditional
+UPDATE in the same transaction that adds the ProjectFiles, so a retried
+or duplicated callback registers nothing twice.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config.config import UPLOAD_SESSION_TTL_MINUTES, UPLOAD_SESSION_MAX_FILES
+from app.services import project_precompute
+from app.utils import azure_blob
+from app.utils.blob_backends import UnsupportedOperation
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_BASE = "projects"
+
+
+def _blob_path(base: str, file_name: str, folder: str, project_id: Optional[uuid.UUID]) -> str:
+    # Same naming as the multipart upload endpoints
+    safe_name = file_name.replace(" ", "_").strip("/")
+    if project_id:
+        return f"{PROJECTS_BASE}/{project_id}/{uuid.uuid4()}_{safe_name}"
+    folder = folder.strip().strip("/")
+    return azure_blob._normalize_path(f"{folder}/{safe_name}" if folder else safe_name, base)
+
+
+def session_status(session: models.UploadSession) -> Dict:
+    files = json.loads(session.files)
+    result = {
+        "session_id": str(session.id),
+        "base": session.base,
+        "project_id": str(session.project_id) if session.project_id else None,
+        "status": session.status,
+        "expires_at": session.expires_at.isoformat() if session.expires_at else None,
+        "completed_at": session.completed_at.isoformat() if session.completed_at else None,
+    }
+    if session.status == "completed":
+        result["uploaded"] = [f["path"] for f in files if f.get("uploaded")]
+        result["missing"] = [f["path"] for f in files if not f.get("uploaded")]
+    else:
+        result["files"] = [{"file_name": f["file_name"], "path": f["path"]} for f in files]
+    return result
+
+
+async def create_session(
+    db: AsyncSession,
+    owner_id: uuid.UUID,
+    base: str,
+    file_names: List[str],
+    folder: str = "",
+    project_id: Optional[uuid.UUID] = None,
+) -> Dict:
+    """
+    Start an upload session and return a write-only upload URL for every file.
+
+    Args:
+        owner_id: User completing the session later
+        base: "projects" or "knowledge_base"
+        file_names: Client-side names (may contain "/" for folder uploads)
+        folder: Destination folder under a knowledge base upload
+        project_id: Project the files belong to (ownership checked by the caller)
+    """
+    file_names = [name for name in file_names if name and name.strip("/")]
+    if not file_names:
+        raise HTTPException(400, "No files to upload")
+    if len(file_names) > UPLOAD_SESSION_MAX_FILES:
+        raise HTTPException(400, f"At most {UPLOAD_SESSION_MAX_FILES} files per upload session")
+
+    files = [
+        {"file_name": name, "path": _blob_path(base, name, folder, project_id)}
+        for name in file_names
+    ]
+    # Project paths are unique; other uploads must not replace existing blobs
+    if not project_id:
+        infos = await asyncio.gather(*(azure_blob.get_blob_info(f["path"]) for f in files))
+        existing = [f["path"] for f, info in zip(files, infos) if info is not None]
+        if existing:
+            raise HTTPException(409, f"Blobs already exist: {', '.join(existing)}")
+    # Sign the URLs before storing the session so an unsupported backend leaves no row behind
+    try:
+        upload_urls = [
+            azure_blob.generate_upload_url(f["path"], expiry_minutes=UPLOAD_SESSION_TTL_MINUTES)
+            for f in files
+        ]
+    except UnsupportedOperation as e:
+        raise HTTPException(501, f"{e}; use the multipart upload endpoints instead")
+
+    session = models.UploadSession(
+        owner_id=owner_id,
+        base=base,
+        project_id=project_id,
+        files=json.dumps(files),
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=UPLOAD_SESSION_TTL_MINUTES),
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+
+    result = session_status(session)
+    for item, url in zip(result["files"], upload_urls):
+        item["upload_url"] = url
+    logger.info(f"📤 Upload session {session.id}: {len(files)} file(s) to {base}")
+    return result
+
+
+async def get_session(db: AsyncSession, session_id: uuid.UUID, owner_id: uuid.UUID) -> models.UploadSession:
+    result = await db.execute(
+        select(models.UploadSession).where(
+            models.UploadSession.id == session_id,
+            models.UploadSession.owner_id == owner_id,
+        )
+    )
+    session = result.scalar_one_or_none()
+    if not session:
+        raise HTTPException(404, "Upload session not found")
+    return session
+
+
+async def complete_session(db: AsyncSession, session: models.UploadSession) -> Dict:
+    """
+    Register the files of a session that reached storage.
+
+    Project uploads become ProjectFiles (and refresh the project's
+    precompute), knowledge base uploads are queued for ETL. Files the
+    client never uploaded are reported as missing. Completing a session
+    again returns the first result.
+    """
+    if session.status == "completed":
+        return session_status(session)
+
+    files = json.loads(session.files)
+    infos = await asyncio.gather(*(azure_blob.get_blob_info(f["path"]) for f in files))
+    for f, info in zip(files, infos):
+        f["uploaded"] = info is not None
+    uploaded = [f for f in files if f["uploaded"]]
+
+    now = datetime.now(timezone.utc)
+    claimed = await db.execute(
+        update(models.UploadSession)
+        .where(
+            models.UploadSession.id == session.id,
+            models.UploadSession.status == "pending",
+        )
+        .values(status="completed", files=json.dumps(files), completed_at=now)
+    )
+    if claimed.rowcount == 0:
+        # Completed concurrently by another request
+        await db.rollback()
+        await db.refresh(session)
+        return session_status(session)
+
+    if session.project_id and uploaded:
+        db.add_all(
+            models.ProjectFile(project_id=session.project_id, file_name=f["file_name"], file_path=f["path"])
+            for f in uploaded
+        )
+    await db.commit()
+    await db.refresh(session)
+
+    paths = [f["path"] for f in uploaded]
+    # Written straight to storage, so the download cache has not seen these versions
+    azure_blob.forget_cached(paths)
+
+    if session.project_id and uploaded:
+        await project_precompute.request_precompute(db, session.project_id)
+    elif session.base == "knowledge_base" and uploaded:
+        try:
+            from app.services import etl_queue
+
+            await etl_queue.enqueue_blobs(db, paths)
+        except Exception as e:
+            # Files are stored; the next scheduled scan picks them up
+            logger.error(f"❌ Failed to queue uploaded KB documents for ETL: {e}")
+
+    logger.info(
+        f"✅ Upload session {session.id} completed: {len(uploaded)} uploaded, "
+        f"{len(files) - len(uploaded)} missing"
+    )
+    return session_status(session)
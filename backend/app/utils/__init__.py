@@ -1,3 +1,10 @@
-from . import ai_clients,emails, azure_blob, export
+import importlib
 
 __all__ = ["emails", "ai_clients", "azure_blob", "export"]
+
+
+def __getattr__(name):
+    # Submodules load on first access so importing the package stays cheap
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,11 +3,7 @@ import logging
 import os
 import time
 from functools import lru_cache
-from typing import List, Dict, Any
-
-from openai import AzureOpenAI, AsyncAzureOpenAI
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+from typing import TYPE_CHECKING, List, Dict, Any
 
 from app.config.config import (
     AZURE_OPENAI_ENDPOINT,
@@ -15,16 +11,25 @@ from app.config.config import (
     AZURE_OPENAI_DEPLOYMENT,
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
     AZURE_OPENAI_API_VERSION,
+    EMBED_BATCH_SIZE,
     QDRANT_HOST,
     QDRANT_PORT,
     QDRANT_COLLECTION,
     CASE_STUDY_COLLECTION,
+    PROJECT_RFP_COLLECTION,
     VECTOR_DIM,
 )
 
+if TYPE_CHECKING:
+    from openai import AzureOpenAI, AsyncAzureOpenAI
+    from qdrant_client import QdrantClient
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# The SDKs below are imported and the clients created on first use, so
+# importing this module (and the app) costs no SDK import or network call.
+
 __all__ = [
     "get_llm_client",
     "get_embed_client",
@@ -39,6 +44,8 @@ __all__ = [
 @lru_cache(maxsize=1)
 def get_azure_client() -> AzureOpenAI:
     """Return synchronous Azure OpenAI client."""
+    from openai import AzureOpenAI
+
     return AzureOpenAI(
         azure_endpoint=AZURE_OPENAI_ENDPOINT,
         api_key=AZURE_OPENAI_KEY,
@@ -48,6 +55,8 @@ def get_azure_client() -> AzureOpenAI:
 @lru_cache(maxsize=1)
 def get_async_azure_client() -> AsyncAzureOpenAI:
     """Return asynchronous Azure OpenAI client."""
+    from openai import AsyncAzureOpenAI
+
     return AsyncAzureOpenAI(
         azure_endpoint=AZURE_OPENAI_ENDPOINT,
         api_key=AZURE_OPENAI_KEY,
@@ -84,6 +93,9 @@ def get_embed_client() -> dict:
 def embed_text_azure(texts: List[str]) -> List[List[float]]:
     """
     Generate embeddings using Azure OpenAI.
+
+    Inputs are sent in batches of EMBED_BATCH_SIZE, so callers can embed
+    every chunk of a large document or deck in one call.
     """
     if not isinstance(texts, list):
         texts = [str(texts)]
@@ -95,12 +107,15 @@ def embed_text_azure(texts: List[str]) -> List[List[float]]:
 
     try:
         client = get_azure_client()
-        # Azure OpenAI embedding call
-        response = client.embeddings.create(
-            input=texts,
-            model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT
-        )
-        return [data.embedding for data in response.data]
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            # Azure OpenAI embedding call
+            response = client.embeddings.create(
+                input=texts[start:start + EMBED_BATCH_SIZE],
+                model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT
+            )
+            embeddings.extend(data.embedding for data in sorted(response.data, key=lambda d: d.index))
+        return embeddings
     except Exception as e:
         logger.error(f"❌ Azure embedding failed: {e}")
         return []
@@ -116,6 +131,9 @@ embed_text_ollama = embed_text_azure
 @lru_cache(maxsize=1)
 def get_qdrant_client() -> QdrantClient:
     """Initialize or reuse a Qdrant client (auto-creates collections if missing)."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+
     try:
         client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
 
@@ -144,6 +162,22 @@ def get_qdrant_client() -> QdrantClient:
             )
             logger.info(f"✅ Created Qdrant collection '{CASE_STUDY_COLLECTION}' ({VECTOR_DIM} dims)")
 
+        # Create project RFP collection (one partition per project via payload index)
+        if PROJECT_RFP_COLLECTION not in existing:
+            client.create_collection(
+                collection_name=PROJECT_RFP_COLLECTION,
+                vectors_config=models.VectorParams(
+                    size=VECTOR_DIM,
+                    distance=models.Distance.COSINE,
+                ),
+            )
+            client.create_payload_index(
+                collection_name=PROJECT_RFP_COLLECTION,
+                field_name="project_id",
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+            logger.info(f"✅ Created Qdrant collection '{PROJECT_RFP_COLLECTION}' ({VECTOR_DIM} dims)")
+
         return client
 
     except Exception as e:
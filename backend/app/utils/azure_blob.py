@@ -1,34 +1,20 @@
 # app/utils/azure_blob.py
-from typing import List, Dict, Union
-import anyio, asyncio
-from azure.storage.blob.aio import BlobServiceClient, ContainerClient
-from azure.storage.blob import generate_container_sas, ContainerSasPermissions
-from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
-from app.config import config
-from datetime import datetime, timedelta
+# Blob storage helpers used across the app. Operations go to the backend
+# selected by BLOB_BACKEND (Azure container or local directory), see blob_backends.
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple, Union
+import anyio, asyncio, logging, time
+from app.config.config import UPLOAD_CONCURRENCY, BLOB_LISTING_CACHE_SECONDS
+from azure.core.exceptions import ResourceNotFoundError, ResourceNotModifiedError
+from app.utils import blob_cache
+from app.utils.blob_backends import BlobInfo, BlobStream, get_backend
 # from app.utils.blob_to_qdrant import process_blob_and_store_vectors
 
-# Config
-AZURE_STORAGE_ACCOUNT = config.AZURE_STORAGE_ACCOUNT
-AZURE_STORAGE_KEY = config.AZURE_STORAGE_KEY
-AZURE_STORAGE_CONTAINER = config.AZURE_STORAGE_CONTAINER or "scopingbot"
+logger = logging.getLogger(__name__)
 
-if not AZURE_STORAGE_ACCOUNT or not AZURE_STORAGE_KEY:
-    raise RuntimeError("Azure Storage credentials missing in config.py/.env")
-
-_blob_service: BlobServiceClient = BlobServiceClient(
-    account_url=f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net",
-    credential=AZURE_STORAGE_KEY,
-)
-
-container: ContainerClient = _blob_service.get_container_client(AZURE_STORAGE_CONTAINER)
 
 # Ensure container exists
 async def init_container():
-    try:
-        await container.create_container()
-    except ResourceExistsError:
-        pass
+    await get_backend().init()
 
 
 # Helpers
@@ -48,11 +34,13 @@ async def upload_bytes(
     overwrite: bool = True
 ) -> str:
     path = _normalize_path(blob_name, base)
-    blob = container.get_blob_client(path)
 
     for attempt in range(3):
         try:
-            await blob.upload_blob(data, overwrite=overwrite)
+            await get_backend().upload(path, data, overwrite=overwrite)
+            if blob_cache.cache:
+                blob_cache.cache.invalidate(path)
+            _invalidate_listings(path)
             return path
         except Exception as e:
             # Azure may briefly reject upload if the blob was just deleted
@@ -64,6 +52,70 @@ async def upload_bytes(
             raise
 
 
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Bytes read from an upload (and staged as one block) at a time
+
+
+async def upload_fileobj(fileobj: Any, blob_name: str, base: str = "", overwrite: bool = True) -> str:
+    """
+    Stream a file to storage chunk by chunk instead of reading it into memory.
+
+    Args:
+        fileobj: Async file such as fastapi.UploadFile (read(size) and seek(offset))
+    """
+    path = _normalize_path(blob_name, base)
+
+    async def chunks() -> AsyncIterator[bytes]:
+        while True:
+            chunk = await fileobj.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    for attempt in range(3):
+        try:
+            if attempt:
+                await fileobj.seek(0)
+            await get_backend().upload_stream(path, chunks(), overwrite=overwrite)
+            if blob_cache.cache:
+                blob_cache.cache.invalidate(path)
+            _invalidate_listings(path)
+            return path
+        except Exception as e:
+            if attempt < 2:
+                print(f" Upload retry {attempt+1}/3 for {path}: {e}")
+                await anyio.sleep(1.0)
+                continue
+            print(f" Upload failed permanently for {path}: {e}")
+            raise
+
+
+async def upload_fileobjs(
+    uploads: List[Tuple[Any, str]],
+    base: str = "",
+    concurrency: int = UPLOAD_CONCURRENCY
+) -> List[str]:
+    """
+    Stream many (fileobj, blob_name) uploads, at most `concurrency` at a time.
+
+    Returns the paths in input order; raises the first error once every
+    upload has finished.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _upload(fileobj: Any, blob_name: str) -> str:
+        async with semaphore:
+            return await upload_fileobj(fileobj, blob_name, base)
+
+    results = await asyncio.gather(
+        *(_upload(fileobj, blob_name) for fileobj, blob_name in uploads),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
 async def upload_file(path: str, blob_name: str, base: str = "") -> str:
     with open(path, "rb") as f:
         data = f.read()
@@ -84,9 +136,69 @@ async def download_bytes(blob_name: str, base: str = "", timeout: int = 300) ->
         Blob content as bytes
     """
     path = _normalize_path(blob_name, base)
-    blob = container.get_blob_client(path)
-    stream = await blob.download_blob(timeout=timeout)
-    return await stream.readall()
+    backend = get_backend()
+    cache = blob_cache.cache if backend.remote else None
+    if cache is None:
+        data, _ = await backend.download(path, timeout=timeout)
+        return data
+
+    # Conditional GET against the cached copy: a 304 is served from local disk
+    cached_etag = await cache.etag(path)
+    if cached_etag:
+        try:
+            data, etag = await backend.download(path, if_none_match=cached_etag, timeout=timeout)
+        except ResourceNotModifiedError:
+            data = await cache.read(path, cached_etag)
+            if data is not None:
+                return data
+            data, etag = await backend.download(path, timeout=timeout)
+    else:
+        data, etag = await backend.download(path, timeout=timeout)
+
+    await cache.put(path, etag, data)
+    return data
+
+async def open_download_stream(
+    blob_name: str,
+    base: str = "",
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    if_none_match: Optional[str] = None,
+) -> BlobStream:
+    """
+    Start a streamed download without reading the body.
+
+    Iterate the returned stream's chunks() to receive the content in
+    fixed-size pieces; .size is the number of bytes that will be sent,
+    .total_size and .etag describe the whole blob.
+
+    Raises:
+        ResourceNotFoundError: The blob does not exist
+        ResourceNotModifiedError: if_none_match matches the current ETag
+        RangeNotSatisfiable: offset is past the end of the blob
+    """
+    path = _normalize_path(blob_name, base)
+    return await get_backend().open_stream(path, offset=offset, length=length, if_none_match=if_none_match)
+
+async def get_blob_size(blob_name: str, base: str = "") -> int:
+    path = _normalize_path(blob_name, base)
+    return (await get_backend().properties(path)).size
+
+async def get_blob_etag(blob_name: str, base: str = "") -> Optional[str]:
+    """Return the blob's current ETag (metadata request only), or None if it does not exist."""
+    path = _normalize_path(blob_name, base)
+    try:
+        return (await get_backend().properties(path)).etag
+    except ResourceNotFoundError:
+        return None
+
+async def get_blob_info(blob_name: str, base: str = "") -> Optional[BlobInfo]:
+    """Size, ETag and modification time of a blob, or None if it does not exist."""
+    path = _normalize_path(blob_name, base)
+    try:
+        return await get_backend().properties(path)
+    except ResourceNotFoundError:
+        return None
 
 async def download_text(blob_name: str, base: str = "", encoding: str = "utf-8") -> str:
     raw = await download_bytes(blob_name, base)
@@ -108,7 +220,7 @@ async def build_tree(base: str, prefix: str = "") -> List[Dict]:
     items: List[Dict] = []
     seen_folders = set()
 
-    async for blob in container.list_blobs(name_starts_with=path):
+    async for blob in get_backend().list(path):
         relative = blob.name[len(path):]
         if not relative:
             continue
@@ -139,51 +251,182 @@ async def explorer(base: str) -> Dict:
     return {"base": base, "children": await build_tree(base)}
 
 
+# Folder listings for the explorer, one level per call. Cached per folder
+# for BLOB_LISTING_CACHE_SECONDS; writes and deletes through this module
+# drop the listings of every folder above the blob (other processes see
+# the change once their entry expires).
+MAX_CACHED_LISTINGS = 1024
+
+_listings: Dict[str, Dict[Tuple[Optional[str], int], Tuple[float, Dict]]] = {}
+_listing_generation = 0
+
+
+def _invalidate_listings(path: str, recursive: bool = False) -> None:
+    global _listing_generation
+    _listing_generation += 1
+    parts = path.strip("/").split("/")
+    for depth in range(len(parts)):
+        _listings.pop("".join(f"{part}/" for part in parts[:depth]), None)
+    if recursive:
+        folder = path if path.endswith("/") else path + "/"
+        for key in [k for k in _listings if k.startswith(folder)]:
+            del _listings[key]
+
+
+def _cache_listing(path: str, key: Tuple[Optional[str], int], result: Dict) -> None:
+    now = time.monotonic()
+    if sum(len(pages) for pages in _listings.values()) >= MAX_CACHED_LISTINGS:
+        for folder in list(_listings):
+            pages = {k: v for k, v in _listings[folder].items() if v[0] > now}
+            if pages:
+                _listings[folder] = pages
+            else:
+                del _listings[folder]
+        if sum(len(pages) for pages in _listings.values()) >= MAX_CACHED_LISTINGS:
+            _listings.clear()
+    _listings.setdefault(path, {})[key] = (now + BLOB_LISTING_CACHE_SECONDS, result)
+
+
+async def list_folder(
+    base: str,
+    prefix: str = "",
+    continuation_token: Optional[str] = None,
+    page_size: int = 200
+) -> Dict:
+    """
+    One page of the folders and files directly inside a folder.
+
+    Returns {"prefix", "folders", "files", "continuation_token"}; pass the
+    token back to get the next page (None on the last page).
+    """
+    path = _normalize_path(prefix, base)
+    if path and not path.endswith("/"):
+        path += "/"
+
+    key = (continuation_token, page_size)
+    cached = _listings.get(path, {}).get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    generation = _listing_generation
+    folders, blobs, next_token = await get_backend().list_level(
+        path, page_size=page_size, continuation_token=continuation_token
+    )
+    result = {
+        "prefix": path,
+        "folders": [
+            {"name": folder[len(path):].rstrip("/"), "path": folder.rstrip("/"), "is_folder": True}
+            for folder in folders
+        ],
+        "files": [
+            {
+                "name": blob.name[len(path):],
+                "path": blob.name,
+                "is_folder": False,
+                "size": blob.size,
+                "last_modified": blob.last_modified,
+            }
+            for blob in blobs
+        ],
+        "continuation_token": next_token,
+    }
+
+    # Skip caching if a write landed while listing (the result may predate it)
+    if BLOB_LISTING_CACHE_SECONDS > 0 and generation == _listing_generation:
+        _cache_listing(path, key, result)
+    return result
+
+async def list_blob_pages(
+    base: str,
+    prefix: str = "",
+    continuation_token: Optional[str] = None,
+    page_size: int = 500
+) -> AsyncIterator[Tuple[List[Dict], Optional[str]]]:
+    """
+    Flat listing of every blob under a base, one page at a time.
+
+    Yields (blobs, continuation_token) where the token resumes the listing
+    after this page (None once the listing is complete).
+    """
+    path = _normalize_path(prefix, base)
+    if path and not path.endswith("/"):
+        path += "/"
+
+    pages = get_backend().list_pages(path, page_size=page_size, continuation_token=continuation_token)
+    async for page, next_token in pages:
+        items = [
+            {
+                "name": blob.name.rsplit("/", 1)[-1],
+                "path": blob.name,
+                "size": blob.size,
+                "last_modified": blob.last_modified,
+                "etag": blob.etag,
+            }
+            for blob in page
+        ]
+        yield items, next_token
+
+
 # DELETE
 
 async def delete_blob(blob_name: str, base: str = "") -> bool:
     """Delete a single blob safely."""
     path = _normalize_path(blob_name, base)
-    blob = container.get_blob_client(path)
+    if blob_cache.cache:
+        blob_cache.cache.invalidate(path)
+    _invalidate_listings(path)
     try:
-        await blob.delete_blob()
-        return True
-    except ResourceNotFoundError:
-        return False
+        return await get_backend().delete(path)
     except Exception as e:
         return False
 
+BLOB_DELETE_BATCH = 256  # Maximum sub-requests in one Azure blob batch
+
+
+async def delete_blobs(paths: List[str]) -> List[str]:
+    """
+    Delete blobs by full path. On Azure this is one batch request per call
+    (up to BLOB_DELETE_BATCH blobs per round trip). Returns the paths that
+    were deleted.
+    """
+    if blob_cache.cache:
+        for p in paths:
+            blob_cache.cache.invalidate(p)
+    for p in paths:
+        _invalidate_listings(p)
+    return await get_backend().delete_many(paths)
+
+
 async def delete_folder(prefix: str, base: str = "") -> List[str]:
     """
-    Delete all blobs under a folder prefix like 'projects/<id>/' concurrently for speed.
-    This version correctly uses blob clients (no NoneType await issue).
+    Delete all blobs under a folder prefix like 'projects/<id>/'.
+
+    Each listing page is deleted with one batch request while the next page
+    is being listed. A listing error is raised once the batches already
+    started have finished, so the folder may be partly deleted.
     """
     path = _normalize_path(prefix, base)
     if not path.endswith("/"):
         path += "/"
+    if blob_cache.cache:
+        blob_cache.cache.invalidate_prefix(path)
+    _invalidate_listings(path, recursive=True)
 
-    deleted = []
-
-    async def _delete_single(blob_name: str):
-        try:
-            blob_client = container.get_blob_client(blob_name)
-            await blob_client.delete_blob()
-            deleted.append(blob_name)
-        except ResourceNotFoundError:
-            pass
-        except Exception as e:
-            print(f" Failed to delete {blob_name}: {e}")
-
+    tasks = []
     try:
-        tasks = []
-        async for blob in container.list_blobs(name_starts_with=path):
-            tasks.append(_delete_single(blob.name))
-        if tasks:
-            await asyncio.gather(*tasks)
+        async for page, _ in get_backend().list_pages(path, page_size=BLOB_DELETE_BATCH):
+            names = [blob.name for blob in page]
+            if names:
+                tasks.append(asyncio.create_task(delete_blobs(names)))
     except Exception as e:
-        print(f"delete_folder failed for {path}: {e}")
-    return deleted
+        logger.error(f"❌ Listing {path} for deletion failed: {e}")
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
+    deleted = []
+    for batch in await asyncio.gather(*tasks):
+        deleted.extend(batch)
+    return deleted
 
 
 async def delete_blob_async(blob_path: str) -> bool:
@@ -240,27 +483,31 @@ def safe_delete_blob(blob_path: str):
 # Existence & URL
 async def blob_exists(blob_name: str, base: str = "") -> bool:
     path = _normalize_path(blob_name, base)
-    blob = container.get_blob_client(path)
-    return await blob.exists()
+    return await get_backend().exists(path)
 
 def get_blob_url(blob_name: str, base: str = "") -> str:
     path = _normalize_path(blob_name, base)
-    return (
-        f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net/"
-        f"{AZURE_STORAGE_CONTAINER}/{path}"
-    )
+    return get_backend().url(path)
 
 def generate_sas_url(expiry_hours: int = 1) -> str:
-    sas_token = generate_container_sas(
-        account_name=AZURE_STORAGE_ACCOUNT,
-        container_name=AZURE_STORAGE_CONTAINER,
-        account_key=AZURE_STORAGE_KEY,
-        permission=ContainerSasPermissions(
-            read=True, list=True, delete=True, write=True, add=True, create=True
-        ),
-        expiry=datetime.utcnow() + timedelta(hours=expiry_hours),
-    )
-    return f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net/{AZURE_STORAGE_CONTAINER}?{sas_token}"
+    return get_backend().sas_url(expiry_hours)
+
+def generate_upload_url(blob_name: str, base: str = "", expiry_minutes: int = 60) -> str:
+    """
+    Write-only URL for uploading one new blob straight to storage (it cannot overwrite an existing blob).
+
+    Raises:
+        UnsupportedOperation: The active backend has no direct uploads (local)
+    """
+    path = _normalize_path(blob_name, base)
+    return get_backend().upload_url(path, expiry_minutes)
+
+def forget_cached(paths: List[str]) -> None:
+    """Drop cached downloads and listings of blobs that were written without going through upload_bytes."""
+    for path in paths:
+        if blob_cache.cache:
+            blob_cache.cache.invalidate(path)
+        _invalidate_listings(path)
 
 # setting up the ETL from blob to qdrant
 
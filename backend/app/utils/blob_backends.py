@@ -0,0 +1,550 @@
+"""
+Blob storage backends.
+
+Everything in the app reads and writes blobs through app.utils.azure_blob,
+which delegates to one backend selected by BLOB_BACKEND:
+
+    azure  - Azure Blob Storage container (production)
+    local  - a directory on local disk (development, tests, benchmarks and
+             single-host deployments); writes are atomic (temp file +
+             rename) and reads are memory-mapped
+
+Both speak the same vocabulary: blob paths are "/"-separated names
+relative to the container/root, missing blobs raise azure.core's
+ResourceNotFoundError and an If-None-Match match raises
+ResourceNotModifiedError, so callers do not care which one is active.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import AsyncIterator, Callable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import anyio
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+    ResourceNotModifiedError,
+)
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 4 * 1024 * 1024  # Bytes per streamed chunk
+
+
+@dataclass
+class BlobInfo:
+    name: str  # Full path
+    size: int
+    last_modified: Optional[datetime]
+    etag: Optional[str]
+
+
+@dataclass
+class BlobStream:
+    """A download in progress: iterate chunks() for the body."""
+    size: int  # Bytes that chunks() yields
+    total_size: int  # Size of the whole blob
+    etag: Optional[str]
+    chunks: Callable[[], AsyncIterator[bytes]]
+
+
+class RangeNotSatisfiable(Exception):
+    """Requested offset is past the end of the blob."""
+
+    def __init__(self, total_size: int):
+        super().__init__(f"Range not satisfiable (blob size {total_size})")
+        self.total_size = total_size
+
+
+class UnsupportedOperation(Exception):
+    """The active backend cannot do this (e.g. direct uploads or SAS URLs on local disk)."""
+
+
+class BlobBackend(ABC):
+    """Storage operations used by app.utils.azure_blob."""
+
+    # Whether reads cross the network (the local download cache only helps then)
+    remote: bool = True
+
+    async def init(self) -> None:
+        """Create the container/root if needed."""
+
+    @abstractmethod
+    async def upload(self, path: str, data: Union[bytes, bytearray], overwrite: bool = True) -> None: ...
+
+    @abstractmethod
+    async def upload_stream(self, path: str, chunks: AsyncIterator[bytes], overwrite: bool = True) -> None:
+        """Upload from an async iterator of chunks, holding one chunk in memory at a time."""
+
+    @abstractmethod
+    async def download(
+        self, path: str, if_none_match: Optional[str] = None, timeout: int = 300
+    ) -> Tuple[bytes, Optional[str]]:
+        """Return (content, etag)."""
+
+    @abstractmethod
+    async def open_stream(
+        self,
+        path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        if_none_match: Optional[str] = None
+    ) -> BlobStream: ...
+
+    @abstractmethod
+    async def properties(self, path: str) -> BlobInfo: ...
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool: ...
+
+    @abstractmethod
+    def list_pages(
+        self, prefix: str, page_size: int = 500, continuation_token: Optional[str] = None
+    ) -> AsyncIterator[Tuple[List[BlobInfo], Optional[str]]]:
+        """Blobs under a prefix in name order, one page at a time, with the token resuming after it."""
+
+    @abstractmethod
+    async def list_level(
+        self, prefix: str, page_size: int = 500, continuation_token: Optional[str] = None
+    ) -> Tuple[List[str], List[BlobInfo], Optional[str]]:
+        """
+        One page of a single folder level: (sub-folder prefixes ending in "/",
+        blobs directly under prefix, token for the next page or None).
+        """
+
+    async def list(self, prefix: str) -> AsyncIterator[BlobInfo]:
+        async for page, _ in self.list_pages(prefix):
+            for item in page:
+                yield item
+
+    @abstractmethod
+    async def delete(self, path: str) -> bool:
+        """Delete one blob; False if it did not exist."""
+
+    @abstractmethod
+    async def delete_many(self, paths: List[str]) -> List[str]:
+        """Delete blobs, returning the paths that were deleted."""
+
+    @abstractmethod
+    def url(self, path: str) -> str: ...
+
+    @abstractmethod
+    def sas_url(self, expiry_hours: int = 1) -> str: ...
+
+    def upload_url(self, path: str, expiry_minutes: int = 60) -> str:
+        """URL a client can upload this one blob to directly, without going through the API."""
+        raise UnsupportedOperation(f"Direct uploads are not supported by the {type(self).__name__}")
+
+
+# ---------- Azure ----------
+class AzureBlobBackend(BlobBackend):
+    remote = True
+
+    def __init__(self, account: str, key: str, container_name: str):
+        from azure.storage.blob.aio import BlobServiceClient
+
+        if not account or not key:
+            raise RuntimeError("Azure Storage credentials missing in config.py/.env")
+        self.account = account
+        self.key = key
+        self.container_name = container_name
+        self._service = BlobServiceClient(
+            account_url=f"https://{account}.blob.core.windows.net",
+            credential=key,
+        )
+        self.container = self._service.get_container_client(container_name)
+
+    async def init(self) -> None:
+        try:
+            await self.container.create_container()
+        except ResourceExistsError:
+            pass
+
+    async def upload(self, path, data, overwrite=True):
+        await self.container.get_blob_client(path).upload_blob(data, overwrite=overwrite)
+
+    async def upload_stream(self, path, chunks, overwrite=True):
+        # Each chunk is staged as one block; the blob appears when the block list is committed
+        from azure.storage.blob import BlobBlock
+
+        blob = self.container.get_blob_client(path)
+        blocks = []
+        async for chunk in chunks:
+            block_id = f"{len(blocks):08d}"
+            await blob.stage_block(block_id, chunk)
+            blocks.append(BlobBlock(block_id=block_id))
+        kwargs = {} if overwrite else {"etag": "*", "match_condition": MatchConditions.IfMissing}
+        await blob.commit_block_list(blocks, **kwargs)
+
+    async def download(self, path, if_none_match=None, timeout=300):
+        kwargs = {"etag": if_none_match, "match_condition": MatchConditions.IfModified} if if_none_match else {}
+        stream = await self.container.get_blob_client(path).download_blob(timeout=timeout, **kwargs)
+        return await stream.readall(), stream.properties.etag
+
+    async def open_stream(self, path, offset=None, length=None, if_none_match=None):
+        kwargs = {"etag": if_none_match, "match_condition": MatchConditions.IfModified} if if_none_match else {}
+        try:
+            downloader = await self.container.get_blob_client(path).download_blob(
+                offset=offset, length=length, **kwargs
+            )
+        except HttpResponseError as e:
+            if e.status_code == 416:
+                raise RangeNotSatisfiable((await self.properties(path)).size)
+            raise
+        return BlobStream(
+            size=downloader.size,
+            total_size=downloader.properties.size,
+            etag=downloader.properties.etag,
+            chunks=downloader.chunks,
+        )
+
+    async def properties(self, path):
+        props = await self.container.get_blob_client(path).get_blob_properties()
+        return BlobInfo(path, props.size, props.last_modified, props.etag)
+
+    async def exists(self, path):
+        return await self.container.get_blob_client(path).exists()
+
+    async def list_pages(self, prefix, page_size=500, continuation_token=None):
+        pager = self.container.list_blobs(name_starts_with=prefix, results_per_page=page_size).by_page(
+            continuation_token=continuation_token
+        )
+        async for page in pager:
+            items = [BlobInfo(b.name, b.size, b.last_modified, b.etag) async for b in page]
+            yield items, pager.continuation_token
+
+    async def list_level(self, prefix, page_size=500, continuation_token=None):
+        from azure.storage.blob.aio import BlobPrefix
+
+        pager = self.container.walk_blobs(
+            name_starts_with=prefix, delimiter="/", results_per_page=page_size
+        ).by_page(continuation_token=continuation_token)
+        async for page in pager:
+            folders, blobs = [], []
+            async for item in page:
+                if isinstance(item, BlobPrefix):
+                    folders.append(item.name)
+                else:
+                    blobs.append(BlobInfo(item.name, item.size, item.last_modified, item.etag))
+            return folders, blobs, pager.continuation_token
+        return [], [], None
+
+    async def delete(self, path):
+        try:
+            await self.container.get_blob_client(path).delete_blob()
+            return True
+        except ResourceNotFoundError:
+            return False
+
+    async def delete_many(self, paths):
+        """One batch request (max 256 sub-requests); single deletes if the service rejects batches."""
+        async def _delete_single(blob_name: str) -> bool:
+            try:
+                return await self.delete(blob_name)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to delete {blob_name}: {e}")
+                return False
+
+        deleted = []
+        try:
+            responses = await self.container.delete_blobs(*paths, raise_on_any_failure=False)
+            idx = 0
+            async for response in responses:
+                if 200 <= response.status_code < 300:
+                    deleted.append(paths[idx])
+                idx += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Batch delete failed, deleting {len(paths)} blobs one by one: {e}")
+            results = await asyncio.gather(*(_delete_single(p) for p in paths))
+            deleted = [p for p, ok in zip(paths, results) if ok]
+        return deleted
+
+    def url(self, path):
+        return f"https://{self.account}.blob.core.windows.net/{self.container_name}/{path}"
+
+    def sas_url(self, expiry_hours=1):
+        from azure.storage.blob import generate_container_sas, ContainerSasPermissions
+
+        sas_token = generate_container_sas(
+            account_name=self.account,
+            container_name=self.container_name,
+            account_key=self.key,
+            permission=ContainerSasPermissions(
+                read=True, list=True, delete=True, write=True, add=True, create=True
+            ),
+            expiry=datetime.utcnow() + timedelta(hours=expiry_hours),
+        )
+        return f"https://{self.account}.blob.core.windows.net/{self.container_name}?{sas_token}"
+
+    def upload_url(self, path, expiry_minutes=60):
+        """
+        Create-only SAS for a single blob (Put Blob, or Put Block + Put Block List).
+
+        Without write permission the URL can only create the blob; Azure
+        rejects uploads that would overwrite an existing one.
+        """
+        from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+
+        sas_token = generate_blob_sas(
+            account_name=self.account,
+            container_name=self.container_name,
+            blob_name=path,
+            account_key=self.key,
+            permission=BlobSasPermissions(create=True),
+            expiry=datetime.utcnow() + timedelta(minutes=expiry_minutes),
+        )
+        return f"{self.url(quote(path))}?{sas_token}"
+
+
+# ---------- Local filesystem ----------
+_TMP_PREFIX = ".tmp-"
+
+
+class LocalBlobBackend(BlobBackend):
+    remote = False
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    # ---------- Helpers ----------
+    def _full_path(self, path: str) -> str:
+        full = os.path.abspath(os.path.join(self.root, *path.strip("/").split("/")))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            raise ValueError(f"Blob path escapes the storage root: {path}")
+        return full
+
+    @staticmethod
+    def _etag(st: os.stat_result) -> str:
+        # Changes on every write (a write replaces the file)
+        return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    def _info(self, name: str, st: os.stat_result) -> BlobInfo:
+        return BlobInfo(
+            name, st.st_size, datetime.fromtimestamp(st.st_mtime, tz=timezone.utc), self._etag(st)
+        )
+
+    def _stat(self, path: str) -> os.stat_result:
+        try:
+            st = os.stat(self._full_path(path))
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"Blob not found: {path}")
+        if not os.path.isfile(self._full_path(path)):
+            raise ResourceNotFoundError(f"Blob not found: {path}")
+        return st
+
+    @staticmethod
+    def _read_range(full: str, offset: int, length: int) -> bytes:
+        if length <= 0:
+            return b""
+        with open(full, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[offset:offset + length]
+
+    # ---------- Operations ----------
+    async def init(self) -> None:
+        await anyio.to_thread.run_sync(lambda: os.makedirs(self.root, exist_ok=True))
+
+    def _open_temp(self, path: str, overwrite: bool) -> Tuple[str, str]:
+        full = self._full_path(path)
+        if not overwrite and os.path.exists(full):
+            raise ResourceExistsError(f"Blob already exists: {path}")
+        directory = os.path.dirname(full)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=_TMP_PREFIX)
+        os.close(fd)
+        return full, tmp
+
+    @staticmethod
+    def _sync(f) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _write(self, path: str, data: bytes, overwrite: bool) -> None:
+        full, tmp = self._open_temp(path, overwrite)
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+                self._sync(f)
+            os.replace(tmp, full)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    async def upload(self, path, data, overwrite=True):
+        await anyio.to_thread.run_sync(self._write, path, bytes(data), overwrite)
+
+    async def upload_stream(self, path, chunks, overwrite=True):
+        full, tmp = await anyio.to_thread.run_sync(self._open_temp, path, overwrite)
+        try:
+            f = await anyio.to_thread.run_sync(open, tmp, "wb")
+            try:
+                async for chunk in chunks:
+                    await anyio.to_thread.run_sync(f.write, chunk)
+                await anyio.to_thread.run_sync(self._sync, f)
+            finally:
+                f.close()
+            os.replace(tmp, full)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _download(self, path: str, if_none_match: Optional[str]) -> Tuple[bytes, str]:
+        st = self._stat(path)
+        etag = self._etag(st)
+        if if_none_match and if_none_match == etag:
+            raise ResourceNotModifiedError("Blob not modified")
+        return self._read_range(self._full_path(path), 0, st.st_size), etag
+
+    async def download(self, path, if_none_match=None, timeout=300):
+        return await anyio.to_thread.run_sync(self._download, path, if_none_match)
+
+    async def open_stream(self, path, offset=None, length=None, if_none_match=None):
+        st = await anyio.to_thread.run_sync(self._stat, path)
+        etag = self._etag(st)
+        if if_none_match and if_none_match == etag:
+            raise ResourceNotModifiedError("Blob not modified")
+
+        start = offset or 0
+        if offset is not None and start >= st.st_size:
+            raise RangeNotSatisfiable(st.st_size)
+        end = st.st_size if length is None else min(st.st_size, start + length)
+        full = self._full_path(path)
+
+        async def chunks() -> AsyncIterator[bytes]:
+            position = start
+            while position < end:
+                size = min(STREAM_CHUNK_SIZE, end - position)
+                yield await anyio.to_thread.run_sync(self._read_range, full, position, size)
+                position += size
+
+        return BlobStream(size=end - start, total_size=st.st_size, etag=etag, chunks=chunks)
+
+    async def properties(self, path):
+        st = await anyio.to_thread.run_sync(self._stat, path)
+        return self._info(path, st)
+
+    async def exists(self, path):
+        return await anyio.to_thread.run_sync(lambda: os.path.isfile(self._full_path(path)))
+
+    def _scan(self, prefix: str) -> List[BlobInfo]:
+        # Walk only the directory holding the prefix, then filter on the full name
+        directory = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        top = self._full_path(directory) if directory else self.root
+        items = []
+        for dirpath, _, filenames in os.walk(top):
+            for filename in filenames:
+                if filename.startswith(_TMP_PREFIX):
+                    continue
+                full = os.path.join(dirpath, filename)
+                name = os.path.relpath(full, self.root).replace(os.sep, "/")
+                if not name.startswith(prefix):
+                    continue
+                try:
+                    items.append(self._info(name, os.stat(full)))
+                except FileNotFoundError:
+                    continue
+        items.sort(key=lambda item: item.name)
+        return items
+
+    async def list_pages(self, prefix, page_size=500, continuation_token=None):
+        items = await anyio.to_thread.run_sync(self._scan, prefix)
+        if continuation_token:
+            items = [item for item in items if item.name > continuation_token]
+        for start in range(0, len(items), page_size):
+            page = items[start:start + page_size]
+            token = page[-1].name if start + page_size < len(items) else None
+            yield page, token
+
+    def _scan_level(self, prefix: str) -> List[Tuple[str, Optional[os.stat_result]]]:
+        """Entries of one directory level as (name, stat), stat None for folders."""
+        directory, _, name_prefix = prefix.rpartition("/")
+        top = self._full_path(directory) if directory else self.root
+        base = f"{directory}/" if directory else ""
+        entries = []
+        try:
+            scanned = list(os.scandir(top))
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        for entry in scanned:
+            if entry.name.startswith(_TMP_PREFIX) or not entry.name.startswith(name_prefix):
+                continue
+            try:
+                if entry.is_dir():
+                    entries.append((f"{base}{entry.name}/", None))
+                elif entry.is_file():
+                    entries.append((f"{base}{entry.name}", entry.stat()))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda item: item[0])
+        return entries
+
+    async def list_level(self, prefix, page_size=500, continuation_token=None):
+        entries = await anyio.to_thread.run_sync(self._scan_level, prefix)
+        if continuation_token:
+            entries = [entry for entry in entries if entry[0] > continuation_token]
+        page = entries[:page_size]
+        folders = [name for name, st in page if st is None]
+        blobs = [self._info(name, st) for name, st in page if st is not None]
+        token = page[-1][0] if len(entries) > page_size else None
+        return folders, blobs, token
+
+    def _delete(self, path: str) -> bool:
+        full = self._full_path(path)
+        try:
+            os.remove(full)
+        except FileNotFoundError:
+            return False
+        # Drop directories left empty (folders are virtual, as in Azure)
+        directory = os.path.dirname(full)
+        while directory != self.root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+        return True
+
+    async def delete(self, path):
+        return await anyio.to_thread.run_sync(self._delete, path)
+
+    async def delete_many(self, paths):
+        return await anyio.to_thread.run_sync(lambda: [p for p in paths if self._delete(p)])
+
+    def url(self, path):
+        base, _, name = path.partition("/")
+        return f"/api/blobs/download/{name}?base={base}"
+
+    def sas_url(self, expiry_hours=1):
+        raise UnsupportedOperation("SAS URLs are only available with the Azure blob backend")
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> BlobBackend:
+    """The configured backend (created on first use)."""
+    if config.BLOB_BACKEND == "local":
+        return LocalBlobBackend(config.BLOB_LOCAL_ROOT)
+    if config.BLOB_BACKEND != "azure":
+        raise RuntimeError(f"Unknown BLOB_BACKEND '{config.BLOB_BACKEND}' (expected 'azure' or 'local')")
+    return AzureBlobBackend(
+        config.AZURE_STORAGE_ACCOUNT,
+        config.AZURE_STORAGE_KEY,
+        config.AZURE_STORAGE_CONTAINER or "scopingbot",
+    )
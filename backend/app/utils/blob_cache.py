@@ -0,0 +1,262 @@
+"""
+Local disk read-through cache for blob downloads.
+
+The same blobs are downloaded over and over (finalized_scope.json on
+every export, architecture diagrams, questions.json, RFP files on every
+extraction). Downloaded bytes are kept on local disk in a size-bounded
+LRU, keyed by blob path and stored with the blob's ETag.
+
+A cached read is still a request to Azure, but a conditional one
+(If-None-Match: <etag>): a 304 is served from disk without transferring
+the body, so cached bytes are never served stale. Uploads and deletes
+through azure_blob invalidate the path; a racing download that stores
+an older version is harmless because the next read revalidates it.
+
+Each entry is two files in BLOB_CACHE_DIR named after the SHA256 of the
+path: <key>.bin (etag line, then content) and <key>.json (path, etag,
+size). The index is rebuilt from the .json files on first use, oldest
+modification first.
+
+API workers and ETL workers may share BLOB_CACHE_DIR. Reads check the
+etag stored in the .bin itself, so bytes rewritten by another process are
+never served for the wrong version. Reads touch the .bin's modification
+time, and the index is re-synced from disk before writes once it is
+RESYNC_SECONDS old, so the LRU order and the size budget cover every
+process's entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import anyio
+
+from app.config.config import (
+    BLOB_CACHE_ENABLED,
+    BLOB_CACHE_DIR,
+    BLOB_CACHE_MAX_BYTES,
+    BLOB_CACHE_MAX_ITEM_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+RESYNC_SECONDS = 30
+
+
+@dataclass
+class _Entry:
+    key: str
+    etag: str
+    size: int
+
+
+class BlobDiskCache:
+    """Size-bounded LRU of blob contents on local disk."""
+
+    def __init__(self, directory: str, max_bytes: int, max_item_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._synced_at = 0.0
+        self.hits = 0  # Served from disk after a 304
+        self.misses = 0  # Not cached
+        self.stale = 0  # Cached, but the blob had changed
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    # ---------- Paths ----------
+    def _file(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return hashlib.sha256(path.encode("utf-8")).hexdigest()
+
+    # ---------- Index ----------
+    def _scan_disk(self) -> "OrderedDict[str, _Entry]":
+        """Read every entry in the directory (from all processes), least recently used first."""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            try:
+                with open(self._file(key, "json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                mtime = os.path.getmtime(self._file(key, "bin"))
+                found.append((mtime, meta["path"], _Entry(key, meta["etag"], meta["size"])))
+            except FileNotFoundError:
+                continue  # Evicted by another process while listing
+            except (OSError, ValueError, KeyError):
+                self._remove_files(key)
+
+        return OrderedDict((path, entry) for _, path, entry in sorted(found, key=lambda item: item[0]))
+
+    async def _sync(self) -> None:
+        entries = await anyio.to_thread.run_sync(self._scan_disk)
+        self._entries = entries
+        self._total = sum(entry.size for entry in entries.values())
+        self._synced_at = time.monotonic()
+        self._evict()
+        if not self._loaded:
+            self._loaded = True
+            if self._entries:
+                logger.info(f"📦 Blob cache: {len(self._entries)} entries ({self._total / 1e6:.1f} MB) in {self.directory}")
+
+    async def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            await self._sync()
+
+    def _remove_files(self, key: str) -> None:
+        for ext in ("bin", "json"):
+            try:
+                os.remove(self._file(key, ext))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ Could not remove blob cache file {key}.{ext}: {e}")
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._total -= entry.size
+            self._remove_files(entry.key)
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._entries:
+            path = next(iter(self._entries))
+            self._drop(path)
+            self.evictions += 1
+
+    # ---------- Public API ----------
+    async def etag(self, path: str) -> Optional[str]:
+        """ETag of the cached copy of a blob, if any (used for If-None-Match)."""
+        await self._ensure_loaded()
+        entry = self._entries.get(path)
+        return entry.etag if entry else None
+
+    async def read(self, path: str, etag: str) -> Optional[bytes]:
+        """
+        Cached bytes of a blob the server confirmed unchanged (304 for etag).
+
+        Returns None if the cached copy is gone or holds a different version,
+        e.g. because another process sharing the directory replaced it.
+        """
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        try:
+            cached_etag, data = await anyio.to_thread.run_sync(self._read_file, entry.key)
+        except OSError:
+            self._drop(path)
+            return None
+        if cached_etag != etag:
+            return None
+
+        self._entries.move_to_end(path)
+        self.hits += 1
+        self.bytes_saved += len(data)
+        return data
+
+    def _read_file(self, key: str) -> Tuple[str, bytes]:
+        file = self._file(key, "bin")
+        with open(file, "rb") as f:
+            etag = f.readline().rstrip(b"\n").decode("utf-8", errors="replace")
+            data = f.read()
+        os.utime(file)  # Shared LRU order: other processes see the read on their next sync
+        return etag, data
+
+    async def put(self, path: str, etag: Optional[str], data: bytes) -> None:
+        """Store a downloaded blob (replacing any previous version)."""
+        if self._entries.get(path) is not None:
+            self.stale += 1
+        else:
+            self.misses += 1
+        if not etag or len(data) > self.max_item_bytes:
+            self._drop(path)
+            return
+        if time.monotonic() - self._synced_at >= RESYNC_SECONDS:
+            await self._sync()
+
+        key = self._key(path)
+        try:
+            await anyio.to_thread.run_sync(self._write_files, key, path, etag, data)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not cache blob {path}: {e}")
+            return
+
+        self._drop_memory(path)
+        self._entries[path] = _Entry(key, etag, len(data))
+        self._total += len(data)
+        self._evict()
+
+    def _drop_memory(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._total -= entry.size
+
+    def _write_files(self, key: str, path: str, etag: str, data: bytes) -> None:
+        # Write to temp files and rename so a crash never leaves a torn entry
+        os.makedirs(self.directory, exist_ok=True)
+        for ext, content in (
+            ("bin", etag.encode("utf-8") + b"\n" + data),
+            ("json", json.dumps({"path": path, "etag": etag, "size": len(data)}).encode("utf-8")),
+        ):
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp, self._file(key, ext))
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+
+    def invalidate(self, path: str) -> None:
+        """Forget a blob after it was overwritten or deleted."""
+        self._drop(path)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Forget every blob under a folder prefix."""
+        for path in [p for p in self._entries if p.startswith(prefix)]:
+            self._drop(path)
+
+    def stats(self) -> Dict:
+        requests = self.hits + self.misses + self.stale
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "bytes_cached": self._total,
+            "max_bytes": self.max_bytes,
+            "requests": requests,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
+
+
+# Process-wide cache used by azure_blob (None when disabled)
+cache: Optional[BlobDiskCache] = (
+    BlobDiskCache(BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES, BLOB_CACHE_MAX_ITEM_BYTES)
+    if BLOB_CACHE_ENABLED else None
+)
+
+
+def stats() -> Dict:
+    """Hit ratio and bytes saved of the download cache."""
+    return cache.stats() if cache else {"enabled": False}
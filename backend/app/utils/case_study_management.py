@@ -14,6 +14,7 @@ from app import models
 from app.utils import azure_blob
 from app.utils.scope_engine import extract_text_from_file
 from app.utils.ai_clients import embed_text_ollama, get_qdrant_client
+from app.utils.chunking import chunk_text
 from app.config.config import CASE_STUDY_COLLECTION
 
 logger = logging.getLogger(__name__)
@@ -262,8 +263,7 @@ async def _vectorize_case_study(
         db: Database session
     """
     try:
-        # Chunk text (use 1000 char chunks with 200 overlap)
-        chunks = _chunk_text(text_content, chunk_size=1000, overlap=200)
+        chunks = chunk_text(text_content)
 
         if not chunks:
             raise ValueError("No text chunks generated")
@@ -322,27 +322,3 @@ async def _vectorize_case_study(
     except Exception as e:
         logger.error(f"Failed to vectorize case study: {e}")
         raise
-
-
-def _chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
-    """
-    Split text into overlapping chunks.
-    """
-    if not text or len(text) == 0:
-        return []
-
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-
-        if chunk.strip():
-            chunks.append(chunk)
-
-        start = end - overlap
-        if start >= len(text):
-            break
-
-    return chunks
\ No newline at end of file
@@ -7,13 +7,25 @@ structured information including: Client Name, Overview, Solution, and Impact.
 
 import re
 import logging
-from typing import Dict, List, Optional
-from pptx import Presentation
+from io import BytesIO
+from typing import BinaryIO, Dict, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
 
-def parse_case_study_from_ppt(file_path: str) -> List[Dict[str, str]]:
+PptSource = Union[str, bytes, BinaryIO]
+
+
+def _open_presentation(source: PptSource):
+    """Open a deck from a path, raw bytes or a file-like object."""
+    from pptx import Presentation
+
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    return Presentation(source)
+
+
+def parse_case_study_from_ppt(source: PptSource) -> List[Dict[str, str]]:
     """
     Parse a PPT file and extract structured case study information.
 
@@ -23,7 +35,7 @@ def parse_case_study_from_ppt(file_path: str) -> List[Dict[str, str]]:
     - The parser will try to intelligently extract these fields
 
     Args:
-        file_path: Path to the PPT file
+        source: Path to the PPT file, its bytes, or a file-like object
 
     Returns:
         List of case study dictionaries, each containing:
@@ -36,7 +48,7 @@ def parse_case_study_from_ppt(file_path: str) -> List[Dict[str, str]]:
         }
     """
     try:
-        prs = Presentation(file_path)
+        prs = _open_presentation(source)
         case_studies = []
         current_case_study = None
 
@@ -285,13 +297,13 @@ def _build_full_text(case_study: Dict[str, str]) -> str:
     return "\n\n".join(parts).strip()
 
 
-def extract_all_text_from_ppt(file_path: str) -> str:
+def extract_all_text_from_ppt(source: PptSource) -> str:
     """
     Fallback: Extract all text from PPT as a single string.
     Used when structured parsing fails.
     """
     try:
-        prs = Presentation(file_path)
+        prs = _open_presentation(source)
         all_text = []
 
         for slide in prs.slides:
@@ -299,7 +311,8 @@ def extract_all_text_from_ppt(file_path: str) -> str:
             if slide_text:
                 all_text.append(slide_text)
 
-        return "\n\n".join(all_text).strip()
+        # Form feed marks slide boundaries for the chunker
+        return "\n\f".join(all_text).strip()
 
     except Exception as e:
         logger.error(f"❌ Failed to extract text from PPT: {e}")
@@ -0,0 +1,219 @@
+"""
+Token-aware, structure-aware text chunking shared by every ingestion path.
+
+The text is encoded once with the embedding tokenizer and chunk
+boundaries are chosen on the resulting token offsets in a single forward
+pass, so chunk sizes are measured in the unit the embedding model limits
+and each chunk is produced with exactly one string slice.
+
+Cut points are preferred in this order:
+    1. Section breaks - page/slide breaks (form feed) and headings.
+       A chunk ends at the first one once it holds a quarter of the chunk
+       size, so sections are not merged into the tail of the previous one.
+    2. Paragraph breaks (blank lines) - the last one inside the window,
+       if it leaves the chunk at least PARAGRAPH_MIN_FILL full.
+    3. Sentence ends - the last one inside the window.
+    4. The token limit itself.
+
+Consecutive chunks overlap by CHUNK_OVERLAP_TOKENS, except across section
+breaks where the next section starts clean. The overlap starts at a
+boundary or, failing that, at a word start.
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+import tiktoken
+
+from app.config.config import CHUNK_ENCODING, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# Boundary priorities (higher wins)
+_SECTION = 3
+_PARAGRAPH = 2
+_SENTENCE = 1
+
+# One scan over the UTF-8 bytes finds every candidate boundary; the group that
+# matched gives its kind. Positions point at the first byte after the boundary.
+_BOUNDARY_RE = re.compile(
+    rb"(?P<section>\f\s*|\n\s*(?=#{1,6}[ \t]))"
+    rb"|(?P<paragraph>\n[ \t]*\n\s*)"
+    rb"|(?P<sentence>(?<=[.!?])[ \t]+|(?<=[.!?])\n)"
+)
+_PRIORITIES = {"section": _SECTION, "paragraph": _PARAGRAPH, "sentence": _SENTENCE}
+
+# A paragraph break beats a later sentence end only once the chunk is this full
+PARAGRAPH_MIN_FILL = 0.6
+
+_WHITESPACE = frozenset(b" \t\r\n\f\v")
+
+
+@lru_cache(maxsize=4)
+def get_encoding(name: str = CHUNK_ENCODING) -> tiktoken.Encoding:
+    """Load (once per process) the tokenizer used to measure chunks."""
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=4)
+def _token_byte_lengths(name: str = CHUNK_ENCODING) -> List[int]:
+    """Byte length of every token ID, so offsets need no per-token decoding."""
+    encoding = get_encoding(name)
+    lengths = []
+    for token in range(encoding.n_vocab):
+        try:
+            lengths.append(len(encoding.decode_single_token_bytes(token)))
+        except KeyError:
+            lengths.append(0)  # Unused IDs between the vocabulary and special tokens
+    return lengths
+
+
+def count_tokens(text: str) -> int:
+    """Number of embedding tokens in text."""
+    return len(get_encoding().encode_ordinary(text or ""))
+
+
+def _boundaries(data: bytes, offsets: List[int]) -> List[Tuple[int, int]]:
+    """
+    Map structural boundaries to token indices.
+
+    Returns (token_index, priority) pairs in ascending token order. A
+    boundary falling inside a token is moved to the next token start; when
+    several boundaries land on the same token the strongest one is kept.
+    """
+    result: List[Tuple[int, int]] = []
+    token_count = len(offsets)
+    t = 0
+    for match in _BOUNDARY_RE.finditer(data):
+        t = bisect_left(offsets, match.end(), t)
+        if t == 0 or t >= token_count:
+            continue
+
+        priority = _PRIORITIES[match.lastgroup]
+        if result and result[-1][0] == t:
+            if priority > result[-1][1]:
+                result[-1] = (t, priority)
+        else:
+            result.append((t, priority))
+    return result
+
+
+def _word_start(data: bytes, offsets: List[int], t: int, end: int) -> int:
+    """First token index in [t, end) that starts a word, or t if there is none."""
+    for i in range(t, end):
+        pos = offsets[i]
+        if pos == 0 or data[pos] in _WHITESPACE or data[pos - 1] in _WHITESPACE:
+            return i
+    return t
+
+
+def _char_start(data: bytes, pos: int) -> int:
+    """Move a byte position forward to the next UTF-8 character start."""
+    while pos < len(data) and 0x80 <= data[pos] < 0xC0:
+        pos += 1
+    return pos
+
+
+def chunk_text(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    min_tokens: Optional[int] = None
+) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens embedding tokens.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per chunk (defaults to CHUNK_TOKENS)
+        overlap_tokens: Tokens repeated between consecutive chunks of the
+            same section (defaults to CHUNK_OVERLAP_TOKENS)
+        min_tokens: Size a chunk must reach before a boundary may end it
+            (defaults to a quarter of max_tokens)
+
+    Returns:
+        List of non-empty, stripped chunks in document order
+    """
+    if not text or not text.strip():
+        return []
+
+    max_tokens = max_tokens or CHUNK_TOKENS
+    overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    min_tokens = max_tokens // 4 if min_tokens is None else min(min_tokens, max_tokens)
+
+    encoding = get_encoding()
+    tokens = encoding.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return [text.strip()]
+
+    # Byte offset of every token start, computed without decoding tokens
+    data = text.encode("utf-8")
+    lengths = _token_byte_lengths(encoding.name)
+    offsets = [0]
+    offsets.extend(accumulate(map(lengths.__getitem__, tokens[:-1])))
+    boundaries = _boundaries(data, offsets)
+    token_count = len(tokens)
+
+    chunks: List[str] = []
+    start = 0
+    b = 0  # First boundary after the current chunk start
+    while start < token_count:
+        limit = start + max_tokens
+        while b < len(boundaries) and boundaries[b][0] <= start:
+            b += 1
+
+        if limit >= token_count:
+            cut, cut_priority = token_count, _SECTION
+        else:
+            # Best boundary in (start + min_tokens, limit]: the first section
+            # break, otherwise the last paragraph if the chunk is full enough,
+            # otherwise the last sentence (or paragraph)
+            cut, cut_priority = limit, 0
+            paragraph = sentence = None
+            i = b
+            while i < len(boundaries) and boundaries[i][0] <= limit:
+                position, priority = boundaries[i]
+                if position - start >= min_tokens:
+                    if priority == _SECTION:
+                        cut, cut_priority = position, priority
+                        break
+                    if priority == _PARAGRAPH:
+                        paragraph = position
+                    sentence = position
+                i += 1
+            if cut_priority != _SECTION:
+                if paragraph is not None and (
+                    paragraph - start >= max_tokens * PARAGRAPH_MIN_FILL or paragraph == sentence
+                ):
+                    cut, cut_priority = paragraph, _PARAGRAPH
+                elif sentence is not None:
+                    cut, cut_priority = sentence, _SENTENCE
+
+        start_byte = _char_start(data, offsets[start])
+        end_byte = _char_start(data, offsets[cut]) if cut < token_count else len(data)
+        chunk = data[start_byte:end_byte].decode("utf-8").strip()
+        if chunk:
+            chunks.append(chunk)
+
+        if cut >= token_count:
+            break
+        if cut_priority == _SECTION:
+            # Sections start clean
+            start = cut
+            continue
+
+        # Overlap within a section, starting at the first boundary in the overlap
+        # if any, otherwise at the first word start
+        next_start = max(cut - overlap_tokens, start + 1)
+        i = b
+        while i < len(boundaries) and boundaries[i][0] < next_start:
+            i += 1
+        if i < len(boundaries) and boundaries[i][0] < cut:
+            next_start = boundaries[i][0]
+        else:
+            next_start = _word_start(data, offsets, next_start, cut)
+        start = next_start
+
+    return chunks
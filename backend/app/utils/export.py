@@ -4,28 +4,12 @@ import io, json, logging, re
 from datetime import datetime, timezone, timedelta
 from typing import Any, Dict
 
-from reportlab.platypus import Image as RLImage
-import xlsxwriter
 from app.utils import azure_blob
 
-# PPTX Imports
-from pptx import Presentation
-from pptx.util import Inches, Pt, Cm
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
+# xlsxwriter, reportlab and python-pptx are imported by the generator that
+# needs them, so importing this module (and the app) stays cheap.
 
 logger = logging.getLogger(__name__)
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Table, TableStyle,
-    Spacer, PageBreak, LongTable
-)
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.graphics.shapes import Drawing, Rect, String
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.lib.enums import TA_CENTER
 
 # Theme 
 THEME = {
@@ -61,6 +45,7 @@ def generate_json_data(scope: Dict[str, Any]) -> Dict[str, Any]:
 # Excel Export
 def generate_xlsx(scope: Dict[str, Any]) -> io.BytesIO:
     try:
+        import xlsxwriter
         from xlsxwriter.utility import xl_col_to_name
         data = scope
         buf = io.BytesIO()
@@ -421,6 +406,19 @@ def generate_xlsx(scope: Dict[str, Any]) -> io.BytesIO:
         return out
 # PDF EXPORT
 async def generate_pdf(scope: Dict[str, Any]) -> io.BytesIO:
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import cm
+    from reportlab.lib import colors
+    from reportlab.platypus import (
+        SimpleDocTemplate, Paragraph, Table, TableStyle,
+        Spacer, PageBreak, LongTable
+    )
+    from reportlab.platypus import Image as RLImage
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.graphics.shapes import Drawing, Rect, String
+    from reportlab.graphics.charts.piecharts import Pie
+    from reportlab.lib.enums import TA_CENTER
+
     data = scope or {}
     logger.info(f"📄 Generating PDF with scope data keys: {list(data.keys())}")
     logger.info(f"  - Has architecture_diagram: {'architecture_diagram' in data}")
@@ -975,6 +973,11 @@ async def generate_pdf(scope: Dict[str, Any]) -> io.BytesIO:
 
 async def generate_pptx(scope: Dict[str, Any]) -> io.BytesIO:
     """Generate a PowerPoint presentation from project scope."""
+    from pptx import Presentation
+    from pptx.util import Inches, Pt, Cm
+    from pptx.enum.text import PP_ALIGN
+    from pptx.dml.color import RGBColor
+
     data = scope or {}
     prs = Presentation()
     
@@ -1,23 +1,124 @@
+import time
 import uuid
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
 from app import models
+from app.config.config import RATE_CACHE_VERSION_CHECK_SECONDS
 logger = logging.getLogger(__name__)
 
 SIGMOID_COMPANY_NAME = "Sigmoid"  # Global shared company
 
 
+# RATE MAP CACHE
+# Scope generation needs the company's rate map on every generate/finalize/
+# regenerate, so company rate maps and the Sigmoid company ID are kept in
+# memory. Rate card writes below bump the "rate_cards" row of cache_versions
+# in their own transaction and drop this process's copy; other workers notice
+# the new version within RATE_CACHE_VERSION_CHECK_SECONDS.
+RATE_CACHE_NAME = "rate_cards"
+MAX_CACHED_RATE_MAPS = 1024
+
+_rate_maps: Dict[uuid.UUID, Dict[str, float]] = {}  # company_id → {role_name: monthly_rate}
+_sigmoid_id: Optional[uuid.UUID] = None
+_cache_version: Optional[int] = None  # cache_versions value the cached entries belong to
+_version_checked_at = 0.0
+_generation = 0  # Bumped whenever cached entries are dropped
+
+
+def _clear_rate_cache() -> None:
+    global _sigmoid_id, _generation
+    _generation += 1
+    _rate_maps.clear()
+    _sigmoid_id = None
+
+
+def _invalidate_rate_cache() -> None:
+    """Drop cached entries after a local write and re-read the version on the next lookup."""
+    global _cache_version
+    _clear_rate_cache()
+    _cache_version = None
+
+
+async def _bump_rate_cache_version(db: AsyncSession) -> None:
+    """Bump the shared version (one upsert); committed together with the caller's write."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.CacheVersion).values(name=RATE_CACHE_NAME, version=1)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.CacheVersion.name],
+            set_={"version": models.CacheVersion.version + 1, "updated_at": func.now()},
+        )
+    )
+
+
+async def _check_rate_cache_version(db: AsyncSession) -> None:
+    """Drop cached entries if another worker wrote rate cards since they were loaded."""
+    global _cache_version, _version_checked_at
+    now = time.monotonic()
+    if _cache_version is not None and now - _version_checked_at < RATE_CACHE_VERSION_CHECK_SECONDS:
+        return
+
+    version = await db.scalar(
+        select(models.CacheVersion.version).where(models.CacheVersion.name == RATE_CACHE_NAME)
+    ) or 0
+    if version != _cache_version:
+        _clear_rate_cache()
+        _cache_version = version
+    _version_checked_at = now
+
+
+async def get_company_rate_map(db: AsyncSession, company_id: uuid.UUID) -> Dict[str, float]:
+    """Return role_name → monthly_rate over all of a company's cards (empty if it has none)."""
+    await _check_rate_cache_version(db)
+    rates = _rate_maps.get(company_id)
+    if rates is None:
+        generation = _generation
+        result = await db.execute(
+            select(models.RateCard.role_name, models.RateCard.monthly_rate)
+            .filter(models.RateCard.company_id == company_id)
+        )
+        rates = {role_name: float(rate) for role_name, rate in result.all()}
+        # A write during the query makes the result stale
+        if generation == _generation:
+            if len(_rate_maps) >= MAX_CACHED_RATE_MAPS:
+                _rate_maps.pop(next(iter(_rate_maps)))
+            _rate_maps[company_id] = rates
+    return dict(rates)
+
+
+async def get_sigmoid_company_id(db: AsyncSession, create: bool = True) -> Optional[uuid.UUID]:
+    """
+    Return the ID of the global Sigmoid company from memory.
+
+    Creates the company if it does not exist yet, unless create is False
+    (then None is returned).
+    """
+    global _sigmoid_id
+    await _check_rate_cache_version(db)
+    if _sigmoid_id is None:
+        _sigmoid_id = await db.scalar(
+            select(models.Company.id).filter(models.Company.name == SIGMOID_COMPANY_NAME)
+        )
+    if _sigmoid_id is None and create:
+        _sigmoid_id = (await get_or_create_sigmoid_company(db)).id
+    return _sigmoid_id
+
+
 # COMPANY HELPERS
 async def get_or_create_sigmoid_company(db: AsyncSession) -> models.Company:
     """Ensure the default 'Sigmoid' company exists (shared by all users)."""
-    result = await db.execute(
-        select(models.Company).filter(models.Company.name == SIGMOID_COMPANY_NAME)
-    )
-    company = result.scalars().first()
+    global _sigmoid_id
+    company = await db.get(models.Company, _sigmoid_id) if _sigmoid_id else None
+    if not company:
+        result = await db.execute(
+            select(models.Company).filter(models.Company.name == SIGMOID_COMPANY_NAME)
+        )
+        company = result.scalars().first()
     if not company:
         company = models.Company(
             name=SIGMOID_COMPANY_NAME,
@@ -28,6 +129,7 @@ async def get_or_create_sigmoid_company(db: AsyncSession) -> models.Company:
         await db.commit()
         await db.refresh(company)
         logger.info("Created global Sigmoid company.")
+    _sigmoid_id = company.id
     return company
 
 
@@ -96,7 +198,9 @@ async def delete_company(db: AsyncSession, company_id: uuid.UUID, user_id: uuid.
         models.RateCard.__table__.delete().where(models.RateCard.company_id == company_id)
     )
     await db.delete(company)
+    await _bump_rate_cache_version(db)
     await db.commit()
+    _invalidate_rate_cache()
 
     logger.info(f"🗑 Deleted company {company.name} (owner={user_id}) and its rate cards.")
     return True
@@ -203,7 +307,9 @@ async def create_rate_card(
         monthly_rate=monthly_rate,
     )
     db.add(rc)
+    await _bump_rate_cache_version(db)
     await db.commit()
+    _invalidate_rate_cache()
     await db.refresh(rc)
     logger.info(f" Created rate card: {role_name} → {monthly_rate}")
     return rc
@@ -223,7 +329,9 @@ async def update_rate_card(
         raise HTTPException(status_code=404, detail="Rate card not found")
 
     rc.monthly_rate = monthly_rate
+    await _bump_rate_cache_version(db)
     await db.commit()
+    _invalidate_rate_cache()
     await db.refresh(rc)
     logger.info(f" Updated rate card {rc.id} → {monthly_rate}")
     return rc
@@ -239,7 +347,9 @@ async def delete_rate_card(db: AsyncSession, rate_card_id: uuid.UUID) -> bool:
         raise HTTPException(status_code=404, detail="Rate card not found")
 
     await db.delete(rc)
+    await _bump_rate_cache_version(db)
     await db.commit()
+    _invalidate_rate_cache()
     logger.info(f"🗑 Deleted rate card {rate_card_id}")
     return True
 
@@ -1,17 +1,22 @@
 # app/utils/scope_engine.py
 from __future__ import annotations
-import json, re, logging, math, os, tempfile,anyio,pytesseract, openpyxl,tiktoken, pytz, graphviz,requests
+# Document, diagram and HTTP libraries are imported where used to keep app startup fast
+import json, re, logging, math, os, tempfile,anyio, pytz
 from app import models
 from calendar import monthrange
-from pdfminer.high_level import extract_text as extract_pdf_text
-from docx import Document
-from pptx import Presentation
 from io import BytesIO
-from PIL import Image
-from app.config.config import QDRANT_COLLECTION
+from app.config.config import (
+    QDRANT_COLLECTION,
+    PROJECT_RFP_COLLECTION,
+    SCOPE_RFP_TOKENS,
+    RFP_SECTIONS_PER_ASPECT,
+    RFP_SECTION_TOKEN_BUDGET,
+)
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from app.utils import azure_blob
+from app.services import text_cache
+from app.utils.chunking import chunk_text, count_tokens
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -29,7 +34,6 @@ logger = logging.getLogger(__name__)
 # Init AI services
 llm_cfg = get_llm_client()
 embed_cfg = get_embed_client()
-qdrant = get_qdrant_client()
 
 # Utility function to round effort months to nearest 0.5
 def round_to_half(value: float) -> float:
@@ -539,34 +543,34 @@ def _safe_str(val: Any) -> str:
 
     return str(val).strip()
 
+# Files the app writes into a project folder (not uploaded RFP material)
+GENERATED_FILE_NAMES = {"scope.json", "finalized_scope.json", "questions.json", "architecture.png", "architecture.svg"}
+
+
+def is_generated_file(file_name: str) -> bool:
+    return file_name in GENERATED_FILE_NAMES or file_name.startswith("architecture_")
+
+
 async def get_rate_map_for_project(db: AsyncSession, project) -> Dict[str, float]:
     """
     Fetch rate cards for the given project/company.
-    Falls back to Sigmoid default rates if none exist
+    Falls back to Sigmoid default rates if none exist.
+    Rate maps are cached in memory by app.utils.ratecards.
     """
     try:
-        # If project has company_id, try fetching company-specific rate cards
+        from app.utils import ratecards
+
+        # If project has company_id, try company-specific rate cards
         if getattr(project, "company_id", None):
-            result = await db.execute(
-                select(models.RateCard)
-                .filter(models.RateCard.company_id == project.company_id)
-            )
-            ratecards = result.scalars().all()
-            if ratecards:
-                return {r.role_name: float(r.monthly_rate) for r in ratecards}
+            rates = await ratecards.get_company_rate_map(db, project.company_id)
+            if rates:
+                return rates
 
-        sigmoid_result = await db.execute(
-            select(models.Company).filter(models.Company.name == "Sigmoid")
-        )
-        sigmoid = sigmoid_result.scalars().first()
-        if sigmoid:
-            result = await db.execute(
-                select(models.RateCard)
-                .filter(models.RateCard.company_id == sigmoid.id)
-            )
-            sigmoid_rates = result.scalars().all()
+        sigmoid_id = await ratecards.get_sigmoid_company_id(db, create=False)
+        if sigmoid_id:
+            sigmoid_rates = await ratecards.get_company_rate_map(db, sigmoid_id)
             if sigmoid_rates:
-                return {r.role_name: float(r.monthly_rate) for r in sigmoid_rates}
+                return sigmoid_rates
 
     except Exception as e:
         logger.warning(f"Failed to fetch rate cards: {e}")
@@ -594,24 +598,34 @@ def extract_text_from_file(file_bytes_io: BytesIO, file_name: str) -> str:
                 tmp.write(file_bytes)
                 tmp_path = tmp.name
             try:
+                from pdfminer.high_level import extract_text as extract_pdf_text
                 content = extract_pdf_text(tmp_path)
             finally:
                 os.remove(tmp_path)
 
         elif suffix == ".docx":
+            from docx import Document
             doc = Document(BytesIO(file_bytes))
-            content = "\n".join(p.text for p in doc.paragraphs)
+            # Mark headings so the chunker can keep sections together
+            lines = []
+            for p in doc.paragraphs:
+                style = p.style.name if p.style is not None else ""
+                is_heading = style.startswith(("Heading", "Title")) and p.text.strip()
+                lines.append(f"# {p.text}" if is_heading else p.text)
+            content = "\n".join(lines)
 
         elif suffix == ".pptx":
+            from pptx import Presentation
             prs = Presentation(BytesIO(file_bytes))
-            texts = []
+            slides = []
             for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        texts.append(shape.text)
-            content = "\n".join(texts)
+                texts = [shape.text for shape in slide.shapes if hasattr(shape, "text")]
+                slides.append("\n".join(texts))
+            # Form feed between slides, like PDF page breaks
+            content = "\n\f".join(slides)
 
         elif suffix in [".xlsx", ".xlsm"]:
+            import openpyxl
             wb = openpyxl.load_workbook(BytesIO(file_bytes))
             sheet = wb.active
             content = "\n".join(
@@ -620,6 +634,8 @@ def extract_text_from_file(file_bytes_io: BytesIO, file_name: str) -> str:
             )
 
         elif suffix in [".png", ".jpg", ".jpeg", ".tiff"]:
+            import pytesseract
+            from PIL import Image
             img = Image.open(BytesIO(file_bytes))
             content = pytesseract.image_to_string(img)
 
@@ -641,69 +657,14 @@ def extract_text_from_file(file_bytes_io: BytesIO, file_name: str) -> str:
 
 
 async def _extract_text_from_files(files: List[dict]) -> str:
-    results: List[str] = []
+    """Concatenate the text of project files in order, served from the extracted text cache."""
+    results: List[str] = [""] * len(files)
 
-    async def _extract_single(f: dict) -> None:
+    async def _extract_single(idx: int, f: dict) -> None:
         try:
-            blob_bytes = await azure_blob.download_bytes(f["file_path"])
-            suffix = os.path.splitext(f["file_name"])[-1].lower()
-
-            def process_file() -> str:
-                content = ""
-                try:
-                    if suffix == ".pdf":
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                            tmp.write(blob_bytes)
-                            tmp_path = tmp.name
-                        try:
-                            content = extract_pdf_text(tmp_path)
-                        finally:
-                            os.remove(tmp_path)
-
-                    elif suffix == ".docx":
-                        doc = Document(BytesIO(blob_bytes))
-                        content = "\n".join(p.text for p in doc.paragraphs)
-
-                    elif suffix == ".pptx":
-                        prs = Presentation(BytesIO(blob_bytes))
-                        texts = []
-                        for slide in prs.slides:
-                            for shape in slide.shapes:
-                                if hasattr(shape, "text"):
-                                    texts.append(shape.text)
-                        content = "\n".join(texts)
-
-                    elif suffix in [".xlsx", ".xlsm"]:
-                        wb = openpyxl.load_workbook(BytesIO(blob_bytes))
-                        sheet = wb.active
-                        content = "\n".join(
-                            " ".join(str(cell) if cell else "" for cell in row)
-                            for row in sheet.iter_rows(values_only=True)
-                        )
-
-                    elif suffix in [".png", ".jpg", ".jpeg", ".tiff"]:
-                        img = Image.open(BytesIO(blob_bytes))
-                        content = pytesseract.image_to_string(img)
-
-                    else:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                            tmp.write(blob_bytes)
-                            tmp_path = tmp.name
-                        try:
-                            with open(tmp_path, "r", encoding="utf-8", errors="ignore") as fh:
-                                content = fh.read()
-                        finally:
-                            os.remove(tmp_path)
-
-                except Exception as e:
-                    logger.warning(f"Extraction failed for {f['file_name']}: {e}")
-
-                return content.strip()
-
-            text = await anyio.to_thread.run_sync(process_file)
-
+            text = await text_cache.get_extracted_text(f["file_path"], f["file_name"])
             if text:
-                results.append(text)
+                results[idx] = text
             else:
                 logger.warning(f"Extracted no text from {f['file_name']}")
 
@@ -711,10 +672,10 @@ async def _extract_text_from_files(files: List[dict]) -> str:
             logger.warning(f"Failed to extract {f.get('file_name')} (path={f.get('file_path')}): {e}")
 
     async with anyio.create_task_group() as tg:
-        for f in files:
-            tg.start_soon(_extract_single, f)
+        for idx, f in enumerate(files):
+            tg.start_soon(_extract_single, idx, f)
 
-    return "\n\n".join(results)
+    return "\n\n".join(text for text in results if text)
 
 
 def _rag_retrieve(query: str, k: int = 5) -> List[Dict]:
@@ -800,8 +761,8 @@ def _build_scope_prompt(rfp_text: str, kb_chunks: List[str], project=None, quest
 
     # Trim RFP text
     rfp_tokens = tokenizer.encode(rfp_text or "")
-    if len(rfp_tokens) > 3000:
-        rfp_tokens = rfp_tokens[:3000]
+    if len(rfp_tokens) > SCOPE_RFP_TOKENS:
+        rfp_tokens = rfp_tokens[:SCOPE_RFP_TOKENS]
     rfp_text = tokenizer.decode(rfp_tokens)
     used_tokens += len(rfp_tokens)
 
@@ -1343,58 +1304,130 @@ def _extract_document_overview(full_text: str, max_chars: int = 10000) -> str:
 
     return overview
 
-def _retrieve_relevant_sections_by_aspects(project_name: str, aspects: List[str], k: int = 2) -> List[str]:
+# Aspects of an RFP pulled into the questionnaire prompt
+RFP_KEY_ASPECTS = [
+    "technical requirements and specifications",
+    "project scope and deliverables",
+    "timeline and milestones",
+    "budget and resource constraints",
+    "integration and compatibility requirements",
+    "security and compliance requirements"
+]
+
+def _rank_rfp_sections(
+    project_id,
+    rfp_text: str,
+    queries: List[str],
+    k: int,
+    indexed: bool = False
+) -> List[List[tuple]]:
     """
-    Use RAG to retrieve relevant document sections for specific aspects.
-    This ensures we get focused content instead of entire document.
+    Find the RFP chunks most similar to each query.
 
-    Args:
-        project_name: Name of the project for contextual queries
-        aspects: List of aspects to query (e.g., "technical requirements")
-        k: Number of chunks to retrieve per aspect
+    Searches the project's chunks in the RFP collection when they are
+    indexed (precompute), otherwise chunks and embeds the RFP in one batch
+    with the queries and ranks in memory.
 
     Returns:
-        List of relevant text sections
+        For each query, up to k (chunk_index, content) pairs, best first
     """
-    relevant_sections = []
+    if not queries:
+        return []
 
-    for aspect in aspects:
-        try:
-            # Create focused query
-            query = f"{project_name} {aspect}"
-
-            # Use existing RAG retrieval
-            results = _rag_retrieve(query, k=k)
-
-            if results:
-                # Extract text chunks
-                for group in results:
-                    for chunk in group.get("chunks", []):
-                        content = chunk.get("content", "")
-                        if content and content not in relevant_sections:  # Avoid duplicates
-                            relevant_sections.append(content)
-        except Exception as e:
-            logger.warning(f"Failed to retrieve sections for aspect '{aspect}': {e}")
-            continue
+    if indexed:
+        from qdrant_client import models as models_qdrant
+
+        query_vectors = embed_text_ollama(queries)
+        project_filter = models_qdrant.Filter(
+            must=[
+                models_qdrant.FieldCondition(
+                    key="project_id",
+                    match=models_qdrant.MatchValue(value=str(project_id))
+                )
+            ]
+        )
+        responses = get_qdrant_client().search_batch(
+            collection_name=PROJECT_RFP_COLLECTION,
+            requests=[
+                models_qdrant.SearchRequest(vector=vector, filter=project_filter, limit=k, with_payload=True)
+                for vector in query_vectors
+            ]
+        )
+        return [
+            [((p.payload or {}).get("chunk_index", 0), (p.payload or {}).get("content", "")) for p in points]
+            for points in responses
+        ]
 
-    return relevant_sections
+    import numpy as np
 
-async def generate_project_questions(db: AsyncSession, project) -> dict:
-    """
-    Generate a categorized questionnaire for the given project using Ollama.
-    Saves the questions.json file in Azure Blob.
+    chunks = chunk_text(rfp_text)
+    if not chunks:
+        return [[] for _ in queries]
+    vectors = np.asarray(embed_text_ollama(chunks + queries), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = vectors[len(chunks):] @ vectors[:len(chunks)].T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [[(int(i), chunks[i]) for i in row] for row in top]
+
+
+def _retrieve_relevant_sections_by_aspects(
+    project,
+    rfp_text: str,
+    aspects: List[str],
+    k: int = RFP_SECTIONS_PER_ASPECT,
+    token_budget: int = RFP_SECTION_TOKEN_BUDGET,
+    exclude: str = "",
+    indexed: bool = False
+) -> List[str]:
     """
+    Select the RFP sections most relevant to each aspect within a token budget.
+
+    Args:
+        project: Project the RFP belongs to (name is added to the queries)
+        rfp_text: Full RFP text
+        aspects: List of aspects to query (e.g., "technical requirements")
+        k: Number of chunks to consider per aspect
+        token_budget: Maximum tokens across the returned sections
+        exclude: Text already in the prompt (sections inside it are skipped)
+        indexed: Whether the RFP is in the project RFP collection
 
-    # ---------- Extract RFP ----------
-    rfp_text = ""
+    Returns:
+        List of relevant RFP sections in document order
+    """
+    project_name = getattr(project, "name", None) or getattr(project, "domain", None) or "project"
     try:
-        if getattr(project, "files", None):
-            files = [{"file_name": f.file_name, "file_path": f.file_path} for f in project.files]
-            if files:
-                rfp_text = await _extract_text_from_files(files)
+        ranked = _rank_rfp_sections(
+            getattr(project, "id", None), rfp_text, [f"{project_name} {aspect}" for aspect in aspects], k, indexed
+        )
     except Exception as e:
-        logger.warning(f"Failed to extract RFP for questions: {e}")
+        logger.warning(f"Failed to retrieve RFP sections by aspect: {e}")
+        return []
+
+    # Round-robin over aspects so every aspect gets its best section first
+    selected: Dict[int, str] = {}
+    used = 0
+    for rank in range(k):
+        for hits in ranked:
+            if rank >= len(hits):
+                continue
+            chunk_index, content = hits[rank]
+            if chunk_index in selected or not content or content in exclude:
+                continue
+            tokens = count_tokens(content)
+            if used + tokens > token_budget:
+                continue
+            selected[chunk_index] = content
+            used += tokens
+
+    return [selected[i] for i in sorted(selected)]
+
+def _questions_rfp_context(project, rfp_text: str, indexed: bool = False) -> tuple[str, List[str]]:
+    """
+    Build the focused RFP content and KB chunks for the questionnaire prompt.
 
+    Depends only on the project's files and metadata, so it can be
+    precomputed at upload time.
+    """
     # ---------- Smart Document Processing (Chunked RAG Approach) ----------
     # Instead of sending entire large document, use overview + RAG-retrieved sections
     focused_rfp_content = ""
@@ -1404,29 +1437,27 @@ async def generate_project_questions(db: AsyncSession, project) -> dict:
         rfp_overview = _extract_document_overview(rfp_text, max_chars=10000)
         logger.info(f"📄 Extracted RFP overview: {len(rfp_overview)} chars (from {len(rfp_text)} total chars)")
 
-        # Define key aspects to query for relevant sections
-        key_aspects = [
-            "technical requirements and specifications",
-            "project scope and deliverables",
-            "timeline and milestones",
-            "budget and resource constraints",
-            "integration and compatibility requirements",
-            "security and compliance requirements"
-        ]
-
-        # Use RAG to retrieve relevant sections for each aspect
-        project_name = getattr(project, "name", None) or getattr(project, "domain", None) or "project"
-        relevant_sections = _retrieve_relevant_sections_by_aspects(project_name, key_aspects, k=2)
+        # Pull the sections of the RFP itself that cover each aspect, within a token budget
+        relevant_sections = []
+        if len(rfp_overview) < len(rfp_text):
+            relevant_sections = _retrieve_relevant_sections_by_aspects(
+                project, rfp_text, RFP_KEY_ASPECTS, exclude=rfp_overview, indexed=indexed
+            )
+            if indexed and not relevant_sections:
+                # Never cache an overview-only context: rank the RFP in memory instead
+                logger.warning("No RFP sections retrieved from the project index, ranking in memory")
+                relevant_sections = _retrieve_relevant_sections_by_aspects(
+                    project, rfp_text, RFP_KEY_ASPECTS, exclude=rfp_overview
+                )
 
         if relevant_sections:
-            logger.info(f"🔍 Retrieved {len(relevant_sections)} relevant sections via RAG")
+            logger.info(f"🔍 Retrieved {len(relevant_sections)} relevant RFP sections by aspect")
 
         # Combine overview + relevant sections (focused content, not full document)
         focused_rfp_content = rfp_overview
         if relevant_sections:
-            # Limit to 10 sections to avoid overwhelming the prompt
             focused_rfp_content += "\n\n=== Additional Relevant Details ===\n\n"
-            focused_rfp_content += "\n\n".join(relevant_sections[:10])
+            focused_rfp_content += "\n\n".join(relevant_sections)
 
         logger.info(f"✅ Using focused content: {len(focused_rfp_content)} chars (reduced from {len(rfp_text)} chars)")
     else:
@@ -1438,6 +1469,36 @@ async def generate_project_questions(db: AsyncSession, project) -> dict:
     kb_results = _rag_retrieve(kb_query)
     kb_chunks = [ch["content"] for group in kb_results for ch in group["chunks"]][:5] if kb_results else []
 
+
+    return focused_rfp_content, kb_chunks
+
+
+async def generate_project_questions(db: AsyncSession, project) -> dict:
+    """
+    Generate a categorized questionnaire for the given project using Ollama.
+    Saves the questions.json file in Azure Blob.
+    """
+
+    # ---------- Focused RFP content + KB context (precomputed at upload when ready) ----------
+    from app.services import project_precompute
+
+    precomputed = await project_precompute.get_ready_artifacts(db, project)
+    if precomputed:
+        focused_rfp_content = precomputed["focused_rfp_content"]
+        kb_chunks = precomputed["questions_kb_chunks"]
+        logger.info(f"⚡ Using precomputed RFP context for project {project.id}")
+    else:
+        rfp_text = ""
+        try:
+            if getattr(project, "files", None):
+                files = [{"file_name": f.file_name, "file_path": f.file_path} for f in project.files]
+                if files:
+                    rfp_text = await _extract_text_from_files(files)
+        except Exception as e:
+            logger.warning(f"Failed to extract RFP for questions: {e}")
+
+        focused_rfp_content, kb_chunks = await anyio.to_thread.run_sync(_questions_rfp_context, project, rfp_text)
+
     # ---------- Build prompt with focused content ----------
     prompt = _build_questionnaire_prompt(focused_rfp_content, kb_chunks, project)
 
@@ -1858,6 +1919,7 @@ async def _call_eraser_api(dsl_code: str) -> tuple[str | None, str | None]:
 
     try:
         logger.info(f"🎨 Calling Eraser.io API to render architecture diagram...")
+        import requests
         response = await anyio.to_thread.run_sync(
             lambda: requests.post(ERASER_IO_API_URL, headers=headers, json=payload, timeout=30)
         )
@@ -1932,6 +1994,7 @@ async def generate_architecture_eraser(
     # Step 4: Download PNG from Eraser.io
     try:
         logger.info(f"📥 Downloading diagram from Eraser.io: {image_url}")
+        import requests
         png_response = await anyio.to_thread.run_sync(
             lambda: requests.get(image_url, timeout=30)
         )
@@ -2023,6 +2086,7 @@ digraph Architecture {
     # --- Render DOT → PNG & SVG ---
     tmp_base = tempfile.NamedTemporaryFile(delete=False, suffix=".dot").name
     try:
+        import graphviz
         graph = graphviz.Source(fallback_dot, engine="dot")
         graph.render(tmp_base, format="png", cleanup=True)
         graph.render(tmp_base, format="svg", cleanup=True)
@@ -2124,6 +2188,7 @@ async def generate_architecture(
     tmp_base = tempfile.NamedTemporaryFile(delete=False, suffix=".dot").name
     try:
         # Use existing logic but strictly with our clean DOT
+        import graphviz
         graph = graphviz.Source(dot_code, engine="dot")
         
         # Ensure graphviz is installed
@@ -2425,44 +2490,24 @@ async def clean_scope(db: AsyncSession, data: Dict[str, Any], project=None) -> D
     return data
 
 
-async def generate_project_scope(db: AsyncSession, project) -> dict:
-    """
-    Generate project scope + architecture diagram + store architecture in DB + return combined JSON.
+def _scope_rfp_context(project, rfp_text: str) -> tuple[str, List[str]]:
     """
+    Trim the RFP to the scope token budget and retrieve the KB chunks that fit.
 
-    #  Ensure the project has a valid company reference (fallback to Sigmoid)
-    if not getattr(project, "company_id", None):
-        from app.utils import ratecards
-        sigmoid = await ratecards.get_or_create_sigmoid_company(db)
-        project.company_id = sigmoid.id
-        await db.commit()
-        await db.refresh(project)
-        logger.info(f"Linked project {project.id} to Sigmoid company as fallback")
+    Depends only on the project's files and metadata, so it can be
+    precomputed at upload time.
+    """
+    import tiktoken
 
     tokenizer = tiktoken.get_encoding("cl100k_base")
     context_limit = 128000
     max_total_tokens = context_limit - 4000
     used_tokens = 0
 
-    # ---------- Extract RFP ----------
-    rfp_text = ""
-    try:
-        files: List[dict] = []
-        if getattr(project, "files", None):
-            try:
-                files = [{"file_name": f.file_name, "file_path": f.file_path} for f in project.files]
-            except Exception as e:
-                logger.warning(f" Could not access project.files: {e}")
-                files = []
-        if files:
-            rfp_text = await _extract_text_from_files(files)
-    except Exception as e:
-        logger.warning(f"File extraction for project {getattr(project, 'id', None)} failed: {e}")
-
-    # ---------- Trim RFP text ----------
+    # ---------- Trim RFP text (already condensed to the budget when oversized) ----------
     rfp_tokens = tokenizer.encode(rfp_text or "")
-    if len(rfp_tokens) > 5000:
-        rfp_tokens = rfp_tokens[:5000]
+    if len(rfp_tokens) > SCOPE_RFP_TOKENS:
+        rfp_tokens = rfp_tokens[:SCOPE_RFP_TOKENS]
     rfp_text = tokenizer.decode(rfp_tokens)
     used_tokens += len(rfp_tokens)
 
@@ -2552,6 +2597,51 @@ Generate activities with realistic start/end dates, proper role assignments, and
         f"Final RFP tokens: {len(rfp_tokens)}, KB tokens: {used_tokens - len(rfp_tokens)}, Total: {used_tokens}/{max_total_tokens}"
     )
 
+    return rfp_text, kb_chunks
+
+
+async def generate_project_scope(db: AsyncSession, project) -> dict:
+    """
+    Generate project scope + architecture diagram + store architecture in DB + return combined JSON.
+    """
+
+    #  Ensure the project has a valid company reference (fallback to Sigmoid)
+    if not getattr(project, "company_id", None):
+        from app.utils import ratecards
+        project.company_id = await ratecards.get_sigmoid_company_id(db)
+        await db.commit()
+        await db.refresh(project)
+        logger.info(f"Linked project {project.id} to Sigmoid company as fallback")
+
+    # ---------- RFP + KB context (precomputed at upload when ready) ----------
+    from app.services import project_precompute
+
+    precomputed = await project_precompute.get_ready_artifacts(db, project)
+    if precomputed:
+        rfp_text = precomputed["scope_rfp_text"]
+        kb_chunks = precomputed["scope_kb_chunks"]
+        logger.info(f"⚡ Using precomputed RFP context for project {project.id}")
+    else:
+        # ---------- Extract RFP ----------
+        rfp_text = ""
+        try:
+            files: List[dict] = []
+            if getattr(project, "files", None):
+                try:
+                    files = [{"file_name": f.file_name, "file_path": f.file_path} for f in project.files]
+                except Exception as e:
+                    logger.warning(f" Could not access project.files: {e}")
+                    files = []
+            if files:
+                rfp_text = await _extract_text_from_files(files)
+        except Exception as e:
+            logger.warning(f"File extraction for project {getattr(project, 'id', None)} failed: {e}")
+
+        # Oversized RFPs are summarized to the budget instead of cut to their first pages
+        from app.services import rfp_summarizer
+        rfp_text = await rfp_summarizer.condense_rfp(rfp_text)
+        rfp_text, kb_chunks = await anyio.to_thread.run_sync(_scope_rfp_context, project, rfp_text)
+
     # ---------- Load questions.json (if exists) and build Q&A context ----------
     questions_context = None
     try:
@@ -2685,38 +2775,11 @@ Generate activities with realistic start/end dates, proper role assignments, and
             logger.warning(f"Architecture diagram generation failed: {e}")
             cleaned_scope["architecture_diagram"] = None
 
-        # Step 3: Auto-save finalized_scope.json in Azure Blob + DB
+        # Step 3: Auto-save the scope as a new version (archived to finalized_scope.json in the background)
         try:
-            from sqlalchemy import select
-            result = await db.execute(
-                select(models.ProjectFile).filter(
-                    models.ProjectFile.project_id == project.id,
-                    models.ProjectFile.file_name == "finalized_scope.json",
-                )
-            )
-            old_file = result.scalars().first()
-            if old_file:
-                logger.info(f"Overwriting existing finalized_scope.json for project {project.id}")
-            else:
-                old_file = models.ProjectFile(
-                    project_id=project.id,
-                    file_name="finalized_scope.json",
-                )
-
-            blob_name = f"{PROJECTS_BASE}/{project.id}/finalized_scope.json"
-
-            await azure_blob.upload_bytes(
-                json.dumps(cleaned_scope, ensure_ascii=False, indent=2).encode("utf-8"),
-                blob_name,
-                overwrite=True, 
-            )
-
-            old_file.file_path = blob_name
-            db.add(old_file)
-            await db.commit()
-            await db.refresh(old_file)
+            from app.services import scope_store
 
-            logger.info(f" finalized_scope.json overwritten for project {project.id}")
+            await scope_store.save_scope(db, project.id, cleaned_scope)
 
         except Exception as e:
             logger.warning(f" Failed to auto-save finalized_scope.json: {e}")
@@ -3119,27 +3182,10 @@ Return only the updated JSON.
         await db.refresh(project)
         logger.info(f" Project metadata synced for project {project.id}")
 
-    # ---- Overwrite finalized_scope.json in Blob ----
-    result = await db.execute(
-        select(models.ProjectFile).filter(
-            models.ProjectFile.project_id == project.id,
-            models.ProjectFile.file_name == "finalized_scope.json",
-        )
-    )
-    old_file = result.scalars().first() or models.ProjectFile(
-        project_id=project.id, file_name="finalized_scope.json"
-    )
+    # ---- Save as a new scope version (archived to finalized_scope.json in the background) ----
+    from app.services import scope_store
 
-    blob_name = f"{PROJECTS_BASE}/{project.id}/finalized_scope.json"
-    await azure_blob.upload_bytes(
-        json.dumps(cleaned, ensure_ascii=False, indent=2).encode("utf-8"),
-        blob_name,
-        overwrite=True,
-    )
-    old_file.file_path = blob_name
-    db.add(old_file)
-    await db.commit()
-    await db.refresh(old_file)
+    await scope_store.save_scope(db, project.id, cleaned)
 
     logger.info(f" Creative finalized_scope.json regenerated for project {project.id}")
     return {**cleaned, "_finalized": True}
@@ -3190,8 +3236,7 @@ async def finalize_scope(
         input_files = [
             {"file_path": f.file_path, "file_name": f.file_name}
             for f in project.files
-            if f.file_name not in ["scope.json", "finalized_scope.json", "questions.json", "architecture.png", "architecture.svg"]
-            and not f.file_name.startswith("architecture_")
+            if not is_generated_file(f.file_name)
         ]
         
         if input_files:
@@ -3212,35 +3257,10 @@ async def finalize_scope(
         logger.error(f"❌ Failed to generate architecture during finalization: {e}")
         # non-blocking error for finalization
 
-    # ---- Step 4: Save finalized_scope.json ----
-    result = await db.execute(
-        select(models.ProjectFile).filter(
-            models.ProjectFile.project_id == project_id,
-            models.ProjectFile.file_name == "finalized_scope.json"
-        )
-    )
-    old_file = result.scalars().first()
-    if old_file:
-        logger.info(f" Overwriting existing finalized_scope.json for project {project_id}")
-    else:
-        old_file = models.ProjectFile(
-            project_id=project_id,
-            file_name="finalized_scope.json",
-        )
-
-    blob_name = f"{PROJECTS_BASE}/{project_id}/finalized_scope.json"
-    
-    # Ensure architecture_diagram is preserved in saved JSON
-    await azure_blob.upload_bytes(
-        json.dumps(finalized, ensure_ascii=False, indent=2).encode("utf-8"),
-        blob_name,
-        overwrite=True,
-    )
+    # ---- Step 4: Save as a new scope version (archived to finalized_scope.json in the background) ----
+    from app.services import scope_store
 
-    old_file.file_path = blob_name
-    db.add(old_file)
-    await db.commit()
-    await db.refresh(old_file)
+    old_file, _ = await scope_store.save_scope(db, project.id, finalized)
 
     logger.info(f" Finalized scope saved (no LLM) for project {project_id}")
     return old_file, {**finalized, "_finalized": True}
\ No newline at end of file
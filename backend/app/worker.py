@@ -0,0 +1,44 @@
+"""
+Standalone ETL worker.
+
+Run with:
+    python -m app.worker
+
+Claims queued knowledge base jobs from the database, runs the scheduled
+KB scan and collects blobs queued for deletion. Any number of replicas can run side by side; set
+ETL_EMBEDDED_WORKER=false on the API so only dedicated workers do ETL.
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.config.config import ETL_WORKER_CONCURRENCY
+from app.services import etl_queue, blob_gc
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s: %(message)s'
+)
+logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(logging.WARNING)
+logging.getLogger("azure.storage.blob").setLevel(logging.WARNING)
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    tasks = etl_queue.start_worker_tasks(stop)
+    tasks.append(blob_gc.start_collector_task(stop))
+    logger.info(f"🚀 ETL worker process {etl_queue.WORKER_ID} running ({max(ETL_WORKER_CONCURRENCY, 1)} worker loop(s))")
+
+    # Worker loops finish their current job and exit once stop is set
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
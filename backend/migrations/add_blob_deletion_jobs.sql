@@ -0,0 +1,23 @@
+-- Migration: Add background folder deletion jobs
+-- Date: 2026-10-18
+-- Description: Creates blob_deletion_jobs (also created by create_all), the
+--              job handle returned when a folder deletion is too large to
+--              finish within the HTTP request
+
+CREATE TABLE IF NOT EXISTS blob_deletion_jobs (
+    id UUID PRIMARY KEY,
+    base VARCHAR(50) NOT NULL,
+    folder TEXT NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    documents_total INTEGER NOT NULL DEFAULT 0,
+    documents_deleted INTEGER NOT NULL DEFAULT 0,
+    blobs_deleted INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    completed_at TIMESTAMPTZ NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_blob_deletion_jobs_status ON blob_deletion_jobs(status);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,24 @@
+-- Migration: Add blob deletion outbox
+-- Date: 2026-10-18
+-- Description: Creates blob_deletion_outbox (also created by create_all).
+--              Deleting a project or project file queues its blob (or folder
+--              prefix) here in the same transaction; the blob collector
+--              deletes them in batches and retries failures with backoff
+
+CREATE TABLE IF NOT EXISTS blob_deletion_outbox (
+    id UUID PRIMARY KEY,
+    path TEXT NOT NULL,
+    is_prefix BOOLEAN NOT NULL DEFAULT FALSE,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ DEFAULT now(),
+    last_error TEXT NULL,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
+-- Collector claim: due pending rows in order
+CREATE INDEX IF NOT EXISTS ix_blob_deletion_outbox_due
+    ON blob_deletion_outbox(status, next_attempt_at);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,18 @@
+-- Migration: Add cache versions
+-- Date: 2026-10-18
+-- Description: Creates cache_versions (also created by create_all). Rate card
+--              writes bump the "rate_cards" row in the same transaction so
+--              every worker drops its in-memory rate maps within
+--              RATE_CACHE_VERSION_CHECK_SECONDS
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+INSERT INTO cache_versions (name, version) VALUES ('rate_cards', 0)
+    ON CONFLICT (name) DO NOTHING;
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
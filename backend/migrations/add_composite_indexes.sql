@@ -0,0 +1,39 @@
+-- Migration: Add composite indexes for hot lookups
+-- Date: 2026-10-18
+-- Description: Composite indexes for queries that filter on several columns
+--              (also created by create_all). Built CONCURRENTLY so existing
+--              tables stay writable; run with psql (autocommit), not inside
+--              a transaction. rate_cards.company_id already has its own
+--              index; the new one also covers the per-user filter.
+--              tests/test_query_plans.py checks the planner uses them.
+
+-- finalized_scope.json / questions.json lookups of a project
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_files_project_id_file_name
+    ON project_files(project_id, file_name);
+
+-- Pending update of a document (ETL re-ingestion checks)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pending_kb_updates_new_document_id_status
+    ON pending_kb_updates(new_document_id, status);
+
+-- Latest pending case study of a project
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pending_generated_case_studies_project_id_status_created_at
+    ON pending_generated_case_studies(project_id, status, created_at);
+
+-- Job listing filtered by status, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_processing_jobs_status_created_at
+    ON document_processing_jobs(status, created_at);
+
+-- Worker claim: due pending jobs in order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_processing_jobs_status_next_attempt_at
+    ON document_processing_jobs(status, next_attempt_at);
+
+-- Company cards for one user plus the company defaults
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_rate_cards_company_id_user_id
+    ON rate_cards(company_id, user_id);
+
+-- Keyset-paginated project listing of an owner
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_projects_owner_id_created_at_id
+    ON projects(owner_id, created_at, id);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,20 @@
+-- Migration: Turn document_processing_jobs into the ETL work queue
+-- Date: 2026-10-18
+-- Description: Adds blob_path and retry/lease columns so workers can claim
+--              jobs with SELECT ... FOR UPDATE SKIP LOCKED, and allows
+--              document_id to be NULL until a queued blob is resolved
+
+ALTER TABLE document_processing_jobs ALTER COLUMN document_id DROP NOT NULL;
+
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS blob_path TEXT NULL;
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS max_attempts INTEGER NOT NULL DEFAULT 5;
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ NULL;
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS locked_by VARCHAR(100) NULL;
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS locked_at TIMESTAMPTZ NULL;
+
+CREATE INDEX IF NOT EXISTS ix_document_processing_jobs_blob_path ON document_processing_jobs(blob_path);
+CREATE INDEX IF NOT EXISTS ix_document_processing_jobs_next_attempt_at ON document_processing_jobs(next_attempt_at);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,22 @@
+-- Migration: Add live ETL progress and throughput metrics
+-- Date: 2026-10-18
+-- Description: Adds processing counters to etl_scan_runs and links queued
+--              jobs to the scan run that created them, with per-job stage
+--              timings used for throughput and latency percentiles
+
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS listing_seconds DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS docs_processed INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS docs_failed INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS bytes_downloaded BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS docs_extracted INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS chunks_embedded INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE etl_scan_runs ADD COLUMN IF NOT EXISTS vectors_upserted INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE document_processing_jobs
+    ADD COLUMN IF NOT EXISTS scan_run_id UUID NULL REFERENCES etl_scan_runs(id) ON DELETE SET NULL;
+ALTER TABLE document_processing_jobs ADD COLUMN IF NOT EXISTS stage_metrics TEXT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_document_processing_jobs_scan_run_id ON document_processing_jobs(scan_run_id);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,27 @@
+-- Migration: Add resumable ETL scan runs
+-- Date: 2026-10-18
+-- Description: Creates etl_scan_runs (also created by create_all), which
+--              persists the blob listing cursor so an interrupted KB scan
+--              resumes where it stopped
+
+CREATE TABLE IF NOT EXISTS etl_scan_runs (
+    id UUID PRIMARY KEY,
+    status VARCHAR(50) NOT NULL DEFAULT 'running',
+    trigger VARCHAR(50) NOT NULL DEFAULT 'scheduled',
+    continuation_token TEXT NULL,
+    pages_listed INTEGER NOT NULL DEFAULT 0,
+    files_listed INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    unchanged INTEGER NOT NULL DEFAULT 0,
+    pending_approval INTEGER NOT NULL DEFAULT 0,
+    queued INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT NULL,
+    started_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ NULL,
+    completed_at TIMESTAMPTZ NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_etl_scan_runs_status ON etl_scan_runs(status);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
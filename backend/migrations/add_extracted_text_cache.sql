@@ -0,0 +1,19 @@
+-- Migration: Add extracted text cache for project files
+-- Date: 2026-10-18
+-- Description: Creates extracted_text_cache (also created by create_all),
+--              which stores parsed file text keyed by blob path with the
+--              content hash and ETag it was extracted from
+
+CREATE TABLE IF NOT EXISTS extracted_text_cache (
+    id UUID PRIMARY KEY,
+    blob_path TEXT NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    etag VARCHAR(100) NULL,
+    text TEXT NOT NULL DEFAULT '',
+    extracted_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_extracted_text_cache_blob_path ON extracted_text_cache(blob_path);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
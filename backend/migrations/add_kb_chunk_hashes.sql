@@ -0,0 +1,24 @@
+-- Migration: Add per-chunk content hashes to knowledge_base_documents
+-- Date: 2026-10-18
+-- Description: Stores a SHA256 per chunk (aligned with qdrant_point_ids) so that
+--              re-vectorization only embeds new/changed chunks and deletes stale ones
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_name='knowledge_base_documents'
+        AND column_name='chunk_hashes'
+    ) THEN
+        ALTER TABLE knowledge_base_documents
+        ADD COLUMN chunk_hashes TEXT NULL;
+
+        RAISE NOTICE 'Added chunk_hashes column to knowledge_base_documents';
+    ELSE
+        RAISE NOTICE 'chunk_hashes column already exists';
+    END IF;
+END $$;
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
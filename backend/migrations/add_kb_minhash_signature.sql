@@ -0,0 +1,35 @@
+-- Migration: Add MinHash signatures for KB near-duplicate detection
+-- Date: 2026-10-18
+-- Description: Adds minhash_signature to knowledge_base_documents and the
+--              kb_minhash_bands LSH index table (also created by create_all).
+--              Documents vectorized before this migration get their
+--              signature from the ETL worker's MinHash backfill
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_name='knowledge_base_documents'
+        AND column_name='minhash_signature'
+    ) THEN
+        ALTER TABLE knowledge_base_documents
+        ADD COLUMN minhash_signature TEXT NULL;
+
+        RAISE NOTICE 'Added minhash_signature column to knowledge_base_documents';
+    ELSE
+        RAISE NOTICE 'minhash_signature column already exists';
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS kb_minhash_bands (
+    id UUID PRIMARY KEY,
+    document_id UUID REFERENCES knowledge_base_documents(id) ON DELETE CASCADE,
+    band_key VARCHAR(32) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_kb_minhash_bands_document_id ON kb_minhash_bands(document_id);
+CREATE INDEX IF NOT EXISTS ix_kb_minhash_bands_band_key ON kb_minhash_bands(band_key);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
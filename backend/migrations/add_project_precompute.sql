@@ -0,0 +1,26 @@
+-- Migration: Add upload-time precompute for project RFPs
+-- Date: 2026-10-18
+-- Description: Adds projects.precompute_status and creates project_precomputes
+--              (also created by create_all), which stores the RFP context
+--              prepared in the background with the file ETags and metadata
+--              hash it was computed from
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS precompute_status VARCHAR(50) NULL;
+
+CREATE TABLE IF NOT EXISTS project_precomputes (
+    id UUID PRIMARY KEY,
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    metadata_hash VARCHAR(64) NULL,
+    file_etags TEXT NULL,
+    artifacts TEXT NULL,
+    rfp_chars INTEGER NOT NULL DEFAULT 0,
+    rfp_tokens INTEGER NOT NULL DEFAULT 0,
+    rfp_chunks_indexed INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT NULL,
+    computed_at TIMESTAMPTZ NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_project_precomputes_project_id ON project_precomputes(project_id);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
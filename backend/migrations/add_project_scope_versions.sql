@@ -0,0 +1,25 @@
+-- Migration: Add project scope versions
+-- Date: 2026-10-18
+-- Description: Creates project_scope_versions (also created by create_all).
+--              Every finalize/regenerate stores the scope as a new version
+--              with its SHA256 (served as ETag); finalized_scope.json in blob
+--              storage becomes a background archive copy. JSON (not JSONB)
+--              keeps the key order the exports and UI display. Scopes saved
+--              before this migration are copied from their blob on first read
+
+CREATE TABLE IF NOT EXISTS project_scope_versions (
+    id UUID PRIMARY KEY,
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL DEFAULT 1,
+    scope JSON NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    archived_at TIMESTAMPTZ NULL
+);
+
+-- Latest version of a project
+CREATE UNIQUE INDEX IF NOT EXISTS ix_project_scope_versions_project_id_version
+    ON project_scope_versions(project_id, version);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,17 @@
+-- Migration: Add summary cache for oversized RFPs
+-- Date: 2026-10-18
+-- Description: Creates summary_cache (also created by create_all), which
+--              stores LLM section summaries keyed by the SHA256 of the
+--              section text and target length
+
+CREATE TABLE IF NOT EXISTS summary_cache (
+    id UUID PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_summary_cache_content_hash ON summary_cache(content_hash);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
@@ -0,0 +1,23 @@
+-- Migration: Add direct upload sessions
+-- Date: 2026-10-18
+-- Description: Creates upload_sessions (also created by create_all). A session
+--              lists the blobs a client uploads straight to storage with
+--              write-only SAS URLs; completing it registers the project files
+--              or queues the knowledge base documents for ETL
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id UUID PRIMARY KEY,
+    owner_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    base VARCHAR(50) NOT NULL,
+    project_id UUID NULL REFERENCES projects(id) ON DELETE CASCADE,
+    files TEXT NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    created_at TIMESTAMPTZ DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    completed_at TIMESTAMPTZ NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_upload_sessions_owner_id ON upload_sessions(owner_id);
+
+-- Show completion message
+SELECT 'Migration completed successfully!' as status;
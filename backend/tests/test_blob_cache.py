@@ -0,0 +1,40 @@
+import pytest
+
+from app.utils import blob_cache
+from app.utils.blob_cache import BlobDiskCache
+
+PATH = "projects/p1/finalized_scope.json"
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    """Two processes' caches sharing one directory, always re-synced before writes."""
+    monkeypatch.setattr(blob_cache, "RESYNC_SECONDS", 0)
+    return (
+        BlobDiskCache(str(tmp_path), max_bytes=100, max_item_bytes=100),
+        BlobDiskCache(str(tmp_path), max_bytes=100, max_item_bytes=100),
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_skips_copy_replaced_by_another_process(caches):
+    first, second = caches
+    await first.put(PATH, '"e1"', b"v1")
+    assert await first.etag(PATH) == '"e1"'
+
+    await second.put(PATH, '"e2"', b"v2")
+
+    # first still believes e1 is cached, but the file now holds e2
+    assert await first.read(PATH, '"e1"') is None
+    assert await second.read(PATH, '"e2"') == b"v2"
+
+
+@pytest.mark.asyncio
+async def test_budget_covers_entries_of_every_process(caches, tmp_path):
+    first, second = caches
+    await first.put("a", '"a"', b"x" * 60)
+    await second.put("b", '"b"', b"y" * 60)
+
+    assert len(list(tmp_path.glob("*.bin"))) == 1
+    assert await second.read("b", '"b"') == b"y" * 60
+    assert second.stats()["evictions"] == 1
@@ -0,0 +1,86 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import models
+from app.services import blob_deletion
+
+FOLDER = "knowledge_base/old"
+
+
+@pytest_asyncio.fixture
+async def db():
+    """In-memory SQLite session with just the KB document table."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.KnowledgeBaseDocument.__table__.create)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for name, document_type in (("a.pdf", "general"), ("deck.pptx", "case_study")):
+            session.add(models.KnowledgeBaseDocument(
+                file_name=name, blob_path=f"{FOLDER}/{name}", file_hash="h", file_size=1,
+                document_type=document_type, is_vectorized=True, vector_count=3
+            ))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+class _Qdrant:
+    """Records deletes per collection and fails the ones listed."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.deleted = []
+
+    def delete(self, collection_name, points_selector):
+        if collection_name in self.failing:
+            raise RuntimeError("qdrant unavailable")
+        self.deleted.append(collection_name)
+
+
+def _stub_storage(monkeypatch, qdrant, blob_error=None):
+    async def delete_folder(folder_name, base):
+        if blob_error:
+            raise blob_error
+        return [f"{FOLDER}/a.pdf", f"{FOLDER}/deck.pptx"]
+
+    monkeypatch.setattr(blob_deletion.azure_blob, "delete_folder", delete_folder)
+    monkeypatch.setattr(blob_deletion, "get_qdrant_client", lambda: qdrant)
+
+
+async def _documents(db):
+    result = await db.execute(select(models.KnowledgeBaseDocument).order_by(models.KnowledgeBaseDocument.file_name))
+    return {doc.file_name: doc for doc in result.scalars().all()}
+
+
+@pytest.mark.asyncio
+async def test_deletes_records_once_blobs_and_vectors_are_gone(db, monkeypatch):
+    _stub_storage(monkeypatch, _Qdrant())
+
+    result = await blob_deletion.delete_folder(db, FOLDER, "knowledge_base")
+
+    assert result["documents_deleted"] == 2
+    assert await _documents(db) == {}
+
+
+@pytest.mark.asyncio
+async def test_keeps_records_whose_vectors_were_not_deleted(db, monkeypatch):
+    _stub_storage(monkeypatch, _Qdrant(failing={blob_deletion.CASE_STUDY_COLLECTION}))
+
+    with pytest.raises(blob_deletion.VectorDeletionError):
+        await blob_deletion.delete_folder(db, FOLDER, "knowledge_base")
+
+    assert list(await _documents(db)) == ["deck.pptx"]
+
+
+@pytest.mark.asyncio
+async def test_keeps_records_without_vectors_when_blob_delete_fails(db, monkeypatch):
+    _stub_storage(monkeypatch, _Qdrant(), blob_error=RuntimeError("listing failed"))
+
+    with pytest.raises(RuntimeError, match="listing failed"):
+        await blob_deletion.delete_folder(db, FOLDER, "knowledge_base")
+
+    db.expire_all()
+    documents = await _documents(db)
+    assert [(doc.is_vectorized, doc.vector_count) for doc in documents.values()] == [(False, 0), (False, 0)]
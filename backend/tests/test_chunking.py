@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from app.utils import chunking
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    try:
+        return chunking.get_encoding()
+    except Exception as e:  # Tokenizer files are downloaded on first use
+        pytest.skip(f"Tokenizer unavailable: {e}")
+
+
+def _document(sections: int) -> str:
+    paragraph = (
+        "The delivery team will migrate the reporting workloads to the new platform. "
+        "Each pipeline is validated against the legacy output before cut-over. "
+        "Résumé of risks: data drift, access reviews and downstream consumers. "
+    ) * 3
+    parts = []
+    for i in range(sections):
+        parts.append(f"# Section {i}\n\n" + "\n\n".join([paragraph] * 4))
+    return "\n\f".join(parts)
+
+
+def test_chunks_respect_token_limit_and_sections(encoding):
+    text = _document(20)
+    chunks = chunking.chunk_text(text, max_tokens=200, overlap_tokens=30)
+
+    assert all(len(encoding.encode_ordinary(c)) <= 200 for c in chunks)
+    # Every section starts a new chunk
+    assert sum(c.startswith("# Section") for c in chunks) == 20
+    assert not any("\f" in c for c in chunks)
+
+
+def test_short_and_empty_text(encoding):
+    assert chunking.chunk_text("A short note.") == ["A short note."]
+    assert chunking.chunk_text("   \n ") == []
+
+
+def test_benchmark_large_document_is_linear(encoding):
+    """Chunking time should grow linearly with document size."""
+    chunking.chunk_text(_document(10))  # Warm the token length table
+
+    timings = {}
+    for sections in (500, 2000):
+        text = _document(sections)
+        start = time.perf_counter()
+        chunking.chunk_text(text)
+        timings[sections] = time.perf_counter() - start
+
+    # 4x the input within 8x the time leaves room for noise but catches quadratic behaviour
+    assert timings[2000] < timings[500] * 8, f"Chunking times by section count: {timings}"
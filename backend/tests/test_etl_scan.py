@@ -0,0 +1,56 @@
+import datetime
+
+import pytest
+import pytest_asyncio
+from fastapi import BackgroundTasks
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import models
+from app.routers import etl
+
+
+@pytest_asyncio.fixture
+async def db():
+    """In-memory SQLite session with just the scan run table."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.ETLScanRun.__table__.create)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _scan_runs(db):
+    return (await db.execute(select(func.count()).select_from(models.ETLScanRun))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_scan_resumes_interrupted_run(db):
+    started = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    interrupted = models.ETLScanRun(
+        trigger="scheduled", status="interrupted", started_at=started,
+        continuation_token="page-3", pages_listed=3
+    )
+    db.add(interrupted)
+    await db.commit()
+
+    background_tasks = BackgroundTasks()
+    response = await etl.trigger_etl_scan(background_tasks, db, current_user=None)
+
+    assert response["status"] == "started"
+    assert response["scan_id"] == str(interrupted.id)
+    assert await _scan_runs(db) == 1
+    assert len(background_tasks.tasks) == 1
+
+
+@pytest.mark.asyncio
+async def test_scan_starts_new_run_after_completed_run(db):
+    started = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    db.add(models.ETLScanRun(trigger="scheduled", status="completed", started_at=started))
+    await db.commit()
+
+    response = await etl.trigger_etl_scan(BackgroundTasks(), db, current_user=None)
+
+    assert response["status"] == "started"
+    assert await _scan_runs(db) == 2
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+# Seconds `import app.main` may take in a fresh interpreter (about 1.5s today,
+# so this catches an eager heavy import without failing on a slow runner)
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+
+# Loaded on first use, never by importing the app
+LAZY_MODULES = [
+    "openai",
+    "qdrant_client",
+    "azure.storage.blob",
+    "reportlab",
+    "pptx",
+    "docx",
+    "pdfminer",
+    "openpyxl",
+    "xlsxwriter",
+    "pytesseract",
+    "graphviz",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_app():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_app_within_budget():
+    # Best of two runs so a cold disk cache does not fail the build
+    seconds = min(_import_app()["seconds"] for _ in range(2))
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import app.main: {seconds:.2f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)"
+
+
+def test_import_app_defers_clients_and_document_libraries():
+    modules = set(_import_app()["modules"])
+    assert [name for name in LAZY_MODULES if name in modules] == []
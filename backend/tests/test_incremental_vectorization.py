@@ -0,0 +1,87 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import QdrantClient, models as models_qdrant
+
+from app import models
+from app.services import etl_pipeline
+
+DIM = 8
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Pipeline on the installed qdrant-client in local in-memory mode, counting embedded chunks."""
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name=etl_pipeline.QDRANT_COLLECTION,
+        vectors_config=models_qdrant.VectorParams(size=DIM, distance=models_qdrant.Distance.COSINE),
+    )
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[float(len(text) + i + 1) for i in range(DIM)] for text in texts]
+
+    monkeypatch.setattr(etl_pipeline, "get_qdrant_client", lambda: client)
+    monkeypatch.setattr(etl_pipeline, "embed_text_ollama", embed)
+    # One chunk per paragraph, so edits map to known chunks
+    monkeypatch.setattr(etl_pipeline, "chunk_text", lambda text: text.split("\n\n"))
+    return SimpleNamespace(etl=etl_pipeline.ETLPipeline(), client=client, embedded=embedded)
+
+
+def _document():
+    return models.KnowledgeBaseDocument(
+        id=uuid.uuid4(), file_name="guide.pdf", blob_path="knowledge_base/guide.pdf", document_type="general"
+    )
+
+
+async def _vectorize(pipeline, doc, text):
+    pipeline.embedded.clear()
+    job = SimpleNamespace(document_id=doc.id)
+    await pipeline.etl._vectorize_documents(None, [(doc, text)], job=job)
+    return dict(zip(text.split("\n\n"), json.loads(doc.qdrant_point_ids)))
+
+
+def _stored_ids(pipeline):
+    points, _ = pipeline.client.scroll(collection_name=etl_pipeline.QDRANT_COLLECTION, limit=100)
+    return {point.id for point in points}
+
+
+@pytest.mark.asyncio
+async def test_unchanged_chunks_keep_points_and_skip_embedding(pipeline):
+    doc = _document()
+    first = await _vectorize(pipeline, doc, "alpha\n\nbeta\n\ngamma")
+    assert sorted(pipeline.embedded) == ["alpha", "beta", "gamma"]
+
+    second = await _vectorize(pipeline, doc, "intro\n\nalpha\n\nbeta\n\ngamma")
+
+    assert pipeline.embedded == ["intro"]
+    assert {chunk: second[chunk] for chunk in first} == first
+    assert _stored_ids(pipeline) == set(second.values())
+
+
+@pytest.mark.asyncio
+async def test_edited_chunks_are_embedded_and_removed_chunks_deleted(pipeline):
+    doc = _document()
+    first = await _vectorize(pipeline, doc, "alpha\n\nbeta\n\ngamma")
+
+    second = await _vectorize(pipeline, doc, "alpha\n\nbeta, revised")
+
+    assert pipeline.embedded == ["beta, revised"]
+    assert second["alpha"] == first["alpha"]
+    assert _stored_ids(pipeline) == {first["alpha"], second["beta, revised"]}
+    assert doc.vector_count == 2
+
+
+def test_point_ids_depend_on_content_not_position():
+    etl = etl_pipeline.ETLPipeline.__new__(etl_pipeline.ETLPipeline)
+    document_id = uuid.uuid4()
+
+    ids = etl._chunk_point_ids(document_id, ["h1", "h2", "h1"])
+    shifted = etl._chunk_point_ids(document_id, ["h0", "h1", "h2", "h1"])
+
+    assert shifted[1:] == ids
+    assert len(set(ids)) == 3  # Repeated chunks get their own point
@@ -0,0 +1,93 @@
+import random
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import models
+from app.services import etl_pipeline
+from app.utils import minhash
+
+WORDS = (
+    "platform migration data pipeline reporting access review audit cloud network "
+    "security budget milestone vendor contract testing rollout support training "
+    "integration api schema warehouse latency backup recovery compliance policy"
+).split()
+
+
+def _text(seed: int, words: int = 600) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _edit(text: str, every: int) -> str:
+    """Replace every n-th word with a word that occurs nowhere else."""
+    return " ".join(f"edited{i}" if i % every == 0 else word for i, word in enumerate(text.split()))
+
+
+@pytest.fixture
+def etl(monkeypatch):
+    """Pipeline with its configured thresholds; the near-duplicate path never calls Qdrant."""
+    monkeypatch.setattr(etl_pipeline, "get_qdrant_client", lambda: None)
+    return etl_pipeline.ETLPipeline()
+
+
+def _similarity(a: str, b: str) -> float:
+    return minhash.jaccard_similarity(minhash.compute_signature(a), minhash.compute_signature(b))
+
+
+def test_near_identical_text_crosses_duplicate_threshold(etl):
+    text = _text(1)
+    assert _similarity(text, text) == 1.0
+    assert _similarity(text, text.upper() + " ...") == 1.0  # Case and punctuation are normalized
+    assert _similarity(text, _edit(text, 300)) >= etl.duplicate_threshold
+
+
+def test_unrelated_text_stays_below_update_threshold(etl):
+    assert _similarity(_text(1), _text(2)) < etl.update_threshold
+
+
+def test_near_identical_texts_share_an_lsh_band():
+    text = _text(1)
+    near = set(minhash.lsh_band_keys(minhash.compute_signature(_edit(text, 300))))
+    unrelated = set(minhash.lsh_band_keys(minhash.compute_signature(_text(2))))
+    original = set(minhash.lsh_band_keys(minhash.compute_signature(text)))
+
+    assert original & near
+    assert not original & unrelated
+
+
+@pytest_asyncio.fixture
+async def db():
+    """In-memory SQLite session with the KB document and LSH band tables."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.KnowledgeBaseDocument.__table__.create)
+        await conn.run_sync(models.KBMinHashBand.__table__.create)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _add_document(db, etl, name: str, text: str):
+    doc = models.KnowledgeBaseDocument(
+        id=uuid.uuid4(), file_name=name, blob_path=f"knowledge_base/{name}",
+        file_hash=name, file_size=len(text), is_vectorized=True
+    )
+    db.add(doc)
+    await etl._index_signature(db, doc, minhash.compute_signature(text))
+    await db.commit()
+    return doc
+
+
+@pytest.mark.asyncio
+async def test_find_similar_documents_returns_only_near_duplicates(db, etl):
+    text = _text(1)
+    original = await _add_document(db, etl, "original.pdf", text)
+    await _add_document(db, etl, "unrelated.pdf", _text(2))
+
+    similar = await etl._find_similar_documents(db, minhash.compute_signature(_edit(text, 300)), uuid.uuid4())
+
+    assert [d["document_id"] for d in similar] == [str(original.id)]
+    assert similar[0]["similarity_score"] >= etl.duplicate_threshold
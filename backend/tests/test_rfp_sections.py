@@ -0,0 +1,91 @@
+import hashlib
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import QdrantClient, models as models_qdrant
+
+from app.services import project_precompute
+from app.utils import scope_engine
+
+DIM = 64
+
+TOPICS = {
+    "security": "Security and compliance: SSO, encryption at rest, SOC 2 audit logging.",
+    "timeline": "Timeline and milestones: discovery in March, pilot in June, go-live in September.",
+    "budget": "Budget and resource constraints: fixed fee, two engineers, no weekend work.",
+}
+
+
+def _embed(texts):
+    """Bag-of-words vectors, so texts sharing words are similar."""
+    vectors = []
+    for text in texts:
+        vector = [0.0] * DIM
+        for word in text.lower().replace(",", " ").replace(":", " ").replace(".", " ").split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % DIM] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+@pytest.fixture
+def qdrant(monkeypatch):
+    """The installed qdrant-client in local in-memory mode in place of the server."""
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name=scope_engine.PROJECT_RFP_COLLECTION,
+        vectors_config=models_qdrant.VectorParams(size=DIM, distance=models_qdrant.Distance.COSINE),
+    )
+    for module in (scope_engine, project_precompute):
+        monkeypatch.setattr(module, "get_qdrant_client", lambda: client)
+        monkeypatch.setattr(module, "embed_text_ollama", _embed)
+    # Paragraph chunks and word counts, so the tokenizer is not downloaded
+    monkeypatch.setattr(project_precompute, "chunk_text", lambda text: text.split("\n\n"))
+    monkeypatch.setattr(scope_engine, "count_tokens", lambda text: len(text.split()))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_indexed_ranking_searches_only_the_project(qdrant):
+    project_id, other_id = uuid.uuid4(), uuid.uuid4()
+    await project_precompute.index_project_rfp(project_id, "\n\n".join(TOPICS.values()))
+    await project_precompute.index_project_rfp(other_id, "Security and compliance for another project.")
+
+    ranked = scope_engine._rank_rfp_sections(
+        project_id, "", ["security and compliance requirements", "timeline and milestones"], k=1, indexed=True
+    )
+
+    assert ranked == [[(0, TOPICS["security"])], [(1, TOPICS["timeline"])]]
+
+
+@pytest.mark.asyncio
+async def test_indexed_aspect_retrieval_returns_sections(qdrant):
+    project = SimpleNamespace(id=uuid.uuid4(), name="Portal")
+    await project_precompute.index_project_rfp(project.id, "\n\n".join(TOPICS.values()))
+
+    sections = scope_engine._retrieve_relevant_sections_by_aspects(
+        project, "", ["budget and resource constraints"], k=1, indexed=True
+    )
+
+    assert sections == [TOPICS["budget"]]
+
+
+def test_questions_context_falls_back_to_live_ranking(monkeypatch):
+    rfp_text = "Overview. " * 1200 + "\n\n" + TOPICS["security"]
+    calls = []
+
+    def rank(project_id, text, queries, k, indexed=False):
+        calls.append(indexed)
+        if indexed:
+            return [[] for _ in queries]
+        return [[(1, TOPICS["security"])] for _ in queries]
+
+    monkeypatch.setattr(scope_engine, "_rank_rfp_sections", rank)
+    monkeypatch.setattr(scope_engine, "_rag_retrieve", lambda query: [])
+    monkeypatch.setattr(scope_engine, "count_tokens", lambda text: len(text.split()))
+
+    project = SimpleNamespace(id=uuid.uuid4(), name="Portal", domain=None)
+    focused, _ = scope_engine._questions_rfp_context(project, rfp_text, indexed=True)
+
+    assert calls == [True, False]
+    assert focused.endswith("=== Additional Relevant Details ===\n\n" + TOPICS["security"])
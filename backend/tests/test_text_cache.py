@@ -0,0 +1,74 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import text_cache
+
+BLOB_PATH = "projects/p1/rfp.pdf"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """In-memory blob, cache table and extractor in place of storage, DB and parsers."""
+    state = SimpleNamespace(data=b"v1", etag='"e1"', rows={}, extractions=[], text="text v1")
+
+    async def get_blob_etag(blob_path):
+        return state.etag
+
+    async def download_bytes(blob_path):
+        return state.data
+
+    async def load(blob_path):
+        return state.rows.get(blob_path)
+
+    async def store(blob_path, content_hash, etag, text):
+        state.rows[blob_path] = SimpleNamespace(content_hash=content_hash, etag=etag, text=text)
+
+    async def extract(data, file_name):
+        state.extractions.append(data)
+        return state.text
+
+    monkeypatch.setattr(text_cache.azure_blob, "get_blob_etag", get_blob_etag)
+    monkeypatch.setattr(text_cache.azure_blob, "download_bytes", download_bytes)
+    monkeypatch.setattr(text_cache, "_load", load)
+    monkeypatch.setattr(text_cache, "_store", store)
+    monkeypatch.setattr(text_cache, "_extract", extract)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_etag_hit_skips_download_and_extraction(storage):
+    assert await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf") == "text v1"
+    storage.data = b"not downloaded"
+    assert await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf") == "text v1"
+    assert storage.extractions == [b"v1"]
+
+
+@pytest.mark.asyncio
+async def test_same_bytes_new_etag_reuses_text(storage):
+    await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf")
+    storage.etag = '"e2"'
+    assert await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf") == "text v1"
+    assert storage.extractions == [b"v1"]
+    assert storage.rows[BLOB_PATH].etag == '"e2"'
+
+
+@pytest.mark.asyncio
+async def test_changed_bytes_are_extracted_again(storage):
+    await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf")
+    storage.data, storage.etag, storage.text = b"v2", '"e2"', "text v2"
+    assert await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf") == "text v2"
+    assert storage.extractions == [b"v1", b"v2"]
+    assert storage.rows[BLOB_PATH].content_hash == hashlib.sha256(b"v2").hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_failed_extraction_is_not_cached(storage):
+    storage.text = ""
+    assert await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf") == ""
+    assert BLOB_PATH not in storage.rows
+
+    storage.text = "text v1"
+    assert await text_cache.get_extracted_text(BLOB_PATH, "rfp.pdf") == "text v1"
+    assert storage.extractions == [b"v1", b"v1"]
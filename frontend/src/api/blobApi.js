@@ -45,6 +45,16 @@ const blobApi = {
   explorer: (base = "knowledge_base") =>
     api.get(`/blobs/explorer/${base}`),
 
+  // One folder level per call; pass continuation_token back for the next page
+  explorerChildren: (base = "knowledge_base", prefix = "", continuationToken = null, pageSize = 200) =>
+    api.get(`/blobs/explorer/${base}/children`, {
+      params: {
+        prefix,
+        page_size: pageSize,
+        ...(continuationToken ? { continuation_token: continuationToken } : {}),
+      },
+    }),
+
   //  Download & Preview
   download: (blobName, base = "knowledge_base") =>
     api.get(`/blobs/download/${encodeURIComponent(blobName)}?base=${base}`, {
@@ -63,6 +73,10 @@ const blobApi = {
   deleteFolder: (folder, base = "knowledge_base") =>
     api.delete(`/blobs/delete/folder/${encodeURIComponent(folder)}?base=${base}`),
 
+  // Large folder deletions run in the background and return a job handle
+  getDeletionJob: (jobId) =>
+    api.get(`/blobs/delete/jobs/${jobId}`),
+
   // SAS Token
   getSasToken: (hours = 1) =>
     api.get(`/blobs/sas-token?hours=${hours}`),
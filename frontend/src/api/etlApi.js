@@ -12,6 +12,55 @@ const etlApi = {
    */
   getScanStatus: () => api.get("/etl/scan/status"),
 
+  /**
+   * Stream live ETL scan progress (Server-Sent Events).
+   * Uses fetch instead of EventSource so the auth header can be sent.
+   * @param {string|null} scanId - Scan run to follow (defaults to the latest scan)
+   * @param {function} onProgress - Called with each progress payload
+   * @param {AbortSignal} signal - Abort to stop streaming
+   * @returns {Promise<object|null>} Final payload once the scan is done
+   */
+  streamScanProgress: async (scanId, onProgress, signal) => {
+    const token = localStorage.getItem("access_token");
+    const query = scanId ? `?scan_id=${encodeURIComponent(scanId)}` : "";
+    const response = await fetch(`${api.defaults.baseURL}/etl/scan/stream${query}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      signal,
+    });
+    if (!response.ok) {
+      throw new Error(`Scan stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) return null;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let eventName = "message";
+        let data = "";
+        for (const line of rawEvent.split("\n")) {
+          if (line.startsWith("event:")) eventName = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        if (!data) continue; // keep-alive comment
+
+        const payload = JSON.parse(data);
+        onProgress(payload);
+        if (eventName === "done") return payload;
+      }
+    }
+  },
+
   /**
    * Get pending KB updates requiring approval
    * @param {string} status - Filter by status: pending, approved, rejected
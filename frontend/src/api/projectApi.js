@@ -82,6 +82,10 @@ const projectApi = {
   getFinalizedScope: (id, { signal } = {}) =>
     api.get(`/projects/${id}/finalized_scope`, { signal }),
 
+  // { version, content_hash, created_at, archived } without the scope itself
+  getFinalizedScopeVersion: (id, { signal } = {}) =>
+    api.get(`/projects/${id}/finalized_scope/version`, { signal }),
+
   getRelatedCaseStudy: (id, { signal } = {}) =>
     api.get(`/projects/${id}/related_case_study`, { signal }),
 
@@ -90,9 +90,23 @@ export const BlobProvider = ({ children }) => {
     }
   };
 
+  const waitForDeletionJob = async (jobId) => {
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const { data } = await blobApi.getDeletionJob(jobId);
+      if (data.status === "completed") return data;
+      if (data.status === "failed") throw new Error(data.error || "Deletion failed");
+    }
+  };
+
   const deleteFolder = async (name, base = activeBase) => {
     try {
       const { data } = await blobApi.deleteFolder(name, base);
+      if (data.status === "accepted") {
+        await waitForDeletionJob(data.job_id);
+        await loadExplorer(base);
+        return [];
+      }
       await loadExplorer(base);
       return data.deleted;
     } catch {
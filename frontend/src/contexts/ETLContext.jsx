@@ -40,6 +40,11 @@ export const ETLProvider = ({ children }) => {
     }
   }, []);
 
+  // Follow live ETL scan progress until the scan finishes
+  const streamScanProgress = useCallback(async (scanId, onProgress, signal) => {
+    return etlApi.streamScanProgress(scanId, onProgress, signal);
+  }, []);
+
   // Load pending updates
   const loadPendingUpdates = useCallback(async (status = "pending", limit = 50, offset = 0) => {
     setLoading(true);
@@ -226,6 +231,7 @@ export const ETLProvider = ({ children }) => {
     // Actions
     triggerScan,
     getScanStatus,
+    streamScanProgress,
     loadPendingUpdates,
     approvePendingUpdate,
     rejectPendingUpdate,
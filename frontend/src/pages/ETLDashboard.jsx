@@ -28,6 +28,7 @@ export default function ETLDashboard() {
     error,
     triggerScan,
     getScanStatus,
+    streamScanProgress,
     loadPendingUpdates,
     approvePendingUpdate,
     rejectPendingUpdate,
@@ -42,6 +43,7 @@ export default function ETLDashboard() {
 
   const [activeTab, setActiveTab] = useState("stats");
   const [scanLoading, setScanLoading] = useState(false);
+  const [scanProgress, setScanProgress] = useState(null);
   const [resetLoading, setResetLoading] = useState(false);
   const [processingId, setProcessingId] = useState(null);
   const [adminComment, setAdminComment] = useState("");
@@ -72,8 +74,9 @@ export default function ETLDashboard() {
 
     // Cleanup on unmount
     return () => {
-      if (window.etlPollingInterval) {
-        clearInterval(window.etlPollingInterval);
+      if (window.etlScanStream) {
+        window.etlScanStream.abort();
+        window.etlScanStream = null;
       }
     };
   }, [loadStats, loadPendingUpdates, loadProcessingJobs, loadKBDocuments, loadPendingCaseStudies]);
@@ -90,68 +93,51 @@ export default function ETLDashboard() {
     }
   };
 
-  // Initialize scan state on mount (check if scan is running)
+  // Refresh everything once a scan has finished
+  const refreshAfterScan = () => {
+    loadStats();
+    loadPendingUpdates();
+    loadProcessingJobs();
+    loadKBDocuments();
+    loadPendingCaseStudies();
+  };
+
+  // Initialize scan state on mount (resume following a running scan)
   const initializeScanState = async () => {
-    const scanStartTime = localStorage.getItem('etl_scan_started');
+    const statusData = await getScanStatus();
 
-    if (scanStartTime) {
-      // Scan was triggered before, check if still running
+    if (statusData.is_scanning === true) {
+      console.log('✅ ETL scan is still running, following progress...');
       setScanLoading(true);
-
-      const stillProcessing = await checkIfStillProcessing();
-
-      if (stillProcessing) {
-        console.log('✅ ETL scan is still running, resuming polling...');
-        startStatusPolling();
-      } else {
-        console.log('✅ ETL scan completed while away');
-        cleanupScanState();
-        // Refresh all data
-        loadStats();
-        loadProcessingJobs();
-        loadKBDocuments();
-      }
-    }
-  };
-
-  // Check if ETL scan is still running using the backend endpoint
-  const checkIfStillProcessing = async () => {
-    try {
-      const statusData = await getScanStatus();
-      return statusData.is_scanning === true;
-    } catch (error) {
-      console.error('Failed to check processing status:', error);
-      return false;
+      setScanProgress(statusData.stats);
+      startProgressStream(statusData.stats?.scan_id);
+    } else if (localStorage.getItem('etl_scan_started')) {
+      console.log('✅ ETL scan completed while away');
+      cleanupScanState();
+      refreshAfterScan();
     }
   };
 
-  // Start polling to check scan status every 5 seconds
-  const startStatusPolling = () => {
-    // Clear any existing interval
-    if (window.etlPollingInterval) {
-      clearInterval(window.etlPollingInterval);
+  // Follow live scan progress over Server-Sent Events
+  const startProgressStream = (scanId = null) => {
+    if (window.etlScanStream) {
+      window.etlScanStream.abort();
     }
+    const controller = new AbortController();
+    window.etlScanStream = controller;
 
-    // Poll every 5 seconds
-    window.etlPollingInterval = setInterval(async () => {
-      const stillProcessing = await checkIfStillProcessing();
-
-      if (!stillProcessing) {
+    streamScanProgress(scanId, (payload) => setScanProgress(payload.scan), controller.signal)
+      .then(() => {
+        if (controller.signal.aborted) return;
         console.log('✅ ETL scan completed!');
         cleanupScanState();
-
-        // Refresh all data
-        loadStats();
-        loadPendingUpdates();
-        loadProcessingJobs();
-        loadProcessingJobs();
-        loadKBDocuments();
-        loadPendingCaseStudies();
-
-        // Stop polling
-        clearInterval(window.etlPollingInterval);
-      }
-    }, 5000); // 5 seconds
+        refreshAfterScan();
+      })
+      .catch((err) => {
+        if (err.name === 'AbortError') return;
+        console.error('Scan progress stream failed:', err);
+        cleanupScanState();
+      });
   };
 
   // Clean up scan state
@@ -159,23 +145,25 @@ export default function ETLDashboard() {
     setScanLoading(false);
     localStorage.removeItem('etl_scan_started');
 
-    if (window.etlPollingInterval) {
-      clearInterval(window.etlPollingInterval);
+    if (window.etlScanStream) {
+      window.etlScanStream.abort();
+      window.etlScanStream = null;
     }
   };
 
   const handleTriggerScan = async () => {
     setScanLoading(true);
+    setScanProgress(null);
 
     // Save scan start time to localStorage
     localStorage.setItem('etl_scan_started', Date.now().toString());
 
     try {
-      await triggerScan();
+      const data = await triggerScan();
       // Don't set scanLoading to false here!
-      // Let polling detect when it's done
-      console.log('✅ ETL scan triggered, starting polling...');
-      startStatusPolling();
+      // Let the progress stream report when it's done
+      console.log('✅ ETL scan triggered, following progress...');
+      startProgressStream(data?.scan_id);
     } catch (err) {
       alert(`ETL scan failed: ${err.message}`);
       cleanupScanState();
@@ -361,11 +349,12 @@ export default function ETLDashboard() {
       {scanLoading && (
         <div className="bg-blue-50 dark:bg-blue-900/20 border border-blue-200 dark:border-blue-800 rounded-xl p-4 flex items-start gap-3">
           <Clock className="w-5 h-5 text-blue-600 dark:text-blue-400 flex-shrink-0 mt-0.5 animate-pulse" />
-          <div>
+          <div className="flex-1">
             <p className="font-semibold text-blue-900 dark:text-blue-100">ETL Scan in Progress</p>
             <p className="text-sm text-blue-700 dark:text-blue-300">
               Processing knowledge base documents... You can navigate away and come back. The scan will continue running.
             </p>
+            {scanProgress && <ScanProgressPanel progress={scanProgress} />}
           </div>
         </div>
       )}
@@ -1010,4 +999,69 @@ function StatCard({ title, value, icon: Icon, color }) {
       <p className="text-4xl font-extrabold text-gray-900 dark:text-gray-100">{value}</p>
     </div>
   );
-}
\ No newline at end of file
+}
+
+// Live scan progress: counters, per-stage throughput/latency, bottleneck and ETA
+function ScanProgressPanel({ progress }) {
+  const counters = progress.counters || {};
+  const stages = progress.stages || {};
+  const total = counters.queued || 0;
+  const done = (counters.docs_processed || 0) + (counters.docs_failed || 0);
+  const percent = total ? Math.round((done / total) * 100) : 0;
+
+  const formatThroughput = (stage) => {
+    if (stage.throughput_unit === "bytes/s") {
+      return `${(stage.throughput / (1024 * 1024)).toFixed(2)} MB/s`;
+    }
+    return `${stage.throughput} ${stage.throughput_unit}`;
+  };
+
+  const formatEta = (seconds) => {
+    if (seconds === null || seconds === undefined) return "estimating...";
+    if (seconds < 60) return `${seconds}s`;
+    const minutes = Math.floor(seconds / 60);
+    if (minutes < 60) return `${minutes}m ${seconds % 60}s`;
+    return `${Math.floor(minutes / 60)}h ${minutes % 60}m`;
+  };
+
+  return (
+    <div className="mt-3 space-y-3 text-sm text-blue-900 dark:text-blue-100">
+      <div className="flex flex-wrap gap-x-6 gap-y-1">
+        <span>Status: <strong>{progress.status}</strong></span>
+        <span>Files listed: <strong>{counters.files_listed}</strong></span>
+        <span>Queued: <strong>{total}</strong></span>
+        <span>Done: <strong>{done}</strong>{counters.docs_failed ? ` (${counters.docs_failed} failed)` : ""}</span>
+        <span>Chunks embedded: <strong>{counters.chunks_embedded}</strong></span>
+        <span>Vectors upserted: <strong>{counters.vectors_upserted}</strong></span>
+        <span>ETA: <strong>{formatEta(progress.eta_seconds)}</strong></span>
+      </div>
+
+      {total > 0 && (
+        <div className="w-full h-2 bg-blue-100 dark:bg-blue-900/40 rounded-full overflow-hidden">
+          <div className="h-full bg-blue-600 dark:bg-blue-400 transition-all" style={{ width: `${percent}%` }} />
+        </div>
+      )}
+
+      <table className="w-full text-left text-xs">
+        <thead>
+          <tr className="text-blue-700 dark:text-blue-300">
+            <th className="py-1 pr-4">Stage</th>
+            <th className="py-1 pr-4">Throughput</th>
+            <th className="py-1 pr-4">p50</th>
+            <th className="py-1 pr-4">p95</th>
+          </tr>
+        </thead>
+        <tbody>
+          {Object.entries(stages).map(([name, stage]) => (
+            <tr key={name} className={progress.bottleneck === name ? "font-bold text-orange-600 dark:text-orange-400" : ""}>
+              <td className="py-1 pr-4">{name}{progress.bottleneck === name ? " (bottleneck)" : ""}</td>
+              <td className="py-1 pr-4">{formatThroughput(stage)}</td>
+              <td className="py-1 pr-4">{stage.p50_seconds !== undefined ? `${stage.p50_seconds}s` : "-"}</td>
+              <td className="py-1 pr-4">{stage.p95_seconds !== undefined ? `${stage.p95_seconds}s` : "-"}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  );
+}